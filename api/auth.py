@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Cache dos tokens JWT ja verificados.
+
+Cada rota protegida chamava jwt.decode (HMAC + parse das claims) em toda
+requisicao, mesmo com o cliente mandando sempre o mesmo token. Aqui o
+payload de um token valido fica guardado ate o seu `exp`:
+
+- a chave e um digest do token com a impressao digital do segredo, entao
+  trocar o JWT_SECRET invalida todas as entradas (e o token em si nao fica
+  na memoria);
+- a entrada sai no mesmo instante em que o jwt.decode passaria a
+  recusar o token (exp <= agora), e a chamada seguinte cai no decode, que
+  levanta ExpiredSignatureError como antes;
+- tokens invalidos nao entram no cache;
+- o tamanho e limitado (LRU), para tokens de muitos clientes nao
+  crescerem a memoria sem limite.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Quantos tokens verificados guardar (0 desliga o cache)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "1024"))
+
+
+def impressao_segredo(segredo: str) -> bytes:
+    """Impressao digital do segredo (chave do digest dos tokens)."""
+    return hashlib.blake2b(segredo.encode("utf-8"), digest_size=16).digest()
+
+
+class TokenCache:
+    """
+    LRU de payloads de tokens verificados, com expiracao pelo `exp` do token.
+
+    Seguro para threads (as rotas sincronas rodam no threadpool).
+    """
+
+    def __init__(self, max_entries: int = JWT_CACHE_SIZE):
+        self.max_entries = max(0, max_entries)
+        self._entradas: "OrderedDict[bytes, Tuple[Dict[str, Any], Optional[int]]]" = OrderedDict()
+        self._impressao: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+        # Metricas
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def verificar(self, token: str, segredo: str, decodificar: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Payload do token: do cache se ja foi verificado e nao expirou, senao
+        de `decodificar(token)` (que levanta excecao se o token for invalido).
+        """
+        impressao = impressao_segredo(segredo)
+        chave = hashlib.blake2b(token.encode("utf-8"), digest_size=16, key=impressao).digest()
+
+        with self._lock:
+            if impressao != self._impressao:
+                # Segredo trocado: nada verificado com o segredo antigo vale mais
+                self._entradas.clear()
+                self._impressao = impressao
+
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                payload, exp = entrada
+                # Mesmo criterio do PyJWT: expirado se exp <= agora
+                if exp is None or exp > time.time():
+                    self._entradas.move_to_end(chave)
+                    self.hits += 1
+                    return dict(payload)
+                del self._entradas[chave]
+                self.expired += 1
+            self.misses += 1
+
+        payload = decodificar(token)
+        if self.max_entries:
+            exp = int(payload["exp"]) if "exp" in payload else None
+            with self._lock:
+                if impressao == self._impressao:
+                    self._entradas[chave] = (dict(payload), exp)
+                    self._entradas.move_to_end(chave)
+                    while len(self._entradas) > self.max_entries:
+                        self._entradas.popitem(last=False)
+                        self.evicted += 1
+        return payload
+
+    def invalidar(self) -> None:
+        """Esquece todos os tokens verificados (ex: revogacao manual)."""
+        with self._lock:
+            self._entradas.clear()
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "max_entries": self.max_entries,
+                "entries": len(self._entradas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / consultas, 4) if consultas else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
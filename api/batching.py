@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-batching das predicoes individuais (/ml/predictions).
+
+Muitos clientes chamam a predicao uma vez por livro. Cada chamada sozinha
+paga o custo fixo do modelo (montar arrays, multiplicar matrizes) para
+uma unica linha. O MicroBatcher junta as chamadas que chegam ao mesmo
+tempo e pontua todas em uma unica chamada vetorizada:
+
+- um lote sai assim que junta `max_batch_size` itens, ou
+- quando o item mais antigo ja esperou `max_wait_ms`.
+
+Cada chamador recebe o seu resultado por um Future. As metricas (fila e
+distribuicao do tamanho dos lotes) ajudam a calibrar os dois limites:
+lote maior = mais vazao, espera maior = mais latencia.
+"""
+
+import asyncio
+import functools
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Limites padrao (configuraveis por variavel de ambiente)
+PREDICTION_MAX_BATCH_SIZE = int(os.getenv("PREDICTION_MAX_BATCH_SIZE", "64"))
+PREDICTION_MAX_WAIT_MS = float(os.getenv("PREDICTION_MAX_WAIT_MS", "2"))
+
+
+def _faixa_histograma(tamanho: int) -> str:
+    """Faixa (potencias de 2) do histograma de tamanhos de lote: "1", "2-3", "4-7", ..."""
+    inicio = 1 << (tamanho.bit_length() - 1)
+    fim = (inicio << 1) - 1
+    return str(inicio) if inicio == fim else f"{inicio}-{fim}"
+
+
+class MicroBatcher:
+    """
+    Fila de itens que sao processados em lotes por `processar`.
+
+    `processar` recebe a lista de itens e devolve a lista de resultados na
+    mesma ordem. Roda no executor padrao do event loop (thread), para um
+    lote grande, ou o treino do modelo na primeira chamada, nao travar as
+    outras requisicoes. Se levantar excecao, todos os itens do lote
+    recebem a excecao.
+    """
+
+    def __init__(self, processar: Callable[[List[Any]], List[Any]], max_batch_size: int, max_wait_ms: float):
+        self.processar = processar
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self._pendentes: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Metricas
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.items = 0
+        self.histograma: Dict[str, int] = {}
+
+    async def submeter(self, item: Any) -> Any:
+        """Entra na fila e espera o resultado do lote em que o item foi processado."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pendentes.append((item, future))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pendentes))
+
+        if len(self._pendentes) >= self.max_batch_size:
+            self._despachar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._despachar)
+        return await future
+
+    def _despachar(self) -> None:
+        """Processa os itens pendentes, em lotes de ate max_batch_size."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        loop = asyncio.get_running_loop()
+        while self._pendentes:
+            lote = self._pendentes[:self.max_batch_size]
+            del self._pendentes[:self.max_batch_size]
+            # Chamadores que desistiram (timeout/cancelamento) ficam de fora
+            lote = [(item, future) for item, future in lote if not future.done()]
+            if not lote:
+                continue
+
+            self.batches += 1
+            self.items += len(lote)
+            faixa = _faixa_histograma(len(lote))
+            self.histograma[faixa] = self.histograma.get(faixa, 0) + 1
+
+            execucao = loop.run_in_executor(None, self.processar, [item for item, _ in lote])
+            execucao.add_done_callback(functools.partial(self._entregar, lote))
+
+    @staticmethod
+    def _entregar(lote: List[Tuple[Any, asyncio.Future]], execucao: asyncio.Future) -> None:
+        """Repassa o resultado (ou a excecao) do lote a cada chamador que ainda espera."""
+        erro = execucao.exception()
+        resultados = [None] * len(lote) if erro is not None else execucao.result()
+        for (_, future), resultado in zip(lote, resultados):
+            if future.done():
+                continue
+            if erro is not None:
+                future.set_exception(erro)
+            else:
+                future.set_result(resultado)
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": len(self._pendentes),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "predictions": self.items,
+            "average_batch_size": round(self.items / self.batches, 3) if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.histograma.items(), key=lambda faixa: int(faixa[0].split("-")[0]))),
+        }
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+ETag e requisicoes condicionais (If-None-Match -> 304) nas rotas de leitura.
+
+Os dados so mudam quando um snapshot novo e publicado, entao a resposta de
+um GET e funcao de (dados, rota, query string). A ETag e montada so com
+isso, sem gerar o corpo:
+
+    "<fingerprint do dataset>-<hash da rota + query ordenada>"
+
+Se o cliente (dashboard, CDN, proxy) manda a mesma ETag em If-None-Match,
+o middleware responde 304 antes de chegar na rota: nada e calculado nem
+serializado. Nas respostas 200 o middleware acrescenta ETag e Cache-Control.
+"""
+
+import hashlib
+import os
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from .dataset import obter_snapshot
+
+# Rotas GET cujas respostas dependem so dos dados e dos parametros
+ROTAS_CACHEAVEIS = (
+    "/api/v1/books",
+    "/api/v1/categories",
+    "/api/v1/stats/",
+    "/api/v1/ml/features",
+    "/api/v1/ml/training-data",
+)
+
+# Rotas com negociacao de conteudo: o formato/compressao depende dos
+# headers Accept e Accept-Encoding, que entram na ETag e no Vary
+ROTAS_NEGOCIADAS = ("/api/v1/ml/training-data",)
+CABECALHOS_NEGOCIADOS = (b"accept", b"accept-encoding")
+
+# Por quantos segundos caches podem reaproveitar a resposta sem revalidar
+CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "60"))
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}, must-revalidate"
+
+
+def calcular_etag(fingerprint: str, path: str, query_string: str, variacao: str = "") -> str:
+    """
+    ETag forte da resposta: mesmos dados + mesma rota + mesmos parametros
+    (em qualquer ordem) + mesmos headers negociados (variacao).
+    """
+    consulta = urlencode(sorted(parse_qsl(query_string, keep_blank_values=True)))
+    digest = hashlib.blake2b(f"{path}?{consulta}\n{variacao}".encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{fingerprint}-{digest}"'
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o If-None-Match com a ETag atual (aceita lista, "*" e prefixo W/)."""
+    if not if_none_match:
+        return False
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        if candidata == "*" or candidata.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _cabecalho(headers: List[Tuple[bytes, bytes]], nome: bytes) -> Optional[str]:
+    for chave, valor in headers:
+        if chave == nome:
+            return valor.decode("latin-1")
+    return None
+
+
+class ETagMiddleware:
+    """
+    Middleware ASGI de requisicoes condicionais para as ROTAS_CACHEAVEIS.
+
+    Antes da carga inicial (versao 0) nada e cacheado.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not scope["path"].startswith(ROTAS_CACHEAVEIS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        snapshot = obter_snapshot()
+        if snapshot.version == 0:
+            await self.app(scope, receive, send)
+            return
+
+        variacao = ""
+        cabecalhos_cache = [(b"cache-control", CACHE_CONTROL.encode("latin-1"))]
+        if scope["path"].startswith(ROTAS_NEGOCIADAS):
+            variacao = "\n".join(_cabecalho(scope["headers"], nome) or "" for nome in CABECALHOS_NEGOCIADOS)
+            cabecalhos_cache.append((b"vary", b"Accept, Accept-Encoding"))
+        etag = calcular_etag(snapshot.fingerprint, scope["path"], scope["query_string"].decode("latin-1"), variacao)
+        cabecalhos_cache.insert(0, (b"etag", etag.encode("latin-1")))
+
+        if etag_confere(_cabecalho(scope["headers"], b"if-none-match"), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": cabecalhos_cache})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def enviar_com_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = dict(message, headers=list(message.get("headers", [])) + cabecalhos_cache)
+            await send(message)
+
+        await self.app(scope, receive, enviar_com_etag)
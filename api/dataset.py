@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot versionado do dataset servido pela API.
+
+Antes cada estrutura (store, indices, estatisticas) era uma variavel global
+reatribuida uma apos a outra no reload, e uma requisicao concorrente podia
+ver o store novo com um indice velho. Agora:
+
+1. o reload monta um DatasetSnapshot completo "ao lado", sem mexer no atual;
+2. a publicacao e uma unica troca de referencia (atomica no Python);
+3. cada requisicao pega o snapshot uma vez e usa so ele ate o fim.
+
+Requisicoes em andamento terminam no snapshot em que comecaram.
+
+Os indices pesados (busca, payloads, ordens, bitmaps) vem do diretorio
+compartilhado entre os workers (ver shared.py) quando ele esta ligado;
+estatisticas e features de ML continuam por processo.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from .facets import FacetIndex
+from .indexes import PriceIndex, SortOrders, TopRatedIndex
+from .ml import FeaturePipeline
+from .payloads import BookPayloads
+from .search import IndiceBusca
+from .shared import componentes_compartilhados
+from .stats import StatsSnapshot
+from .store import BookStore
+from .utils import carregar_dados_livros, diretorio_indices
+
+
+def _montar_componentes(store: BookStore, todas_ordens: bool = False) -> Dict[str, Any]:
+    """Indices derivados do store (os que podem ser compartilhados entre processos)."""
+    precos = PriceIndex(store)
+    ordens = SortOrders(store)
+    if todas_ordens:
+        ordens.montar_todas()
+    return {
+        "busca": IndiceBusca(store),
+        "precos": precos,
+        "top": TopRatedIndex(store),
+        "facetas": FacetIndex(store, precos),
+        "ordens": ordens,
+        "payloads": BookPayloads(store),
+    }
+
+
+class DatasetSnapshot:
+    """
+    Uma versao imutavel dos dados: livros, indices e agregados prontos.
+
+    O numero de versao cresce a cada publicacao e nunca se repete
+    durante a vida do processo. O fingerprint identifica o conteudo
+    (igual entre processos e reinicios) e e a base das ETags.
+    """
+
+    def __init__(self, store: BookStore, version: int, diretorio: Optional[str] = None):
+        self.version = version
+        self.store = store
+        self.fingerprint = store.fingerprint()
+
+        componentes = None
+        if diretorio is not None and len(store):
+            try:
+                # Compartilhado: todas as ordens vao prontas para o disco
+                componentes = componentes_compartilhados(
+                    store, self.fingerprint, lambda: _montar_componentes(store, todas_ordens=True), diretorio
+                )
+            except Exception as e:
+                print(f"AVISO: indices compartilhados indisponiveis, montando em memoria ({e})")
+        if componentes is None:
+            # Em memoria, as ordens da listagem (/books?sort=) sao montadas no primeiro uso
+            componentes = _montar_componentes(store)
+
+        self.busca = componentes["busca"]
+        self.precos = componentes["precos"]
+        self.top = componentes["top"]
+        self.facetas = componentes["facetas"]
+        self.ordens = componentes["ordens"]
+        self.payloads = componentes["payloads"]
+        self.stats = StatsSnapshot(store, version)
+        # Features de ML sao montadas sob demanda (primeira chamada de cada encoding)
+        self.ml = FeaturePipeline(store, version, self.fingerprint)
+
+
+# Snapshot publicado. A versao 0 e o dataset vazio, antes da primeira carga.
+_snapshot_atual = DatasetSnapshot(BookStore.vazio(), 0)
+
+# Serializa os reloads para a versao ser monotonica (leituras nao usam lock)
+_lock_publicacao = threading.Lock()
+
+
+def obter_snapshot() -> DatasetSnapshot:
+    """Retorna o snapshot publicado no momento."""
+    return _snapshot_atual
+
+
+def publicar_store(store: BookStore) -> DatasetSnapshot:
+    """Monta um snapshot novo para o store e publica com uma unica troca de referencia."""
+    global _snapshot_atual
+    with _lock_publicacao:
+        novo = DatasetSnapshot(store, _snapshot_atual.version + 1, diretorio_indices())
+        _snapshot_atual = novo
+    return novo
+
+
+def recarregar_dados() -> DatasetSnapshot:
+    """Le os dados do disco e publica um snapshot novo."""
+    return publicar_store(carregar_dados_livros())
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Exportacao do dataset para treinamento (/ml/training-data) em streaming.
+
+Antes o CSV inteiro era montado em um StringIO por download. Aqui o
+arquivo e gerado em blocos de EXPORT_CHUNK_ROWS linhas direto do store,
+entao a memoria por download fica limitada a um bloco. Em cada bloco
+aplicamos:
+
+- o split treino/teste deterministico (hash do id do livro + seed);
+- a projecao de colunas;
+- a codificacao no formato pedido (CSV, NDJSON, Arrow IPC ou Parquet);
+- opcionalmente gzip.
+
+Arrow e Parquet dependem do pyarrow, que e opcional.
+"""
+
+import csv
+import io
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from .stats import json_bytes
+from .store import COLUNAS_LIVRO, BookStore
+
+# Linhas por bloco gerado
+EXPORT_CHUNK_ROWS = 10_000
+
+# Formato -> (media type, extensao do arquivo)
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Formatos que precisam do pyarrow
+FORMATOS_ARROW = ("arrow", "parquet")
+
+
+class FormatoIndisponivel(Exception):
+    """Formato pedido nao pode ser gerado (ex: Parquet sem pyarrow instalado)."""
+
+
+def pyarrow_disponivel() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def negociar_formato(formato: Optional[str], accept: Optional[str]) -> str:
+    """
+    Escolhe o formato da exportacao.
+
+    O parametro format tem prioridade; sem ele usamos o header Accept
+    (primeiro media type conhecido, na ordem em que aparece) e, por
+    fim, CSV. Levanta FormatoIndisponivel se o formato precisa do pyarrow
+    e ele nao esta instalado.
+    """
+    if not formato:
+        formato = "csv"
+        por_media_type = {media_type: nome for nome, (media_type, _) in FORMATOS.items()}
+        for item in (accept or "").split(","):
+            media_type = item.split(";")[0].strip().lower()
+            if media_type in por_media_type:
+                formato = por_media_type[media_type]
+                break
+    if formato in FORMATOS_ARROW and not pyarrow_disponivel():
+        raise FormatoIndisponivel(f"O formato {formato} requer o pacote pyarrow, que nao esta instalado.")
+    return formato
+
+
+def validar_colunas(columns: Optional[str]) -> List[str]:
+    """Converte 'id,price,...' na lista de colunas (todas se vazio). ValueError se alguma nao existir."""
+    if not columns:
+        return list(COLUNAS_LIVRO)
+    colunas = [coluna.strip() for coluna in columns.split(",") if coluna.strip()]
+    desconhecidas = [coluna for coluna in colunas if coluna not in COLUNAS_LIVRO]
+    if desconhecidas or not colunas:
+        raise ValueError(f"Colunas invalidas: {', '.join(desconhecidas)}. Disponiveis: {', '.join(COLUNAS_LIVRO)}")
+    return colunas
+
+
+def mascara_teste(ids: np.ndarray, test_ratio: float, seed: int) -> np.ndarray:
+    """
+    True para os livros que caem no conjunto de teste.
+
+    Cada id passa por um hash (splitmix64) misturado com a seed e vira um
+    numero uniforme em [0, 1); o livro e de teste se o numero < test_ratio.
+    O resultado so depende do id e da seed, entao o split e o mesmo em
+    qualquer processo e nao muda quando outros livros entram ou saem.
+    """
+    with np.errstate(over="ignore"):
+        z = ids.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_ratio
+
+
+def _valores(store: BookStore, linhas: np.ndarray, coluna: str) -> list:
+    """Valores (tipos Python) de uma coluna nas linhas do bloco."""
+    if coluna == "id":
+        return store.ids[linhas].tolist()
+    if coluna == "price":
+        return store.prices[linhas].tolist()
+    if coluna == "rating":
+        return store.ratings[linhas].tolist()
+    if coluna == "availability":
+        return store.availability[linhas].tolist()
+    if coluna == "category":
+        return [store.categories[codigo] for codigo in store.category_codes[linhas].tolist()]
+    texto = {"title": store.titles, "image_url": store.image_urls, "product_url": store.product_urls}[coluna]
+    return [texto[linha] for linha in linhas.tolist()]
+
+
+def _blocos(store: BookStore, split: Optional[str], test_ratio: float, seed: int) -> Iterator[np.ndarray]:
+    """Linhas do store em blocos, ja filtradas pelo split."""
+    for inicio in range(0, len(store), EXPORT_CHUNK_ROWS):
+        linhas = np.arange(inicio, min(inicio + EXPORT_CHUNK_ROWS, len(store)), dtype=np.int64)
+        if split:
+            teste = mascara_teste(store.ids[linhas], test_ratio, seed)
+            linhas = linhas[teste if split == "test" else ~teste]
+        if len(linhas):
+            yield linhas
+
+
+def _csv(store: BookStore, blocos: Iterable[np.ndarray], colunas: List[str]) -> Iterator[bytes]:
+    # Mesmo formato do DataFrame.to_csv (aspas so quando precisa, "\n" no fim da linha)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(colunas)
+    for linhas in blocos:
+        writer.writerows(zip(*[_valores(store, linhas, coluna) for coluna in colunas]))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson(store: BookStore, blocos: Iterable[np.ndarray], colunas: List[str]) -> Iterator[bytes]:
+    for linhas in blocos:
+        valores = [_valores(store, linhas, coluna) for coluna in colunas]
+        yield b"".join(json_bytes(dict(zip(colunas, linha))) + b"\n" for linha in zip(*valores))
+
+
+def _arrow(store: BookStore, blocos: Iterable[np.ndarray], colunas: List[str], formato: str) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {
+        "id": pa.int64(), "price": pa.float64(), "rating": pa.int8(), "availability": pa.int32(),
+        "title": pa.string(), "category": pa.string(), "image_url": pa.string(), "product_url": pa.string(),
+    }
+    schema = pa.schema([(coluna, tipos[coluna]) for coluna in colunas])
+    sink = io.BytesIO()
+    if formato == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    def esvaziar() -> bytes:
+        dados = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return dados
+
+    for linhas in blocos:
+        writer.write_table(pa.table({coluna: _valores(store, linhas, coluna) for coluna in colunas}, schema=schema))
+        yield esvaziar()
+    writer.close()
+    yield esvaziar()
+
+
+def _gzip(blocos: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def gerar_exportacao(
+    store: BookStore,
+    formato: str,
+    colunas: List[str],
+    split: Optional[str] = None,
+    test_ratio: float = 0.2,
+    seed: int = 42,
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    """Gera o arquivo de exportacao em blocos de bytes (para StreamingResponse)."""
+    blocos = _blocos(store, split, test_ratio, seed)
+    if formato == "csv":
+        saida = _csv(store, blocos, colunas)
+    elif formato == "ndjson":
+        saida = _ndjson(store, blocos, colunas)
+    else:
+        saida = _arrow(store, blocos, colunas, formato)
+    return _gzip(saida) if gzip else saida
+
+
+def cabecalhos_exportacao(formato: str, gzip: bool) -> Dict[str, str]:
+    """Content-Disposition (e Content-Encoding) da resposta."""
+    headers = {"Content-Disposition": f"attachment; filename=training_data.{FORMATOS[formato][1]}"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return headers
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Filtro por facetas (/books/query) com bitmaps.
+
+Combinar categoria, rating, disponibilidade e preco exigia varias
+chamadas e a intersecao no cliente. Aqui cada valor de cada dimensao tem
+um bitmap (1 bit por linha do store, empacotado em palavras de 64 bits),
+montado uma vez por carga de dados:
+
+- o filtro de uma dimensao e o OR dos bitmaps dos valores pedidos;
+- o resultado e o AND dos filtros de todas as dimensoes;
+- a contagem de cada faceta e o popcount de (bitmap do valor AND filtros
+  das outras dimensoes), como nos catalogos com facetas: a contagem de
+  uma dimensao ignora o filtro dela mesma, para mostrar quantos livros
+  cada alternativa traria.
+
+O preco entra pelo PriceIndex (faixa min/max) e, nas facetas, em faixas
+de largura FACET_PRICE_WIDTH. Todas as contagens de uma dimensao saem de
+uma unica operacao vetorizada sobre a matriz de bitmaps. Na ordem do
+store, o total e a pagina saem do popcount por palavra: so as palavras
+da pagina pedida sao desempacotadas.
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .indexes import PriceIndex, SortedOrder
+from .store import BookStore
+
+# Largura das faixas de preco da faceta "price"
+FACET_PRICE_WIDTH = float(os.getenv("FACET_PRICE_WIDTH", "10"))
+
+# Acima dessa fracao do catalogo, a faixa de preco vira mascara por
+# comparacao vetorizada (espalhar muitas linhas do indice e mais lento)
+_FRACAO_PRECO_COMPARACAO = 1 / 8
+
+if hasattr(np, "bitwise_count"):
+    def _bits_por_palavra(palavras: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(palavras)
+else:
+    # NumPy < 2.0: tabela de bits por byte
+    _BITS_POR_BYTE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+    def _bits_por_palavra(palavras: np.ndarray) -> np.ndarray:
+        return _BITS_POR_BYTE[palavras.view(np.uint8)].reshape(palavras.shape + (8,)).sum(axis=-1)
+
+
+def _popcount(palavras: np.ndarray) -> np.ndarray:
+    """Bits ligados por linha da matriz de bitmaps."""
+    return _bits_por_palavra(palavras).sum(axis=-1, dtype=np.int64)
+
+
+def _empacotar(mascara: np.ndarray) -> np.ndarray:
+    """Mascara booleana (ultimo eixo = linhas do store) -> bitmap em palavras uint64."""
+    bytes_ = np.packbits(mascara, axis=-1)
+    sobra = -bytes_.shape[-1] % 8
+    if sobra:
+        bytes_ = np.concatenate([bytes_, np.zeros(bytes_.shape[:-1] + (sobra,), dtype=np.uint8)], axis=-1)
+    return np.ascontiguousarray(bytes_).view(np.uint64)
+
+
+class FacetDimension:
+    """Bitmaps de uma dimensao: uma linha da matriz por valor (rotulo)."""
+
+    def __init__(self, rotulos: Sequence[str], codigos: np.ndarray):
+        self.rotulos = list(rotulos)
+        self.bitmaps = np.zeros((len(self.rotulos), (len(codigos) + 63) // 64), dtype=np.uint64)
+        for codigo in range(len(self.rotulos)):
+            self.bitmaps[codigo] = _empacotar(codigos == codigo)
+        self.bitmaps.flags.writeable = False
+
+    def filtro(self, codigos: List[int]) -> np.ndarray:
+        """OR dos bitmaps dos valores pedidos (codigos fora da dimensao nao casam nada)."""
+        validos = [codigo for codigo in codigos if 0 <= codigo < len(self.rotulos)]
+        if not validos:
+            return np.zeros(self.bitmaps.shape[1], dtype=np.uint64)
+        return np.bitwise_or.reduce(self.bitmaps[validos], axis=0)
+
+    def contagens(self, base: Optional[np.ndarray]) -> Dict[str, int]:
+        """Quantas linhas de `base` (None = todas) tem cada valor."""
+        bitmaps = self.bitmaps if base is None else self.bitmaps & base[None, :]
+        return dict(zip(self.rotulos, _popcount(bitmaps).tolist()))
+
+
+class FacetIndex:
+    """
+    Bitmaps de category, rating, availability e faixas de preco do store.
+
+    `consultar` aplica os filtros e devolve (bitmap das linhas que casam,
+    contagens por faceta); `pagina` tira do bitmap o total e as linhas de
+    uma pagina.
+    """
+
+    def __init__(self, store: BookStore, precos: PriceIndex):
+        self.n = len(store)
+        self.precos = precos
+        self.prices = store.prices
+        self.todas = _empacotar(np.ones(self.n, dtype=bool))
+        self._codigo_por_categoria = {nome.lower(): codigo for codigo, nome in enumerate(store.categories)}
+
+        self.ratings = np.unique(store.ratings)
+        self.disponibilidades = np.unique(store.availability)
+        faixas_preco = np.floor(store.prices / FACET_PRICE_WIDTH).astype(np.int64)
+        inicios_faixas = np.unique(faixas_preco)
+
+        self.dimensoes: Dict[str, FacetDimension] = {
+            "category": FacetDimension(store.categories, store.category_codes),
+            "rating": FacetDimension(
+                [str(valor) for valor in self.ratings.tolist()],
+                np.searchsorted(self.ratings, store.ratings),
+            ),
+            "availability": FacetDimension(
+                [str(valor) for valor in self.disponibilidades.tolist()],
+                np.searchsorted(self.disponibilidades, store.availability),
+            ),
+            "price": FacetDimension(
+                [f"{inicio * FACET_PRICE_WIDTH:g}-{(inicio + 1) * FACET_PRICE_WIDTH:g}" for inicio in inicios_faixas.tolist()],
+                np.searchsorted(inicios_faixas, faixas_preco),
+            ),
+        }
+
+    def _codigos(self, valores_dimensao: np.ndarray, pedidos: List[int]) -> List[int]:
+        posicoes = np.searchsorted(valores_dimensao, pedidos)
+        return [
+            int(posicao) for posicao, valor in zip(posicoes.tolist(), pedidos)
+            if posicao < len(valores_dimensao) and valores_dimensao[posicao] == valor
+        ]
+
+    def consultar(
+        self,
+        categories: Optional[List[str]] = None,
+        ratings: Optional[List[int]] = None,
+        availability: Optional[List[int]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> Tuple[np.ndarray, Dict[str, Dict[str, int]]]:
+        """Bitmap das linhas que casam com todos os filtros e contagens das facetas."""
+        filtros: Dict[str, np.ndarray] = {}
+        if categories:
+            codigos = [self._codigo_por_categoria.get(nome.lower(), -1) for nome in categories]
+            filtros["category"] = self.dimensoes["category"].filtro(codigos)
+        if ratings:
+            filtros["rating"] = self.dimensoes["rating"].filtro(self._codigos(self.ratings, ratings))
+        if availability:
+            filtros["availability"] = self.dimensoes["availability"].filtro(self._codigos(self.disponibilidades, availability))
+        if min_price is not None or max_price is not None:
+            minimo = min_price if min_price is not None else -np.inf
+            maximo = max_price if max_price is not None else np.inf
+            linhas = self.precos.faixa(minimo, maximo)
+            if len(linhas) > self.n * _FRACAO_PRECO_COMPARACAO:
+                mascara_preco = (self.prices >= minimo) & (self.prices <= maximo)
+            else:
+                mascara_preco = np.zeros(self.n, dtype=bool)
+                mascara_preco[linhas] = True
+            filtros["price"] = _empacotar(mascara_preco)
+
+        facetas = {}
+        for nome, dimensao in self.dimensoes.items():
+            outros = [filtro for outra, filtro in filtros.items() if outra != nome]
+            base = np.bitwise_and.reduce(outros) if outros else None
+            facetas[nome] = dimensao.contagens(base)
+
+        resultado = np.bitwise_and.reduce(list(filtros.values())) if filtros else self.todas
+        return resultado, facetas
+
+    def pagina(
+        self,
+        resultado: np.ndarray,
+        inicio: int,
+        fim: int,
+        ordem: Optional[SortedOrder] = None,
+        order: str = "asc",
+    ) -> Tuple[int, np.ndarray]:
+        """
+        (total de linhas no bitmap, linhas [inicio:fim] do resultado), na
+        ordem do store ou na de `ordem` (crescente ou, com desc, inversa).
+        """
+        if ordem is not None:
+            mascara = np.unpackbits(resultado.view(np.uint8), count=self.n).view(bool)
+            linhas = ordem.filtrar(mascara, order)
+            return len(linhas), linhas[inicio:fim]
+
+        # Ordem do store: acha as palavras onde a pagina comeca e termina
+        # pela soma acumulada do popcount e desempacota so elas
+        acumulado = np.cumsum(_bits_por_palavra(resultado), dtype=np.int64)
+        total = int(acumulado[-1]) if len(acumulado) else 0
+        fim = min(fim, total)
+        if inicio >= fim:
+            return total, np.zeros(0, dtype=np.int64)
+        primeira = int(np.searchsorted(acumulado, inicio, side="right"))
+        ultima = int(np.searchsorted(acumulado, fim - 1, side="right"))
+        bits = np.unpackbits(resultado[primeira:ultima + 1].view(np.uint8)).view(bool)
+        antes = int(acumulado[primeira - 1]) if primeira else 0
+        linhas = bits.nonzero()[0] + primeira * 64
+        return total, linhas[inicio - antes:fim - antes]
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Indices de ordenacao/filtro numerico sobre o BookStore.
+
+Cada indice e montado uma vez por carga de dados e guarda permutacoes
+(arrays de linhas do store) ja ordenadas. Assim as consultas viram
+buscas binarias e fatias, sem ordenar nada por requisicao.
+"""
+
+import bisect
+import threading
+from typing import Any, Dict
+
+import numpy as np
+
+from .store import BookStore
+
+# Campos de ordenacao da listagem (/books?sort=) -> coluna do store usada como chave
+CAMPOS_ORDENACAO = {"id": "ids", "price": "prices", "rating": "ratings", "title": "title_rank"}
+
+
+class PriceIndex:
+    """
+    Permutacao das linhas ordenada por preco (crescente), titulo como desempate.
+
+    Uma consulta por faixa de preco vira duas buscas binarias e uma fatia.
+    """
+
+    def __init__(self, store: BookStore):
+        self.ordem = np.lexsort((store.title_rank, store.prices))
+        self.precos = store.prices[self.ordem]
+        self.ordem.flags.writeable = False
+        self.precos.flags.writeable = False
+
+    def faixa(self, minimo: float, maximo: float) -> np.ndarray:
+        """Linhas com minimo <= price <= maximo, ja na ordem do indice."""
+        inicio = np.searchsorted(self.precos, minimo, side="left")
+        fim = np.searchsorted(self.precos, maximo, side="right")
+        return self.ordem[inicio:fim]
+
+
+class TopRatedIndex:
+    """
+    Ordem dos "melhores avaliados": rating desc, preco desc, titulo asc.
+
+    Alem da ordem geral, guarda a mesma ordem separada por categoria
+    (formato CSR: as linhas da categoria c ficam em
+    por_categoria[offsets[c]:offsets[c + 1]]). Como o rating e a chave
+    principal, os livros com rating >= X sao sempre um prefixo da ordem,
+    entao o filtro min_rating e so uma busca binaria.
+    """
+
+    def __init__(self, store: BookStore):
+        # np.lexsort usa a ultima chave como principal
+        self.ordem = np.lexsort((store.title_rank, -store.prices, -store.ratings))
+
+        # Separacao estavel por categoria mantem a ordem do ranking dentro de cada uma
+        codigos = store.category_codes[self.ordem]
+        self.por_categoria = self.ordem[np.argsort(codigos, kind="stable")]
+        self.offsets = np.zeros(len(store.categories) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codigos, minlength=len(store.categories)), out=self.offsets[1:])
+
+        # Ratings negados (crescentes) para o searchsorted do min_rating
+        self._ratings_negados = -store.ratings[self.ordem].astype(np.int16)
+        self._ratings_negados_categoria = -store.ratings[self.por_categoria].astype(np.int16)
+
+        self._codigo_por_categoria = {nome.lower(): codigo for codigo, nome in enumerate(store.categories)}
+
+        for array in (self.ordem, self.por_categoria, self.offsets, self._ratings_negados, self._ratings_negados_categoria):
+            array.flags.writeable = False
+
+    def codigo_categoria(self, nome: str) -> int:
+        """Codigo da categoria pelo nome exato (case insensitive), ou -1."""
+        return self._codigo_por_categoria.get(nome.lower(), -1)
+
+    def top(self, limit: int, codigo_categoria: int = None, min_rating: int = None) -> np.ndarray:
+        """Ate `limit` linhas na ordem do ranking, com os filtros opcionais."""
+        if codigo_categoria is None:
+            ordem, ratings_negados = self.ordem, self._ratings_negados
+        else:
+            inicio, fim = self.offsets[codigo_categoria], self.offsets[codigo_categoria + 1]
+            ordem = self.por_categoria[inicio:fim]
+            ratings_negados = self._ratings_negados_categoria[inicio:fim]
+
+        fim = limit
+        if min_rating is not None:
+            fim = min(limit, int(np.searchsorted(ratings_negados, -min_rating, side="right")))
+        return ordem[:fim]
+
+
+class _TitulosNaOrdem:
+    """Sequencia (so leitura) dos titulos na ordem de uma permutacao, para o bisect."""
+
+    def __init__(self, store: BookStore, ordem: np.ndarray):
+        self.store = store
+        self.ordem = ordem
+
+    def __len__(self) -> int:
+        return len(self.ordem)
+
+    def __getitem__(self, posicao: int) -> str:
+        return self.store.titles[int(self.ordem[posicao])]
+
+
+class SortedOrder:
+    """
+    Permutacao das linhas ordenada por um campo (crescente), id como desempate.
+
+    Com o desempate, (valor, id) e uma chave unica: a posicao de qualquer
+    chave e encontrada por busca binaria, mesmo que ela venha de outra
+    versao dos dados (paginacao por cursor / keyset).
+    """
+
+    def __init__(self, store: BookStore, campo: str):
+        self.store = store
+        self.campo = campo
+        chave = getattr(store, CAMPOS_ORDENACAO[campo])
+        if campo == "id":
+            self.ordem = np.argsort(store.ids, kind="stable")
+        else:
+            self.ordem = np.lexsort((store.ids, chave))
+        self.valores = chave[self.ordem]
+        self.ids = store.ids[self.ordem]
+        for array in (self.ordem, self.valores, self.ids):
+            array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.ordem)
+
+    def chave(self, posicao: int) -> tuple:
+        """(valor, id) da linha na posicao, em tipos Python (o titulo em texto, nao o rank)."""
+        linha = int(self.ordem[posicao])
+        if self.campo == "title":
+            valor = self.store.titles[linha]
+        else:
+            valor = self.valores[posicao].item()
+        return valor, int(self.ids[posicao])
+
+    def filtrar(self, mascara: np.ndarray, order: str = "asc") -> np.ndarray:
+        """Linhas com mascara[linha] True, na ordem do indice (ou inversa, com desc)."""
+        linhas = self.ordem[mascara[self.ordem]]
+        return linhas if order == "asc" else linhas[::-1]
+
+    def _empates(self, valor: Any) -> tuple:
+        """Intervalo [inicio, fim) das posicoes com esse valor no campo."""
+        if self.campo == "title":
+            titulos = _TitulosNaOrdem(self.store, self.ordem)
+            return bisect.bisect_left(titulos, valor), bisect.bisect_right(titulos, valor)
+        return (
+            int(np.searchsorted(self.valores, valor, side="left")),
+            int(np.searchsorted(self.valores, valor, side="right")),
+        )
+
+    def posicao(self, valor: Any, id_livro: int, depois: bool) -> int:
+        """
+        Quantas linhas tem chave menor que (valor, id) (ou menor ou igual,
+        com depois=True). Funciona mesmo se a chave nao existir mais.
+        """
+        inicio, fim = self._empates(valor)
+        lado = "right" if depois else "left"
+        return inicio + int(np.searchsorted(self.ids[inicio:fim], id_livro, side=lado))
+
+
+class SortOrders:
+    """
+    Ordens da listagem por campo, montadas sob demanda e guardadas.
+
+    O snapshot cria o objeto vazio (nao atrasa a carga); a primeira
+    listagem ordenada por cada campo monta a permutacao.
+    """
+
+    def __init__(self, store: BookStore):
+        self.store = store
+        self._ordens: Dict[str, SortedOrder] = {}
+        self._lock = threading.Lock()
+
+    def ordem(self, campo: str) -> SortedOrder:
+        with self._lock:
+            if campo not in self._ordens:
+                self._ordens[campo] = SortedOrder(self.store, campo)
+            return self._ordens[campo]
+
+    def montar_todas(self) -> None:
+        """Monta as ordens de todos os campos (antes de compartilhar o snapshot)."""
+        for campo in CAMPOS_ORDENACAO:
+            self.ordem(campo)
+
+    def __getstate__(self):
+        return {"store": self.store, "_ordens": dict(self._ordens)}
+
+    def __setstate__(self, estado):
+        self.store = estado["store"]
+        self._ordens = estado["_ordens"]
+        self._lock = threading.Lock()
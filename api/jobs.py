@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Execucao do scraping em segundo plano.
+
+O crawl completo demora bem mais que o timeout de qualquer cliente HTTP,
+entao o endpoint de trigger so enfileira um job e devolve o id na hora.
+O job roda em uma thread propria (no maximo um por vez) e o progresso
+pode ser acompanhado pelo endpoint /scraping/jobs/{id}.
+"""
+
+import datetime
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Quantos jobs finalizados guardamos para consulta
+MAX_JOBS_HISTORICO = 20
+
+
+class ScrapingJob:
+    """
+    Estado e progresso de uma execucao do scraper.
+
+    Os contadores sao atualizados pela thread do job e lidos pelos
+    endpoints; cada campo e atualizado com uma atribuicao simples.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.created_at = datetime.datetime.utcnow()
+        self.started_at: Optional[datetime.datetime] = None
+        self.finished_at: Optional[datetime.datetime] = None
+        self._inicio = None
+        self._duracao = None
+        self.categories_total = 0
+        self.categories_done = 0
+        self.pages_fetched = 0
+        self.pages_unchanged = 0
+        self.books_parsed = 0
+        self.total_books: Optional[int] = None
+        self.data_version: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ativo(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def atualizar_progresso(self, **contadores: int) -> None:
+        """Callback passado ao scraper (categories_total, categories_done, pages_fetched, pages_unchanged, books_parsed)."""
+        for nome, valor in contadores.items():
+            setattr(self, nome, valor)
+
+    def iniciar(self) -> None:
+        self.status = "running"
+        self.started_at = datetime.datetime.utcnow()
+        self._inicio = time.monotonic()
+
+    def finalizar(self, erro: Optional[str] = None) -> None:
+        self._duracao = time.monotonic() - self._inicio if self._inicio is not None else 0.0
+        self.finished_at = datetime.datetime.utcnow()
+        self.error = erro
+        self.status = "failed" if erro else "succeeded"
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self._duracao is not None:
+            return round(self._duracao, 3)
+        if self._inicio is None:
+            return 0.0
+        return round(time.monotonic() - self._inicio, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": self.elapsed_seconds,
+            "categories_total": self.categories_total,
+            "categories_done": self.categories_done,
+            "pages_fetched": self.pages_fetched,
+            "pages_unchanged": self.pages_unchanged,
+            "books_parsed": self.books_parsed,
+            "total_books": self.total_books,
+            "data_version": self.data_version,
+            "error": self.error,
+        }
+
+
+class ScrapingJobManager:
+    """
+    Enfileira e executa jobs de scraping, um de cada vez.
+
+    `executar` recebe o job e faz o trabalho (scraper + reload dos dados);
+    qualquer excecao marca o job como falho.
+    """
+
+    def __init__(self, executar: Callable[[ScrapingJob], None]):
+        self._executar = executar
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, ScrapingJob]" = OrderedDict()
+        self._ativo: Optional[ScrapingJob] = None
+
+    def submeter(self) -> Tuple[ScrapingJob, bool]:
+        """
+        Cria e inicia um job novo.
+
+        Se ja houver um job em andamento, nada e criado e o job ativo e
+        retornado com o segundo valor False.
+        """
+        with self._lock:
+            if self._ativo is not None and self._ativo.ativo:
+                return self._ativo, False
+
+            job = ScrapingJob()
+            self._jobs[job.id] = job
+            self._ativo = job
+            # Descarta o historico mais antigo (o job ativo e sempre o mais novo)
+            while len(self._jobs) > MAX_JOBS_HISTORICO:
+                self._jobs.popitem(last=False)
+
+        thread = threading.Thread(target=self._rodar, args=(job,), name=f"scraping-{job.id}", daemon=True)
+        thread.start()
+        return job, True
+
+    def obter(self, job_id: str) -> Optional[ScrapingJob]:
+        return self._jobs.get(job_id)
+
+    def _rodar(self, job: ScrapingJob) -> None:
+        job.iniciar()
+        try:
+            self._executar(job)
+        except Exception as e:
+            job.finalizar(erro=str(e))
+        else:
+            job.finalizar()
@@ -1,55 +1,96 @@
-
 """
 Arquivo principal da API - Tech Challenge Fase 1
 
 Aqui definimos os endpoints da nossa API REST usando FastAPI.
-A API le os dados do CSV gerado pelo scraper e expoe para consulta.
+A API le os dados gerados pelo scraper e expoe para consulta.
 
 Para rodar: uvicorn api.main:app --reload
+
+Importar este modulo e barato: os dados sao carregados em segundo plano
+no startup (lifespan) e modulos pesados (scraper, pandas, jwt) so sao
+importados quando alguma rota precisa deles.
 """
 
-from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, HTTPException, Query, Depends, Security, status
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional, Dict, Any
+from fastapi import FastAPI, Header, HTTPException, Query, Depends, Security, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from fastapi.responses import Response
-import pandas as pd
-import jwt
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import datetime
-import io
+import math
 import os
+import threading
 
 # Importando nossos modulos locais
-from .models import Book, StatsOverview, CategoryStats, LoginRequest, Token
-from .utils import carregar_dados_livros
-from scripts.scraper import run_scraper
+from .models import Book, BookBatchRequest, BookBatchResponse, BookQueryResponse, SuggestResponse, StatsOverview, CategoryStats, LoginRequest, Token, TokenCacheMetrics, ScrapingJobStatus, FeatureMatrixResponse, FeatureSchema, PredictionResponse, PredictionBatchRequest, PredictionBatchResponse, PredictionBatchingMetrics
+from .dataset import obter_snapshot, recarregar_dados
+from .cache import ETagMiddleware
+from .stats import json_bytes
+from .export import FORMATOS, FormatoIndisponivel, cabecalhos_exportacao, gerar_exportacao, negociar_formato, validar_colunas, pyarrow_disponivel
+from .ml import FORMATOS_FEATURES
+from .batching import MicroBatcher, PREDICTION_MAX_BATCH_SIZE, PREDICTION_MAX_WAIT_MS
+from .jobs import ScrapingJob, ScrapingJobManager
+from .auth import TokenCache
+from .pagination import decodificar_cursor, pagina_ordenada
 
 # Configurações de Segurança (JWT)
 SECRET_KEY = os.getenv("JWT_SECRET", "dev-secret-change-me")
 ALGORITHM = "HS256"
 security = HTTPBearer()
 
+# Payloads dos tokens ja verificados, ate o exp de cada um (ver auth.py)
+TOKEN_CACHE = TokenCache()
+
+
+def carregar_dados_iniciais():
+    """Primeira carga dos dados (roda em uma thread disparada no startup)."""
+    try:
+        recarregar_dados()
+    except Exception as e:
+        print(f"ERRO na carga inicial dos dados: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup da API.
+    
+    Carregamos os dados na memoria quando a API inicia, mas em segundo plano:
+    o servidor ja responde (liveness) enquanto o store, os indices e as
+    estatisticas sao montados. Quando o snapshot e publicado (ver dataset.py)
+    o /api/v1/health/ready passa a responder 200.
+    """
+    threading.Thread(target=carregar_dados_iniciais, name="carga-inicial", daemon=True).start()
+    yield
+
 
 # Criando a instancia da aplicacao FastAPI
 app = FastAPI(
     title="Tech Challenge Books API",
     description="API para consulta de livros extraidos do site Books to Scrape.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Carregamos os dados na memoria quando a API inicia
-LIVROS_DB = carregar_dados_livros()
+# ETag + If-None-Match (304) nas rotas de leitura (ver cache.py)
+app.add_middleware(ETagMiddleware)
+
 
-# Inicializa DataFrame para analises
-# Se LIVROS_DB estiver vazio, cria DF vazio com colunas corretas para evitar erros
-if LIVROS_DB:
-    LIVROS_DF = pd.DataFrame(LIVROS_DB)
-else:
-    LIVROS_DF = pd.DataFrame(columns=["id", "title", "price", "rating", "availability", "category", "image_url", "product_url"])
+def resposta_json(conteudo: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Resposta com JSON ja pronto (bytes pre-codificados do snapshot).
+    
+    Quando a rota devolve um Response direto, o FastAPI nao passa o
+    conteudo pelo response_model de novo; o modelo continua so no OpenAPI.
+    """
+    return Response(content=conteudo, media_type="application/json", headers=headers)
 
 # SEGURANÇA E AUTENTICAÇÃO (JWT)
 
 def create_access_token(data: dict, expires_delta: datetime.timedelta = datetime.timedelta(hours=1)):
     """Gera um token JWT com tempo de expiração."""
+    import jwt
+
     to_encode = data.copy()
     expire = datetime.datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
@@ -57,11 +98,17 @@ def create_access_token(data: dict, expires_delta: datetime.timedelta = datetime
     return encoded_jwt
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
-    """Verifica se o token JWT é válido."""
+    """
+    Verifica se o token JWT é válido.
+    
+    Tokens ja verificados vem do TOKEN_CACHE ate expirarem; so o primeiro
+    uso de cada token (ou depois de trocar o SECRET_KEY) roda o jwt.decode.
+    """
+    import jwt
+
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return TOKEN_CACHE.verificar(token, SECRET_KEY, lambda token: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]))
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expirado")
     except jwt.InvalidTokenError:
@@ -90,118 +137,292 @@ def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security)
     new_token = create_access_token({"sub": payload["sub"]})
     return {"access_token": new_token, "token_type": "bearer"}
 
-@app.post("/api/v1/scraping/trigger", summary="Executar Scraping", description="Dispara o processo de scraping e recarrega os dados.")
+@app.get("/api/v1/auth/metrics", response_model=TokenCacheMetrics, summary="Métricas do Cache de Tokens", description="Acertos, falhas e descartes do cache de tokens JWT verificados.")
+def auth_metrics():
+    """
+    Metricas do cache de tokens verificados: entradas, hits/misses e
+    quantas entradas sairam por expiracao ou pelo limite de tamanho.
+    """
+    return TOKEN_CACHE.metricas()
+
+def executar_job_scraping(job: ScrapingJob):
+    """
+    Trabalho de um job de scraping (roda na thread do job).
+    
+    1. Executa o scraper.py, reportando o progresso no job
+    2. Recarrega os dados em memória (publica um novo snapshot)
+    
+    O scraper (requests, bs4, lxml, pandas) so e importado aqui, na
+    primeira execucao, para nao pesar na subida da API.
+    """
+    from scripts.scraper import run_scraper
+
+    job.total_books = run_scraper(on_progress=job.atualizar_progresso)
+    
+    # O snapshot novo (com indices) e montado e publicado de uma vez
+    snapshot = recarregar_dados()
+    job.data_version = snapshot.version
+
+
+# Gerenciador dos jobs de scraping (no maximo um rodando por vez)
+SCRAPING_JOBS = ScrapingJobManager(executar_job_scraping)
+
+
+@app.post("/api/v1/scraping/trigger", response_model=ScrapingJobStatus, status_code=status.HTTP_202_ACCEPTED, summary="Executar Scraping", description="Enfileira o scraping em segundo plano e retorna o id do job.")
 def trigger_scraping(payload: dict = Depends(verify_token)):
     """
     Endpoint protegido para rodar o scraper sob demanda.
     Requer autenticação JWT.
     
-    1. Executa o scraper.py
-    2. Recarrega os dados em memória (LIVROS_DB e LIVROS_DF)
+    O scraping roda em segundo plano: a resposta sai na hora com o id
+    do job, e o progresso e consultado em /api/v1/scraping/jobs/{job_id}.
+    Quando o job termina com sucesso, os dados sao recarregados.
+    
+    So um job roda por vez: se ja houver um em andamento, retorna 409
+    com o id do job ativo.
     """
-    try:
-        # Executa o scraper
-        run_scraper()
-        
-        # Recarrega dados
-        global LIVROS_DB, LIVROS_DF
-        LIVROS_DB = carregar_dados_livros()
-        if LIVROS_DB:
-            LIVROS_DF = pd.DataFrame(LIVROS_DB)
-        else:
-            LIVROS_DF = pd.DataFrame(columns=["id", "title", "price", "rating", "availability", "category", "image_url", "product_url"])
-            
-        return {"status": "success", "message": "Scraping finalizado e dados recarregados.", "total_books": len(LIVROS_DB)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao executar scraping: {str(e)}")
+    job, criado = SCRAPING_JOBS.submeter()
+    if not criado:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Ja existe um scraping em andamento.", "job_id": job.id}
+        )
+    return job.to_dict()
+
+
+@app.get("/api/v1/scraping/jobs/{job_id}", response_model=ScrapingJobStatus, summary="Status do Scraping", description="Retorna o progresso de um job de scraping.")
+def obter_job_scraping(job_id: str, payload: dict = Depends(verify_token)):
+    """
+    Retorna o estado de um job de scraping: categorias processadas,
+    paginas baixadas, livros extraidos e tempo decorrido.
+    Requer autenticação JWT.
+    """
+    job = SCRAPING_JOBS.obter(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job nao encontrado")
+    return job.to_dict()
 
 
 # ENDPOINTS MACHINE LEARNING
 
 
-@app.get("/api/v1/ml/features", summary="Obter Features", description="Retorna dados formatados para treinamento de modelos.")
-def get_ml_features():
-    """
-    Retorna os dados dos livros formatados como features numéricas.
-    Seleciona: price, rating, availability.
+@app.get("/api/v1/ml/features", response_model=FeatureMatrixResponse, summary="Obter Features", description="Matriz numérica de features (price, rating e availability normalizados + categoria one-hot ou ordinal), em JSON, NPZ ou Arrow.")
+def get_ml_features(
+    encoding: Literal["onehot", "ordinal"] = Query("onehot", description="Codificacao da categoria"),
+    format: Literal["json", "npz", "arrow"] = Query("json", description="json, npz (numpy) ou arrow (Arrow IPC, requer pyarrow)")
+):
     """
-    if LIVROS_DF.empty:
-        return []
+    Retorna os livros como uma matriz densa de features numericas.
+    
+    - price, rating, availability: normalizados para [0, 1] (min-max)
+    - category: one-hot (uma coluna por categoria) ou ordinal (codigo)
     
-    # Seleciona colunas relevantes para um modelo hipotético
-    features = LIVROS_DF[["id", "price", "rating", "availability", "category"]].copy()
+    A matriz e o arquivo de cada formato sao calculados uma vez por versao
+    dos dados. Em npz, np.load devolve os arrays "ids", "features" e
+    "columns" sem decodificacao. Parametros da normalizacao em /ml/features/schema.
+    """
+    if format == "arrow" and not pyarrow_disponivel():
+        raise HTTPException(status_code=406, detail="O formato arrow requer o pacote pyarrow, que nao esta instalado.")
     
-    # Exemplo de normalização simples (mock)
-    return features.to_dict(orient="records")
+    matriz = obter_snapshot().ml.matriz(encoding)
+    media_type, extensao = FORMATOS_FEATURES[format]
+    headers = {"X-Data-Fingerprint": matriz.fingerprint}
+    if format != "json":
+        headers["Content-Disposition"] = f"attachment; filename=features_{encoding}.{extensao}"
+    return Response(content=matriz.serializar(format), media_type=media_type, headers=headers)
+
 
-@app.get("/api/v1/ml/training-data", summary="Download Dataset", description="Baixa o dataset completo em formato CSV.")
-def get_training_data():
+@app.get("/api/v1/ml/features/schema", response_model=FeatureSchema, summary="Schema das Features", description="Colunas da matriz de features e parâmetros da normalização.")
+def get_ml_features_schema(encoding: Literal["onehot", "ordinal"] = Query("onehot", description="Codificacao da categoria")):
     """
-    Retorna o CSV completo dos livros para ser usado em treinamento.
+    Descreve a matriz do /ml/features: nome, origem e transformacao de
+    cada coluna (com min/max da normalizacao), categorias e dtype.
+    """
+    return obter_snapshot().ml.matriz(encoding).schema
+
+@app.get("/api/v1/ml/training-data", summary="Download Dataset", description="Baixa o dataset (CSV, NDJSON, Arrow ou Parquet) em streaming, com projeção de colunas e split treino/teste.")
+def get_training_data(
+    format: Optional[Literal["csv", "ndjson", "arrow", "parquet"]] = Query(None, description="Formato do arquivo (sem ele, usa o header Accept; padrao CSV)"),
+    columns: Optional[str] = Query(None, description="Colunas separadas por virgula (ex: id,price,rating)"),
+    split: Optional[Literal["train", "test"]] = Query(None, description="Exporta so o conjunto de treino ou de teste"),
+    test_ratio: float = Query(0.2, gt=0.0, lt=1.0, description="Fracao dos livros no conjunto de teste"),
+    seed: int = Query(42, ge=0, description="Seed do split (mesma seed = mesmo split)"),
+    compression: Optional[Literal["none", "gzip"]] = Query(None, description="Compressao (sem ele, usa o header Accept-Encoding)"),
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
     """
-    if LIVROS_DF.empty:
+    Retorna o dataset dos livros para ser usado em treinamento.
+    
+    O arquivo e gerado em blocos direto do store (StreamingResponse), sem
+    montar o arquivo inteiro em memoria. O split e por hash do id do livro,
+    entao e deterministico: a mesma seed e test_ratio sempre separam os
+    mesmos livros. Arrow/Parquet precisam do pyarrow (406 se nao houver).
+    """
+    store = obter_snapshot().store
+    if len(store) == 0:
         raise HTTPException(status_code=404, detail="Sem dados para treinamento.")
-        
-    stream = io.StringIO()
-    LIVROS_DF.to_csv(stream, index=False)
-    response = Response(content=stream.getvalue(), media_type="text/csv")
-    response.headers["Content-Disposition"] = "attachment; filename=training_data.csv"
-    return response
+    
+    try:
+        colunas = validar_colunas(columns)
+        formato = negociar_formato(format, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FormatoIndisponivel as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    
+    if compression:
+        gzip = compression == "gzip"
+    else:
+        gzip = "gzip" in (accept_encoding or "").lower()
+    
+    return StreamingResponse(
+        gerar_exportacao(store, formato, colunas, split, test_ratio, seed, gzip),
+        media_type=FORMATOS[formato][0],
+        headers=cabecalhos_exportacao(formato, gzip)
+    )
+
+def obter_modelo():
+    """Modelo treinado no snapshot atual (503 se ainda nao ha dados)."""
+    try:
+        return obter_snapshot().ml.modelo()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def prever_lote(itens: List[tuple]) -> List[Dict[str, Any]]:
+    """Pontua um lote de predicoes individuais (price, rating, availability) de uma vez."""
+    modelo = obter_snapshot().ml.modelo()
+    price, rating, availability = zip(*itens)
+    codigos, confiancas = modelo.prever(price, rating, availability)
+    return [
+        {"predicted_category": modelo.categories[codigo], "confidence": confianca, "model_version": modelo.version}
+        for codigo, confianca in zip(codigos.tolist(), confiancas.tolist())
+    ]
 
-@app.post("/api/v1/ml/predictions", summary="Simular Predição", description="Recebe dados de um livro e retorna uma categoria prevista (Mock).")
-def predict_category(book_features: Dict[str, Any]):
-    """
-    Simula uma predição de categoria baseada no preço e rating.
-    (Mock para fins didáticos).
+
+# Junta as predicoes individuais concorrentes em lotes (ver batching.py)
+PREDICTION_BATCHER = MicroBatcher(prever_lote, PREDICTION_MAX_BATCH_SIZE, PREDICTION_MAX_WAIT_MS)
+
+
+@app.post("/api/v1/ml/predictions", response_model=PredictionResponse, summary="Predição", description="Recebe price, rating e availability de um livro e retorna a categoria prevista.")
+async def predict_category(book_features: Dict[str, Any]):
     """
-    price = book_features.get("price", 0)
-    rating = book_features.get("rating", 0)
+    Preve a categoria de um livro a partir de price, rating e availability
+    (padrao 1), com o modelo de centroides treinado nos dados carregados.
     
-    # Lógica "Dummy" de predição
-    predicted = "Fiction"
-    confidence = 0.85
+    Chamadas concorrentes sao agrupadas pelo micro-batcher e pontuadas
+    juntas (ate PREDICTION_MAX_BATCH_SIZE por lote, esperando no maximo
+    PREDICTION_MAX_WAIT_MS); metricas em /ml/predictions/metrics.
+    """
+    try:
+        price = float(book_features.get("price", 0))
+        rating = float(book_features.get("rating", 0))
+        availability = float(book_features.get("availability", 1))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="price, rating e availability precisam ser numericos")
+    if not all(math.isfinite(valor) for valor in (price, rating, availability)):
+        raise HTTPException(status_code=422, detail="price, rating e availability precisam ser finitos")
     
-    if price > 50:
-        predicted = "Nonfiction"
-        confidence = 0.92
+    try:
+        return await PREDICTION_BATCHER.submeter((price, rating, availability))
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/api/v1/ml/predictions/metrics", response_model=PredictionBatchingMetrics, summary="Métricas do Micro-batching", description="Fila e distribuição do tamanho dos lotes das predições individuais.")
+def predict_metrics():
+    """
+    Metricas do micro-batching: profundidade da fila (atual e maxima),
+    quantidade de lotes e predicoes e histograma do tamanho dos lotes.
+    """
+    return PREDICTION_BATCHER.metricas()
+
+
+@app.post("/api/v1/ml/predictions/batch", response_model=PredictionBatchResponse, summary="Predição em Lote", description="Prevê a categoria de até 100.000 livros em uma chamada (entrada e saída em colunas).")
+def predict_category_batch(request: PredictionBatchRequest):
+    """
+    Preve a categoria de varios livros de uma vez.
     
-    if rating == 5:
-        confidence = 0.99
-        
-    return {
-        "predicted_category": predicted,
-        "confidence": confidence,
-        "model_version": "v1.0-mock"
-    }
+    Todas as linhas sao pontuadas em uma unica operacao matricial, entao o
+    custo por linha e so a conta (nao o overhead de uma chamada HTTP).
+    """
+    modelo = obter_modelo()
+    availability = request.availability if request.availability is not None else [1.0] * len(request.price)
+    codigos, confiancas = modelo.prever(request.price, request.rating, availability)
+    categorias = modelo.categories
+    return resposta_json(json_bytes({
+        "model_version": modelo.version,
+        "predicted_category": [categorias[codigo] for codigo in codigos.tolist()],
+        "confidence": confiancas.tolist()
+    }))
 
 
 # ENDPOINTS OBRIGATORIOS E INSIGHTS
 
 
-@app.get("/api/v1/books", response_model=List[Book], summary="Listar Livros", description="Retorna a lista de todos os livros disponíveis com paginação.")
-def listar_livros(page: int = Query(1, gt=0), size: int = Query(50, gt=0, le=100)):
+@app.get("/api/v1/books", response_model=List[Book], summary="Listar Livros", description="Retorna a lista de todos os livros disponíveis com paginação (por página ou por cursor, com ordenação).")
+def listar_livros(
+    page: int = Query(1, gt=0),
+    size: int = Query(50, gt=0, le=100),
+    sort: Optional[Literal["id", "price", "rating", "title"]] = Query(None, description="Campo de ordenacao (id como desempate); sem ele, ordem do scraping"),
+    order: Literal["asc", "desc"] = Query("asc", description="Direcao da ordenacao"),
+    cursor: Optional[str] = Query(None, description="Cursor da proxima pagina (header X-Next-Cursor da resposta anterior)")
+):
     """
     Retorna a lista de livros com paginacao.
     
     Parametros:
     - page: numero da pagina (padrao 1)
     - size: quantidade de itens por pagina (padrao 50, maximo 100)
+    - sort/order: ordenacao por id, price, rating ou title
+    - cursor: continua a listagem de onde a pagina anterior parou
     
     Fiz a paginacao para nao sobrecarregar a resposta caso tenhamos
-    muitos livros no banco de dados.
-    """
-    # Calculo dos indices para fatiar a lista
-    inicio = (page - 1) * size
-    fim = inicio + size
+    muitos livros no banco de dados. O total de livros vai no header
+    X-Total-Count.
     
-    # Retorna a fatia da lista correspondente a pagina
-    return LIVROS_DB[inicio:fim]
+    Com sort (ou cursor), a resposta traz o header X-Next-Cursor enquanto
+    houver mais paginas. O cursor guarda o ultimo livro visto (ver
+    pagination.py): mesmo que os dados sejam recarregados no meio, a
+    proxima pagina continua depois dele, sem repetir nem pular livros.
+    O cursor tem prioridade sobre page; sem sort, a ordenacao vem do
+    cursor, e com sort ela precisa ser a mesma do cursor.
+    """
+    snapshot = obter_snapshot()
+    headers = {"X-Total-Count": str(len(snapshot.store))}
+
+    dados_cursor = None
+    if cursor:
+        try:
+            dados_cursor = decodificar_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if sort is None:
+            sort, order = dados_cursor["s"], dados_cursor["o"]
+        elif (dados_cursor["s"], dados_cursor["o"]) != (sort, order):
+            raise HTTPException(status_code=400, detail="O cursor foi gerado com outro sort/order")
+
+    if sort is None:
+        # Calculo dos indices para fatiar a lista
+        inicio = (page - 1) * size
+        fim = inicio + size
+        
+        # Retorna a fatia correspondente a pagina (JSON ja pronto, um unico slice)
+        return resposta_json(snapshot.payloads.faixa(inicio, fim), headers)
+
+    linhas, proximo = pagina_ordenada(snapshot.ordens.ordem(sort), snapshot.fingerprint, order, size, page, dados_cursor)
+    if proximo:
+        headers["X-Next-Cursor"] = proximo
+    return resposta_json(snapshot.payloads.lista(linhas), headers)
 
 
 @app.get("/api/v1/books/search", response_model=List[Book], summary="Buscar Livros", description="Pesquisa livros por título ou categoria.")
 def buscar_livros(
     title: Optional[str] = None, 
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    limit: int = Query(50, gt=0, le=100, description="Quantidade maxima de resultados"),
+    offset: int = Query(0, ge=0, description="Quantos resultados pular")
 ):
     """
     Busca livros por titulo ou categoria.
@@ -209,37 +430,49 @@ def buscar_livros(
     Parametros:
     - title: parte do titulo do livro (case insensitive)
     - category: nome exato ou parte da categoria
+    - limit/offset: paginacao dos resultados (padrao 50, maximo 100)
     
     Se nenhum parametro for passado, retorna lista vazia para nao
-    trazer o banco todo sem querer.
+    trazer o banco todo sem querer. O total de resultados encontrados
+    vai no header X-Total-Count.
     """
     # Se nao passar nada, retorna lista vazia
     if not title and not category:
-        return []
+        return resposta_json(b"[]", {"X-Total-Count": "0"})
     
-    resultado = []
-    
-    # Itera sobre todos os livros para filtrar
-    for livro in LIVROS_DB:
-        match_titulo = True
-        match_categoria = True
-        
-        # Verifica filtro de titulo (se foi passado)
-        if title:
-            # Converte ambos para minusculo para busca case-insensitive
-            if title.lower() not in livro["title"].lower():
-                match_titulo = False
-        
-        # Verifica filtro de categoria (se foi passado)
-        if category:
-            if category.lower() not in livro["category"].lower():
-                match_categoria = False
-        
-        # Se atendeu a todos os filtros passados, adiciona na lista
-        if match_titulo and match_categoria:
-            resultado.append(livro)
+    # Consulta o indice de trigramas (mesma semantica do "in" case insensitive)
+    snapshot = obter_snapshot()
+    linhas = snapshot.busca.buscar(title=title, category=category)
             
-    return resultado
+    return resposta_json(snapshot.payloads.lista(linhas[offset:offset + limit]), {"X-Total-Count": str(len(linhas))})
+
+
+@app.get("/api/v1/books/suggest", response_model=SuggestResponse, summary="Autocomplete", description="Sugere títulos e categorias que começam com o texto digitado.")
+def sugerir_livros(
+    q: str = Query(..., min_length=1, description="Texto digitado pelo usuario"),
+    limit: int = Query(5, gt=0, le=10, description="Quantidade maxima de sugestoes de cada tipo")
+):
+    """
+    Autocomplete de titulos e categorias.
+    
+    Casa o texto com o inicio de qualquer palavra do titulo/categoria
+    (case insensitive). Titulos vem ordenados por rating e categorias
+    pela quantidade de livros. Usa o indice de prefixos montado na carga,
+    entao pode ser chamado a cada tecla digitada.
+    """
+    indice = obter_snapshot().busca
+    store = indice.store
+    linhas = indice.sugestoes_titulos.sugerir(q, limit)
+    codigos = indice.sugestoes_categorias.sugerir(q, limit)
+    
+    return {
+        "query": q,
+        "titles": [
+            {"id": int(store.ids[linha]), "title": store.titles[linha], "rating": int(store.ratings[linha])}
+            for linha in linhas
+        ],
+        "categories": [store.categories[codigo] for codigo in codigos]
+    }
 
 
 @app.get("/api/v1/stats/overview", response_model=StatsOverview, summary="Estatísticas Gerais", description="Visão geral da coleção: total de livros, média de preços e distribuição de avaliações.")
@@ -251,30 +484,15 @@ def obter_resumo_estatistico():
     - total de livros
     - preco medio
     - distribuicao de ratings
-    """
-    if LIVROS_DF.empty:
-        return {
-            "total_books": 0,
-            "average_price": 0.0,
-            "min_price": 0.0,
-            "max_price": 0.0,
-            "rating_distribution": {},
-            "categories_count": 0
-        }
-    
-    # Calculando distribuicao de ratings
-    # Convertendo chaves para string para garantir compatibilidade JSON
-    rating_counts = LIVROS_DF["rating"].value_counts().to_dict()
-    rating_dist = {str(k): v for k, v in rating_counts.items()}
     
-    return {
-        "total_books": int(len(LIVROS_DF)),
-        "average_price": round(float(LIVROS_DF["price"].mean()), 2),
-        "min_price": float(LIVROS_DF["price"].min()),
-        "max_price": float(LIVROS_DF["price"].max()),
-        "rating_distribution": rating_dist,
-        "categories_count": int(LIVROS_DF["category"].nunique())
-    }
+    O JSON e calculado uma vez por versao dos dados (ver stats.py).
+    """
+    snapshot = obter_snapshot()
+    return Response(
+        content=snapshot.stats.overview_json,
+        media_type="application/json",
+        headers={"X-Data-Fingerprint": snapshot.fingerprint}
+    )
 
 
 @app.get("/api/v1/stats/categories", response_model=List[CategoryStats], summary="Estatísticas por Categoria", description="Dados detalhados agrupados por categoria (total, preços).")
@@ -282,33 +500,23 @@ def obter_estatisticas_por_categoria():
     """
     Retorna estatisticas detalhadas por categoria.
     Ordenado por quantidade de livros (decrescente).
+    
+    O JSON e calculado uma vez por versao dos dados (ver stats.py).
     """
-    if LIVROS_DF.empty:
-        return []
-        
-    # Agrupando por categoria e calculando metricas
-    stats = LIVROS_DF.groupby("category").agg(
-        total_books=("id", "count"),
-        average_price=("price", "mean"),
-        min_price=("price", "min"),
-        max_price=("price", "max")
-    ).reset_index()
-    
-    # Ordenacao: Quantidade desc, Categoria asc (desempate)
-    stats = stats.sort_values(by=["total_books", "category"], ascending=[False, True])
-    
-    # Convertendo para lista de dicionarios
-    result = stats.to_dict(orient="records")
-    
-    # Arredondando valores float
-    for item in result:
-        item["average_price"] = round(item["average_price"], 2)
-        
-    return result
+    snapshot = obter_snapshot()
+    return Response(
+        content=snapshot.stats.categories_json,
+        media_type="application/json",
+        headers={"X-Data-Fingerprint": snapshot.fingerprint}
+    )
 
 
 @app.get("/api/v1/books/top-rated", response_model=List[Book], summary="Melhores Avaliados", description="Lista os livros com maior classificação (5 estrelas), ordenados por preço.")
-def obter_melhores_livros(limit: int = Query(10, gt=0, le=50)):
+def obter_melhores_livros(
+    limit: int = Query(10, gt=0, le=50),
+    category: Optional[str] = Query(None, description="Nome exato da categoria (case insensitive)"),
+    min_rating: Optional[int] = Query(None, ge=1, le=5, description="Rating minimo")
+):
     """
     Lista os livros com melhor avaliacao.
     
@@ -316,44 +524,91 @@ def obter_melhores_livros(limit: int = Query(10, gt=0, le=50)):
     1. Rating (maior para menor)
     2. Price (maior para menor)
     3. Title (alfabetico - desempate)
+    
+    Filtros opcionais: category (nome exato) e min_rating.
+    A ordem ja vem pronta do indice, entao cada chamada custa O(limit).
     """
-    if LIVROS_DF.empty:
-        return []
-        
-    top_books = LIVROS_DF.sort_values(
-        by=["rating", "price", "title"], 
-        ascending=[False, False, True]
-    ).head(limit)
+    snapshot = obter_snapshot()
+    if len(snapshot.store) == 0:
+        return resposta_json(b"[]")
+    
+    indice = snapshot.top
+    codigo = None
+    if category:
+        codigo = indice.codigo_categoria(category)
+        if codigo < 0:
+            return resposta_json(b"[]")
     
-    return top_books.to_dict(orient="records")
+    return resposta_json(snapshot.payloads.lista(indice.top(limit, codigo_categoria=codigo, min_rating=min_rating)))
 
 
 @app.get("/api/v1/books/price-range", response_model=List[Book], summary="Filtrar por Faixa de Preço", description="Filtra livros dentro de um intervalo de preço (min e max).")
 def filtrar_livros_por_preco(
     min: float = Query(0.0, ge=0.0, description="Preco minimo"),
-    max: float = Query(99999.0, ge=0.0, description="Preco maximo")
+    max: float = Query(99999.0, ge=0.0, description="Preco maximo"),
+    page: int = Query(1, gt=0),
+    size: int = Query(50, gt=0, le=100)
 ):
     """
     Filtra livros dentro de uma faixa de preco especifica.
     
-    Parametros nomeados 'min' e 'max'.
+    Parametros nomeados 'min' e 'max', com paginacao (page/size) igual
+    a do /books. O resultado vem ordenado por preco (crescente) e o total
+    de livros na faixa vai no header X-Total-Count.
     """
-    if LIVROS_DF.empty:
-        return []
+    snapshot = obter_snapshot()
+    if len(snapshot.store) == 0:
+        return resposta_json(b"[]", {"X-Total-Count": "0"})
     
     if min > max:
         raise HTTPException(status_code=400, detail="O valor minimo (min) nao pode ser maior que o maximo (max).")
         
-    # Aplicando filtro
-    filtered_books = LIVROS_DF[
-        (LIVROS_DF["price"] >= min) & 
-        (LIVROS_DF["price"] <= max)
-    ]
+    # Duas buscas binarias no indice de precos (ja ordenado por preco e titulo)
+    linhas = snapshot.precos.faixa(min, max)
     
-    # Ordenacao por preco (crescente)
-    filtered_books = filtered_books.sort_values(by=["price", "title"], ascending=[True, True])
+    inicio = (page - 1) * size
+    return resposta_json(snapshot.payloads.lista(linhas[inicio:inicio + size]), {"X-Total-Count": str(len(linhas))})
+
+
+@app.get("/api/v1/books/query", response_model=BookQueryResponse, summary="Consulta com Facetas", description="Filtra por categoria, rating, disponibilidade e preço ao mesmo tempo e retorna a página de livros com as contagens de cada faceta.")
+def consultar_livros(
+    category: Optional[List[str]] = Query(None, description="Categoria (nome exato, case insensitive); repita o parametro para aceitar varias"),
+    rating: Optional[List[int]] = Query(None, description="Rating (1 a 5); repita o parametro para aceitar varios"),
+    availability: Optional[List[int]] = Query(None, description="Disponibilidade (1 = em estoque, 0 = esgotado)"),
+    min_price: Optional[float] = Query(None, ge=0.0, description="Preco minimo"),
+    max_price: Optional[float] = Query(None, ge=0.0, description="Preco maximo"),
+    sort: Optional[Literal["id", "price", "rating", "title"]] = Query(None, description="Campo de ordenacao (id como desempate); sem ele, ordem do scraping"),
+    order: Literal["asc", "desc"] = Query("asc", description="Direcao da ordenacao"),
+    page: int = Query(1, gt=0),
+    size: int = Query(50, gt=0, le=100)
+):
+    """
+    Busca com varios filtros combinados em uma chamada so.
+    
+    Dentro de uma dimensao os valores sao alternativos (OR) e entre
+    dimensoes os filtros se somam (AND). Alem da pagina de livros, a
+    resposta traz as facetas: para cada dimensao, quantos livros cada
+    valor traria mantendo os filtros das outras dimensoes (ex: quantos
+    livros de cada categoria existem com rating 5 e preco ate 20).
+    
+    Tudo sai dos bitmaps do snapshot (ver facets.py): AND/OR e popcount
+    sobre palavras de 64 bits, sem varrer os livros.
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="O valor minimo (min_price) nao pode ser maior que o maximo (max_price).")
+    
+    snapshot = obter_snapshot()
+    resultado, facetas = snapshot.facetas.consultar(category, rating, availability, min_price, max_price)
+    
+    inicio = (page - 1) * size
+    ordem = snapshot.ordens.ordem(sort) if sort else None
+    total, linhas = snapshot.facetas.pagina(resultado, inicio, inicio + size, ordem, order)
     
-    return filtered_books.to_dict(orient="records")
+    cabecalho = json_bytes({"total": total, "page": page, "size": size, "facets": facetas})
+    return resposta_json(
+        cabecalho[:-1] + b',"books":' + snapshot.payloads.lista(linhas) + b"}",
+        {"X-Total-Count": str(total)}
+    )
 
 
 @app.get("/api/v1/books/{book_id}", response_model=Book, summary="Detalhar Livro", description="Retorna todos os detalhes de um livro específico pelo ID.")
@@ -363,27 +618,43 @@ def obter_detalhes_livro(book_id: int):
     
     Se o livro nao for encontrado, retorna erro 404.
     """
-    # Procura o livro na lista pelo ID
-    for livro in LIVROS_DB:
-        if livro["id"] == book_id:
-            return livro
+    # Consulta O(1) no indice id -> linha do store
+    snapshot = obter_snapshot()
+    linha = snapshot.store.linha_por_id(book_id)
+    if linha >= 0:
+        return resposta_json(snapshot.payloads.item(linha))
             
-    # Se terminou o loop e nao achou, levanta excecao HTTP
+    # Se nao achou, levanta excecao HTTP
     raise HTTPException(status_code=404, detail="Livro nao encontrado")
 
 
+@app.post("/api/v1/books/batch", response_model=BookBatchResponse, summary="Detalhar Livros em Lote", description="Retorna os detalhes de vários livros em uma única chamada.")
+def obter_detalhes_livros_lote(request: BookBatchRequest):
+    """
+    Retorna os detalhes de varios livros pelo ID (ate 1000 por chamada).
+    
+    Evita centenas de chamadas sequenciais ao /books/{book_id}.
+    Os livros voltam na ordem dos ids pedidos e os ids que nao
+    existem sao listados em not_found (sem erro 404).
+    """
+    snapshot = obter_snapshot()
+    linhas = snapshot.store.linhas_por_ids(request.ids)
+    encontrados = linhas >= 0
+    not_found = [book_id for book_id, achou in zip(request.ids, encontrados) if not achou]
+    
+    return resposta_json(
+        b'{"books":' + snapshot.payloads.lista(linhas[encontrados])
+        + b',"not_found":' + json_bytes(not_found) + b"}"
+    )
+
+
 @app.get("/api/v1/categories", response_model=List[str], summary="Listar Categorias", description="Lista todas as categorias únicas disponíveis no banco de dados.")
 def listar_categorias():
     """
     Retorna uma lista unica de todas as categorias disponiveis.
     """
-    # Usa um set (conjunto) para pegar apenas valores unicos
-    categorias = set()
-    for livro in LIVROS_DB:
-        categorias.add(livro["category"])
-    
-    # Converte de volta para lista e ordena alfabeticamente
-    return sorted(list(categorias))
+    # O store ja guarda as categorias unicas em ordem alfabetica
+    return list(obter_snapshot().store.categories)
 
 
 @app.get("/api/v1/health", summary="Status da API", description="Verifica a saúde do serviço e contagem de dados carregados.")
@@ -394,8 +665,37 @@ def verificar_status_api():
     Retorna o status e quantos livros estao carregados na memoria.
     Util para monitoramento.
     """
+    snapshot = obter_snapshot()
     return {
         "status": "ok",
         "api_name": "Tech Challenge Books API",
-        "total_books_loaded": len(LIVROS_DB)
+        "total_books_loaded": len(snapshot.store),
+        "data_version": snapshot.version,
+        "data_fingerprint": snapshot.fingerprint
+    }
+
+
+@app.get("/api/v1/health/live", summary="Liveness", description="Indica que o processo está de pé (não depende dos dados).")
+def verificar_liveness():
+    """
+    Liveness: responde 200 sempre que o processo consegue atender.
+    Nao olha os dados, entao nao derruba o pod durante a carga inicial.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/api/v1/health/ready", summary="Readiness", description="Indica se os dados e índices já estão carregados (503 enquanto carregam).")
+def verificar_readiness():
+    """
+    Readiness: 200 so depois que o primeiro snapshot (store, indices e
+    estatisticas) foi publicado; antes disso responde 503, para o
+    orquestrador nao mandar trafego para uma instancia ainda fria.
+    """
+    snapshot = obter_snapshot()
+    corpo = {
+        "status": "ready" if snapshot.version > 0 else "loading",
+        "total_books_loaded": len(snapshot.store),
+        "data_version": snapshot.version,
+        "data_fingerprint": snapshot.fingerprint
     }
+    return JSONResponse(content=corpo, status_code=200 if snapshot.version > 0 else 503)
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Matriz de features para ML, calculada uma vez por versao dos dados.
+
+O /ml/features devolvia as colunas cruas (com a categoria em texto) e
+cada cliente de treino tinha que codificar tudo de novo. Aqui a matriz
+numerica densa (float32) e montada de forma vetorizada a partir do store:
+
+- price, rating e availability normalizados para [0, 1] (min-max);
+- category em one-hot (uma coluna por categoria) ou ordinal (o codigo).
+
+A matriz e os arquivos ja serializados (JSON, NPZ e Arrow IPC) ficam em
+cache no snapshot, entao so a primeira requisicao de cada formato paga a
+conta. Os parametros da normalizacao vao no schema, para o cliente
+aplicar a mesma transformacao em dados novos.
+
+O modelo de /ml/predictions (CentroidModel) tambem e treinado aqui, uma
+vez por versao dos dados, sobre as mesmas features numericas.
+"""
+
+import io
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .stats import json_bytes
+from .store import BookStore
+
+ENCODINGS = ("onehot", "ordinal")
+
+# Formato -> (media type, extensao do arquivo)
+FORMATOS_FEATURES = {
+    "json": ("application/json", "json"),
+    "npz": ("application/octet-stream", "npz"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+# Colunas numericas normalizadas (nome da feature -> atributo do store)
+_NUMERICAS = [("price", "prices"), ("rating", "ratings"), ("availability", "availability")]
+
+# Casas decimais no JSON (os valores estao em [0, 1])
+_CASAS_JSON = 6
+
+
+class FeatureMatrix:
+    """
+    Matriz de features (linhas = livros na ordem do store) e seu schema.
+
+    features e float32 C-contiguo e somente leitura; ids tem o id de cada linha.
+    O JSON e o schema levam o fingerprint dos dados (nao a versao, que e
+    por processo): sao respostas cacheadas com ETag pelo fingerprint.
+    """
+
+    def __init__(self, store: BookStore, encoding: str, fingerprint: str):
+        n = len(store)
+        partes = []
+        colunas: List[Dict[str, Any]] = []
+
+        for nome, atributo in _NUMERICAS:
+            valores = getattr(store, atributo).astype(np.float64)
+            minimo = float(valores.min()) if n else 0.0
+            maximo = float(valores.max()) if n else 0.0
+            escala = (maximo - minimo) or 1.0
+            partes.append(((valores - minimo) / escala)[:, None])
+            colunas.append({"name": nome, "source": nome, "transform": "minmax", "min": minimo, "max": maximo})
+
+        codigos = np.asarray(store.category_codes, dtype=np.int64)
+        if encoding == "onehot":
+            one_hot = np.zeros((n, len(store.categories)), dtype=np.float32)
+            one_hot[np.arange(n), codigos] = 1.0
+            partes.append(one_hot)
+            colunas.extend(
+                {"name": f"category={categoria}", "source": "category", "transform": "onehot", "value": categoria}
+                for categoria in store.categories
+            )
+        else:
+            partes.append(codigos.astype(np.float32)[:, None])
+            colunas.append({"name": "category_code", "source": "category", "transform": "ordinal"})
+
+        self.encoding = encoding
+        self.fingerprint = fingerprint
+        self.ids = np.asarray(store.ids, dtype=np.int64)
+        self.features = np.ascontiguousarray(np.hstack(partes) if n else np.zeros((0, len(colunas))), dtype=np.float32)
+        self.features.flags.writeable = False
+        self.schema = {
+            "data_fingerprint": fingerprint,
+            "encoding": encoding,
+            "rows": n,
+            "dtype": "float32",
+            "columns": colunas,
+            "categories": list(store.categories),
+        }
+        self._serializados: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nomes_colunas(self) -> List[str]:
+        return [coluna["name"] for coluna in self.schema["columns"]]
+
+    def serializar(self, formato: str) -> bytes:
+        """Arquivo da matriz no formato pedido (gerado na primeira chamada e guardado)."""
+        with self._lock:
+            if formato not in self._serializados:
+                self._serializados[formato] = getattr(self, "_" + formato)()
+            return self._serializados[formato]
+
+    def _json(self) -> bytes:
+        return json_bytes({
+            "data_fingerprint": self.fingerprint,
+            "encoding": self.encoding,
+            "columns": self.nomes_colunas,
+            "ids": self.ids.tolist(),
+            "rows": self.features.astype(np.float64).round(_CASAS_JSON).tolist(),
+        })
+
+    def _npz(self) -> bytes:
+        # np.load(...)["features"] / ["ids"]; nomes das colunas em "columns"
+        buffer = io.BytesIO()
+        np.savez(buffer, ids=self.ids, features=self.features, columns=np.array(self.nomes_colunas))
+        return buffer.getvalue()
+
+    def _arrow(self) -> bytes:
+        import pyarrow as pa
+
+        colunas = {"id": self.ids}
+        colunas.update({nome: self.features[:, posicao] for posicao, nome in enumerate(self.nomes_colunas)})
+        tabela = pa.table(colunas)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+        return sink.getvalue()
+
+
+# Limite das features normalizadas na predicao (o treino fica em [0, 1]).
+# Entradas finitas enormes (ex: price=1e308) estourariam |x|^2 para inf e
+# os logits virariam NaN; alem desse limite a predicao ja nao muda.
+_LIMITE_FEATURE = 1e6
+
+
+class CentroidModel:
+    """
+    Classificador de categoria por centroide mais proximo (NumPy puro).
+
+    Treino: media das features numericas normalizadas (price, rating,
+    availability) dos livros de cada categoria. Predicao: distancia ao
+    quadrado de cada linha a cada centroide em uma unica operacao
+    matricial. O score e -d^2 / (2 * variancia) + log(prior da categoria),
+    ou seja, a posterior de gaussianas com a mesma variancia isotropica em
+    todas as categorias; a confianca e o softmax desses scores. Sem o
+    prior, categorias com 1 ou 2 livros (centroides extremos) "roubariam"
+    boa parte das predicoes.
+    """
+
+    def __init__(self, store: BookStore, version: int):
+        if len(store) == 0:
+            raise ValueError("Nao ha livros para treinar o modelo.")
+        self.version = f"centroid-v{version}"
+        self.categories = list(store.categories)
+
+        brutos = np.column_stack([getattr(store, atributo).astype(np.float64) for _, atributo in _NUMERICAS])
+        self.minimos = brutos.min(axis=0)
+        self.escalas = (brutos.max(axis=0) - self.minimos)
+        self.escalas[self.escalas == 0] = 1.0
+        features = self._normalizar(brutos)
+
+        # Centroides por categoria: soma por codigo / contagem (bincount vetorizado)
+        codigos = np.asarray(store.category_codes, dtype=np.int64)
+        contagens = np.bincount(codigos, minlength=len(self.categories)).astype(np.float64)
+        somas = np.column_stack([
+            np.bincount(codigos, weights=features[:, coluna], minlength=len(self.categories))
+            for coluna in range(features.shape[1])
+        ])
+        self.centroides = somas / contagens[:, None]
+        self._norma_centroides = (self.centroides ** 2).sum(axis=1)
+        self.log_priors = np.log(contagens / contagens.sum())
+
+        # Variancia dentro das categorias (comum a todas), usada na confianca
+        residuos = features - self.centroides[codigos]
+        self.variancia = max(float((residuos ** 2).sum(axis=1).mean()), 1e-9)
+
+    def _normalizar(self, brutos: np.ndarray) -> np.ndarray:
+        return (brutos - self.minimos) / self.escalas
+
+    def prever(self, price: np.ndarray, rating: np.ndarray, availability: np.ndarray):
+        """
+        Preve a categoria de varias linhas de uma vez.
+
+        Retorna (codigos das categorias previstas, confiancas), um de cada por linha.
+        """
+        features = self._normalizar(np.column_stack([
+            np.asarray(price, dtype=np.float64),
+            np.asarray(rating, dtype=np.float64),
+            np.asarray(availability, dtype=np.float64),
+        ]))
+        np.clip(features, -_LIMITE_FEATURE, _LIMITE_FEATURE, out=features)
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2, para todas as linhas e centroides de uma vez
+        distancias = (features ** 2).sum(axis=1)[:, None] - 2 * features @ self.centroides.T + self._norma_centroides[None, :]
+        logits = -distancias / (2 * self.variancia) + self.log_priors[None, :]
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilidades = np.exp(logits)
+        probabilidades /= probabilidades.sum(axis=1, keepdims=True)
+        codigos = probabilidades.argmax(axis=1)
+        return codigos, probabilidades[np.arange(len(codigos)), codigos]
+
+
+class FeaturePipeline:
+    """
+    Features de um snapshot, calculadas sob demanda e guardadas por encoding.
+
+    O snapshot cria o pipeline vazio (nao atrasa a carga dos dados); a
+    primeira requisicao de cada encoding monta a matriz.
+    """
+
+    def __init__(self, store: BookStore, version: int, fingerprint: str):
+        self.store = store
+        self.version = version
+        self.fingerprint = fingerprint
+        self._matrizes: Dict[str, FeatureMatrix] = {}
+        self._modelo = None
+        self._lock = threading.Lock()
+
+    def matriz(self, encoding: str = "onehot") -> FeatureMatrix:
+        with self._lock:
+            if encoding not in self._matrizes:
+                self._matrizes[encoding] = FeatureMatrix(self.store, encoding, self.fingerprint)
+            return self._matrizes[encoding]
+
+    def modelo(self) -> CentroidModel:
+        """Modelo treinado nesta versao dos dados (ValueError se nao houver livros)."""
+        with self._lock:
+            if self._modelo is None:
+                self._modelo = CentroidModel(self.store, self.version)
+            return self._modelo
@@ -6,8 +6,9 @@ O Pydantic ajuda a validar os tipos de dados e gera a documentacao
 automatica no Swagger UI.
 """
 
-from typing import Optional, Dict
-from pydantic import BaseModel
+import datetime
+from typing import Optional, Dict, List
+from pydantic import BaseModel, Field, model_validator
 
 class StatsOverview(BaseModel):
     """
@@ -44,6 +45,18 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class TokenCacheMetrics(BaseModel):
+    """
+    Metricas do cache de tokens JWT verificados.
+    """
+    max_entries: int
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+    expired: int  # entradas descartadas por exp vencido
+    evicted: int  # entradas descartadas pelo limite de tamanho (LRU)
+
 class Book(BaseModel):
     """
     Modelo que representa um livro na nossa API.
@@ -75,3 +88,145 @@ class Book(BaseModel):
             }
         }
     }
+
+
+class BookBatchRequest(BaseModel):
+    """
+    Modelo para consulta de varios livros de uma vez pelo ID.
+    """
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class BookBatchResponse(BaseModel):
+    """
+    Modelo de resposta da consulta em lote.
+    Os livros vem na mesma ordem dos ids pedidos; ids inexistentes vao em not_found.
+    """
+    books: List[Book]
+    not_found: List[int]
+
+class BookQueryResponse(BaseModel):
+    """
+    Modelo de resposta da consulta com facetas (/books/query).
+    facets traz, para cada dimensao (category, rating, availability, price),
+    quantos livros cada valor traria mantendo os filtros das outras dimensoes.
+    """
+    total: int
+    page: int
+    size: int
+    facets: Dict[str, Dict[str, int]]
+    books: List[Book]
+
+class TitleSuggestion(BaseModel):
+    """
+    Sugestao de titulo retornada pelo autocomplete.
+    """
+    id: int
+    title: str
+    rating: int
+
+class SuggestResponse(BaseModel):
+    """
+    Modelo de resposta do autocomplete (/books/suggest).
+    """
+    query: str
+    titles: List[TitleSuggestion]
+    categories: List[str]
+
+class ScrapingJobStatus(BaseModel):
+    """
+    Modelo com o estado e o progresso de um job de scraping.
+    """
+    job_id: str
+    status: str  # queued, running, succeeded ou failed
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    elapsed_seconds: float
+    categories_total: int
+    categories_done: int
+    pages_fetched: int
+    pages_unchanged: int
+    books_parsed: int
+    total_books: Optional[int] = None
+    data_version: Optional[int] = None
+    error: Optional[str] = None
+
+class FeatureColumn(BaseModel):
+    """
+    Uma coluna da matriz de features e como ela foi calculada.
+    """
+    name: str
+    source: str  # coluna original do livro
+    transform: str  # "minmax", "onehot" ou "ordinal"
+    min: Optional[float] = None
+    max: Optional[float] = None
+    value: Optional[str] = None  # categoria da coluna one-hot
+
+class FeatureSchema(BaseModel):
+    """
+    Metadados da matriz de features de uma versao dos dados.
+    """
+    data_fingerprint: str  # impressao digital dos dados (igual entre workers)
+    encoding: str
+    rows: int
+    dtype: str
+    columns: List[FeatureColumn]
+    categories: List[str]
+
+class FeatureMatrixResponse(BaseModel):
+    """
+    Matriz de features em JSON: rows[i] sao as features do livro ids[i],
+    na ordem de columns.
+    """
+    data_fingerprint: str  # impressao digital dos dados (igual entre workers)
+    encoding: str
+    columns: List[str]
+    ids: List[int]
+    rows: List[List[float]]
+
+class PredictionResponse(BaseModel):
+    """
+    Resultado de uma predicao de categoria.
+    """
+    predicted_category: str
+    confidence: float
+    model_version: str
+
+class PredictionBatchRequest(BaseModel):
+    """
+    Lote de livros para predicao, em colunas: a linha i e
+    (price[i], rating[i], availability[i]). NaN e infinito sao recusados.
+    """
+    model_config = {"allow_inf_nan": False}
+
+    price: List[float] = Field(..., min_length=1, max_length=100_000)
+    rating: List[float]
+    availability: Optional[List[float]] = None  # padrao: todos disponiveis (1)
+
+    @model_validator(mode="after")
+    def verificar_tamanhos(self):
+        tamanhos = {len(self.price), len(self.rating), len(self.availability if self.availability is not None else self.price)}
+        if len(tamanhos) != 1:
+            raise ValueError("price, rating e availability precisam ter o mesmo tamanho")
+        return self
+
+class PredictionBatchResponse(BaseModel):
+    """
+    Predicoes do lote, na mesma ordem das linhas recebidas.
+    """
+    model_version: str
+    predicted_category: List[str]
+    confidence: List[float]
+
+class PredictionBatchingMetrics(BaseModel):
+    """
+    Metricas do micro-batching das predicoes individuais.
+    """
+    max_batch_size: int
+    max_wait_ms: float
+    queue_depth: int
+    max_queue_depth: int
+    batches: int
+    predictions: int
+    average_batch_size: float
+    batch_size_histogram: Dict[str, int]  # faixa de tamanho ("1", "2-3", "4-7"...) -> quantidade de lotes
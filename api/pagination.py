@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Paginacao por cursor (keyset) da listagem de livros.
+
+Com page/size, a pagina N e um offset na ordem do scraping: se um reload
+insere ou remove livros, as paginas seguintes "andam" e um cliente que
+esta percorrendo a lista ve livros repetidos ou pula alguns. Aqui a
+listagem segue uma ordem pre-calculada (SortedOrder, por id, price,
+rating ou title, sempre com o id como desempate) e o cursor guarda a
+chave (valor, id) da ultima linha devolvida:
+
+- nos mesmos dados, o cursor tambem guarda a posicao, e a proxima pagina
+  e uma fatia direta. "Mesmos dados" e o fingerprint do snapshot, nao o
+  numero de versao: a versao e por processo (recomeca em cada worker e a
+  cada restart), entao a mesma versao pode ter dados diferentes;
+- depois de um reload, a posicao e reencontrada pela chave (busca
+  binaria), entao a pagina continua exatamente depois do ultimo livro
+  visto, sem repetir nem pular os que existem nas duas versoes.
+
+Em ambos os casos uma pagina profunda custa o mesmo que a primeira.
+O cursor e opaco para o cliente (JSON em base64 url-safe).
+"""
+
+import base64
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .indexes import CAMPOS_ORDENACAO, SortedOrder
+from .stats import json_bytes
+
+
+def codificar_cursor(fingerprint: str, sort: str, order: str, posicao: int, chave: tuple) -> str:
+    """Cursor opaco da proxima pagina."""
+    valor, id_livro = chave
+    dados = json_bytes({"f": fingerprint, "s": sort, "o": order, "p": posicao, "k": valor, "id": id_livro})
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+
+def decodificar_cursor(cursor: str) -> Dict[str, Any]:
+    """Le o cursor. ValueError se estiver malformado."""
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        campos = {chave: dados[chave] for chave in ("f", "s", "o", "p", "k", "id")}
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor invalido")
+
+    tipo_valor = str if campos["s"] == "title" else (int, float)
+    if (
+        campos["s"] not in CAMPOS_ORDENACAO
+        or campos["o"] not in ("asc", "desc")
+        or not isinstance(campos["f"], str)
+        or not all(isinstance(campos[chave], int) and not isinstance(campos[chave], bool) for chave in ("p", "id"))
+        or not isinstance(campos["k"], tipo_valor)
+        or isinstance(campos["k"], bool)
+    ):
+        raise ValueError("Cursor invalido")
+    return campos
+
+
+def pagina_ordenada(
+    ordem: SortedOrder,
+    fingerprint: str,
+    order: str,
+    size: int,
+    page: int = 1,
+    cursor: Optional[Dict[str, Any]] = None,
+) -> Tuple[np.ndarray, Optional[str]]:
+    """
+    Linhas da pagina (na ordem pedida) e o cursor da proxima, ou None se
+    for a ultima. Sem cursor, `page` da o offset inicial.
+    """
+    total = len(ordem)
+    crescente = order == "asc"
+
+    # Limite da pagina na ordem crescente: inicio (asc) ou fim (desc)
+    if cursor is None:
+        pulados = (page - 1) * size
+        limite = pulados if crescente else total - pulados
+    elif cursor["f"] == fingerprint:
+        limite = cursor["p"]
+    else:
+        limite = ordem.posicao(cursor["k"], cursor["id"], depois=crescente)
+    limite = min(max(limite, 0), total)
+
+    if crescente:
+        inicio, fim = limite, min(limite + size, total)
+        linhas = ordem.ordem[inicio:fim]
+        proximo = fim if fim < total else None
+        ultima = fim - 1
+    else:
+        inicio, fim = max(limite - size, 0), limite
+        linhas = ordem.ordem[inicio:fim][::-1]
+        proximo = inicio if inicio > 0 else None
+        ultima = inicio
+
+    if proximo is None or fim <= inicio:
+        return linhas, None
+    return linhas, codificar_cursor(fingerprint, ordem.campo, order, proximo, ordem.chave(ultima))
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+JSON dos livros pre-codificado, uma vez por versao dos dados.
+
+Nas rotas com response_model=List[Book] o FastAPI validava cada livro no
+Pydantic e serializava tudo de novo a cada requisicao. Como o store e
+imutavel e tipado, o JSON de cada livro e montado uma unica vez na carga
+e as respostas sao so concatenacao de bytes. O response_model continua
+nas rotas, entao o schema do OpenAPI nao muda.
+"""
+
+import pickle
+from typing import Iterable
+
+import numpy as np
+
+from .models import Book
+from .stats import json_bytes
+from .store import BookStore
+
+
+class BookPayloads:
+    """
+    JSON (formato Book) de todos os livros do store, em um unico buffer.
+
+    Cada livro e seguido de uma virgula, entao a linha i fica em
+    buffer[offsets[i]:offsets[i + 1] - 1] e uma faixa continua de linhas
+    vira uma lista JSON com um unico slice.
+    """
+
+    __slots__ = ("buffer", "offsets")
+
+    def __init__(self, store: BookStore):
+        categorias = [store.categories[codigo] for codigo in store.category_codes.tolist()]
+        livros = zip(
+            store.ids.tolist(),
+            store.titles.tolist(),
+            store.prices.tolist(),
+            store.ratings.tolist(),
+            store.availability.tolist(),
+            categorias,
+            store.image_urls.tolist(),
+            store.product_urls.tolist(),
+        )
+        codificados = [
+            json_bytes({
+                "id": id_livro,
+                "title": title,
+                "price": price,
+                "rating": rating,
+                "availability": availability,
+                "category": category,
+                "image_url": image_url,
+                "product_url": product_url,
+            }) + b","
+            for id_livro, title, price, rating, availability, category, image_url, product_url in livros
+        ]
+
+        # Os tipos ja sao garantidos pelas colunas do store; validamos uma
+        # linha so para garantir que o formato bate com o modelo Book
+        if codificados:
+            Book.model_validate_json(codificados[0][:-1])
+
+        self.offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+        if codificados:
+            np.cumsum([len(item) for item in codificados], out=self.offsets[1:])
+        self.offsets.flags.writeable = False
+        self.buffer = b"".join(codificados)
+
+    @classmethod
+    def _restaurar(cls, buffer, offsets: np.ndarray) -> "BookPayloads":
+        payloads = cls.__new__(cls)
+        payloads.buffer = buffer
+        payloads.offsets = offsets
+        return payloads
+
+    def __reduce_ex__(self, protocolo):
+        # Como na ColunaTexto: com pickle 5 o buffer vai fora da stream (ver shared.py)
+        buffer = pickle.PickleBuffer(self.buffer) if protocolo >= 5 else bytes(self.buffer)
+        return (BookPayloads._restaurar, (buffer, self.offsets))
+
+    def item(self, linha: int) -> bytes:
+        """JSON de um livro."""
+        return self.buffer[self.offsets[linha]:self.offsets[linha + 1] - 1]
+
+    def faixa(self, inicio: int, fim: int) -> bytes:
+        """Lista JSON das linhas inicio..fim-1 (um unico slice do buffer)."""
+        fim = min(fim, len(self.offsets) - 1)
+        if inicio >= fim:
+            return b"[]"
+        return b"[" + self.buffer[self.offsets[inicio]:self.offsets[fim] - 1] + b"]"
+
+    def lista(self, linhas: Iterable[int]) -> bytes:
+        """Lista JSON das linhas pedidas, na ordem recebida."""
+        linhas = np.asarray(linhas, dtype=np.int64)
+        if not len(linhas):
+            return b"[]"
+        buffer = self.buffer
+        inicios = self.offsets[linhas].tolist()
+        fins = (self.offsets[linhas + 1] - 1).tolist()
+        return b"[" + b",".join([buffer[inicio:fim] for inicio, fim in zip(inicios, fins)]) + b"]"
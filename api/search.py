@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Indices de busca textual da API.
+
+A busca por titulo/categoria e "contem o texto, sem diferenciar maiusculas".
+Em vez de varrer todos os livros a cada requisicao, montamos uma vez por
+carga de dados um indice invertido de trigramas (sequencias de 3 caracteres):
+
+1. cada trigrama aponta para a lista ordenada de linhas que o contem;
+2. na consulta, cruzamos as listas dos trigramas do termo buscado;
+3. so os candidatos que sobraram sao verificados com o `in` de verdade.
+
+O resultado e exatamente o mesmo da busca linear, so que bem mais rapido.
+
+Para o autocomplete (/books/suggest) usamos outro indice, de prefixos,
+com o ranking de cada sugestao ja calculado na carga.
+
+Os textos normalizados ficam em uma ColunaTexto (buffer UTF-8 + offsets)
+e nao em uma lista de str: alem de ocupar bem menos memoria, o indice
+inteiro vira arrays e buffers que podem ser compartilhados entre os
+workers (ver shared.py). A verificacao do "contem" e feita direto nos
+bytes UTF-8, que preservam a relacao de substring.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .store import BookStore, ColunaTexto
+
+TAMANHO_NGRAMA = 3
+
+# Maximo de sugestoes devolvidas pelo autocomplete
+MAX_SUGESTOES = 10
+
+# Prefixos ate esse tamanho tem o top-k guardado pronto (sao os mais genericos)
+TAMANHO_PREFIXO_CACHE = 3
+
+
+def normalizar(texto: str) -> str:
+    """Normalizacao usada tanto na indexacao quanto na consulta."""
+    return texto.lower()
+
+
+def _ngramas(texto: str) -> set:
+    """Conjunto de trigramas de um texto ja normalizado."""
+    return {texto[i:i + TAMANHO_NGRAMA] for i in range(len(texto) - TAMANHO_NGRAMA + 1)}
+
+
+class TrigramIndex:
+    """
+    Indice invertido de trigramas sobre uma lista de textos.
+
+    As listas de linhas (postings) ficam concatenadas em um unico array
+    NumPy, no formato CSR: as linhas do trigrama t estao em
+    postings[offsets[k]:offsets[k + 1]], onde k = posicao[t].
+    """
+
+    def __init__(self, textos: Sequence[str]):
+        normalizados = [normalizar(texto) for texto in textos]
+        self.textos = ColunaTexto.from_strings(normalizados)
+
+        linhas_por_ngrama = {}
+        for linha, texto in enumerate(normalizados):
+            for ngrama in _ngramas(texto):
+                linhas_por_ngrama.setdefault(ngrama, []).append(linha)
+
+        chaves = sorted(linhas_por_ngrama)
+        self._posicao = {ngrama: k for k, ngrama in enumerate(chaves)}
+        self._offsets = np.zeros(len(chaves) + 1, dtype=np.int64)
+        if chaves:
+            np.cumsum([len(linhas_por_ngrama[ngrama]) for ngrama in chaves], out=self._offsets[1:])
+        self._postings = np.fromiter(
+            (linha for ngrama in chaves for linha in linhas_por_ngrama[ngrama]),
+            dtype=np.int32,
+            count=int(self._offsets[-1]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.textos)
+
+    def _posting(self, ngrama: str) -> np.ndarray:
+        k = self._posicao.get(ngrama)
+        if k is None:
+            return self._postings[:0]
+        return self._postings[self._offsets[k]:self._offsets[k + 1]]
+
+    def candidatos(self, termo: str) -> Optional[np.ndarray]:
+        """
+        Linhas que contem todos os trigramas do termo (ordenadas).
+
+        Retorna None quando o termo e curto demais para ter trigramas;
+        nesse caso todas as linhas sao candidatas.
+        """
+        ngramas = _ngramas(termo)
+        if not ngramas:
+            return None
+
+        # Comeca pela lista mais curta para a intersecao encolher rapido
+        postings = sorted((self._posting(ngrama) for ngrama in ngramas), key=len)
+        resultado = postings[0]
+        for posting in postings[1:]:
+            if not len(resultado):
+                break
+            resultado = np.intersect1d(resultado, posting, assume_unique=True)
+        return resultado
+
+    def buscar(self, termo: str) -> np.ndarray:
+        """Linhas cujo texto contem o termo (case insensitive), em ordem crescente."""
+        termo = normalizar(termo)
+        candidatos = self.candidatos(termo)
+        if candidatos is None:
+            return self._varrer(termo.encode("utf-8"))
+        if len(termo) == TAMANHO_NGRAMA:
+            # O termo e o proprio trigrama: todos os candidatos contem o termo
+            return candidatos.astype(np.int64)
+
+        # find com inicio/fim procura dentro do texto sem copiar o trecho
+        buffer, offsets = self.textos.buffer, self.textos.offsets
+        alvo = termo.encode("utf-8")
+        inicios = offsets[candidatos].tolist()
+        fins = offsets[candidatos + 1].tolist()
+        return np.fromiter(
+            (linha for linha, inicio, fim in zip(candidatos.tolist(), inicios, fins) if buffer.find(alvo, inicio, fim) >= 0),
+            dtype=np.int64,
+        )
+
+    def _varrer(self, alvo: bytes) -> np.ndarray:
+        """
+        Busca sem trigramas (termo curto): compara os bytes do termo com o
+        buffer inteiro de forma vetorizada e traduz as ocorrencias em
+        linhas, descartando as que atravessam o fim de um texto.
+        """
+        offsets = self.textos.offsets
+        if not alvo:
+            return np.arange(len(self.textos), dtype=np.int64)
+        dados = np.frombuffer(self.textos.buffer, dtype=np.uint8)
+        n = len(dados) - len(alvo) + 1
+        if n <= 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Posicoes do primeiro byte; os seguintes so sao conferidos nelas
+        posicoes = np.flatnonzero(dados[:n] == alvo[0])
+        for k in range(1, len(alvo)):
+            posicoes = posicoes[dados[posicoes + k] == alvo[k]]
+
+        if len(posicoes) <= len(self.textos):
+            # Poucas ocorrencias: busca binaria da linha de cada uma (as
+            # linhas saem em ordem, entao basta tirar as repetidas vizinhas)
+            linhas = np.searchsorted(offsets, posicoes, side="right") - 1
+            linhas = linhas[posicoes + len(alvo) <= offsets[linhas + 1]]
+            return linhas[np.concatenate(([True], linhas[1:] != linhas[:-1]))] if len(linhas) else linhas
+
+        # Muitas ocorrencias: marca no buffer e junta por texto (reduceat nos
+        # offsets), apagando as que comecam nos ultimos bytes de um texto
+        # (com um byte a mais no fim, para o inicio dos textos vazios do fim
+        # ainda ser um indice valido sem encurtar o ultimo texto)
+        casa = np.zeros(len(dados) + 1, dtype=bool)
+        casa[posicoes] = True
+        for k in range(1, len(alvo)):
+            fins = offsets[1:] - k
+            casa[fins[fins >= 0]] = False
+
+        # Em textos vazios o reduceat devolve so o byte do inicio: mascarados
+        return np.flatnonzero(np.logical_or.reduceat(casa, offsets[:-1]) & (offsets[1:] > offsets[:-1]))
+
+
+def _inicios_de_palavra(texto: str) -> List[int]:
+    """Posicoes onde comeca uma palavra (inicio do texto ou apos um separador)."""
+    return [
+        i for i, caractere in enumerate(texto)
+        if caractere.isalnum() and (i == 0 or not texto[i - 1].isalnum())
+    ]
+
+
+class PrefixIndex:
+    """
+    Indice de prefixos para autocomplete (sorted-prefix index).
+
+    Cada entrada e um par (item, posicao) apontando para o inicio de uma
+    palavra do texto normalizado, e as entradas ficam ordenadas pelo texto
+    a partir dessa posicao. Assim "himal" encontra "It's Only the Himalayas".
+
+    A ordem de preferencia dos itens (rank, menor e melhor) e passada pronta.
+    Para prefixos curtos, que casam com muita coisa, o top-k ja fica guardado;
+    para os longos, a busca binaria devolve uma faixa pequena de entradas.
+    """
+
+    def __init__(self, textos: ColunaTexto, ranks: np.ndarray):
+        self.textos = textos
+        self.ranks = np.asarray(ranks)
+        textos = textos.tolist()  # so na montagem
+
+        entradas = [(item, posicao) for item, texto in enumerate(textos) for posicao in _inicios_de_palavra(texto)]
+        entradas.sort(key=lambda entrada: textos[entrada[0]][entrada[1]:])
+        self._itens = np.array([item for item, _ in entradas], dtype=np.int32)
+        self._posicoes = np.array([posicao for _, posicao in entradas], dtype=np.int32)
+
+        # Top-k pronto para os prefixos curtos, percorrendo os itens do melhor para o pior
+        self._top_prefixos = {}
+        for indice in np.argsort(self.ranks[self._itens], kind="stable"):
+            item = int(self._itens[indice])
+            sufixo = textos[item][self._posicoes[indice]:]
+            for tamanho in range(1, min(TAMANHO_PREFIXO_CACHE, len(sufixo)) + 1):
+                top = self._top_prefixos.setdefault(sufixo[:tamanho], [])
+                if len(top) < MAX_SUGESTOES and item not in top:
+                    top.append(item)
+
+    def _chave(self, indice: int, tamanho: int) -> str:
+        inicio = self._posicoes[indice]
+        return self.textos[self._itens[indice]][inicio:inicio + tamanho]
+
+    def _faixa(self, prefixo: str):
+        """Busca binaria da faixa de entradas que comecam com o prefixo."""
+        tamanho = len(prefixo)
+        baixo, alto = 0, len(self._itens)
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._chave(meio, tamanho) < prefixo:
+                baixo = meio + 1
+            else:
+                alto = meio
+        inicio, alto = baixo, len(self._itens)
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._chave(meio, tamanho) <= prefixo:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return inicio, baixo
+
+    def sugerir(self, prefixo: str, limit: int = MAX_SUGESTOES) -> List[int]:
+        """Itens com alguma palavra comecando pelo prefixo, do melhor rank para o pior."""
+        prefixo = normalizar(prefixo).lstrip()
+        if not prefixo:
+            return []
+        if len(prefixo) <= TAMANHO_PREFIXO_CACHE:
+            return self._top_prefixos.get(prefixo, [])[:limit]
+
+        inicio, fim = self._faixa(prefixo)
+        itens = np.unique(self._itens[inicio:fim])
+        ordem = np.argsort(self.ranks[itens], kind="stable")[:limit]
+        return itens[ordem].tolist()
+
+
+class IndiceBusca:
+    """
+    Indices de busca de um BookStore: titulos e nomes de categoria.
+
+    Como as categorias sao codificadas no store, o indice de categorias
+    trabalha sobre a lista de categorias unicas e depois traduz os codigos
+    encontrados em linhas de livros.
+    """
+
+    def __init__(self, store: BookStore):
+        self.store = store
+        self.titulos = TrigramIndex(store.titles.tolist())
+        self.categorias = TrigramIndex(store.categories)
+
+        # Ranking das sugestoes: titulos por rating, estoque e ordem alfabetica;
+        # categorias pela quantidade de livros
+        rank_titulos = np.empty(len(store), dtype=np.int64)
+        rank_titulos[np.lexsort((store.title_rank, -store.availability, -store.ratings))] = np.arange(len(store))
+        livros_por_categoria = np.bincount(store.category_codes, minlength=len(store.categories))
+        rank_categorias = np.empty(len(store.categories), dtype=np.int64)
+        rank_categorias[np.argsort(-livros_por_categoria, kind="stable")] = np.arange(len(store.categories))
+
+        self.sugestoes_titulos = PrefixIndex(self.titulos.textos, rank_titulos)
+        self.sugestoes_categorias = PrefixIndex(self.categorias.textos, rank_categorias)
+
+    def buscar(self, title: Optional[str] = None, category: Optional[str] = None) -> np.ndarray:
+        """Linhas que atendem a todos os filtros passados, na ordem do store."""
+        store = self.store
+        linhas = None
+
+        if title:
+            linhas = self.titulos.buscar(title)
+
+        if category:
+            codigos = self.categorias.buscar(category)
+            if linhas is None:
+                linhas = np.flatnonzero(np.isin(store.category_codes, codigos))
+            else:
+                linhas = linhas[np.isin(store.category_codes[linhas], codigos)]
+
+        if linhas is None:
+            return np.arange(len(store))
+        return linhas
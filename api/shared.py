@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Indices do snapshot compartilhados entre os processos (workers) da API.
+
+O store ja e mapeado em memoria direto dos arquivos (ver store.py), mas
+cada worker do uvicorn/gunicorn montava os proprios indices (busca,
+payloads JSON, ordens, bitmaps...), que ocupam varias vezes o tamanho do
+store. Com N workers, N copias. Aqui os indices sao montados uma vez por
+versao dos dados e gravados em disco; todos os workers mapeiam os mesmos
+arquivos somente leitura, e o sistema operacional guarda uma unica copia
+no page cache.
+
+Formato (um diretorio por fingerprint do store + hash do codigo dos
+indices, para nunca carregar um indice de outra versao de dados ou de
+codigo):
+
+- componentes.pkl: os objetos em pickle protocolo 5, com os arrays NumPy
+  e os buffers de texto fora da stream (out-of-band);
+- buffers.bin: esses buffers, alinhados na granularidade do mmap;
+- manifest.json: posicao, tamanho e tipo de cada buffer.
+
+Os arrays viram views de um unico mmap do buffers.bin. Os buffers de
+texto (ColunaTexto, BookPayloads) ganham um mmap proprio, porque o codigo
+deles fatia e faz find no buffer esperando bytes, como no store.
+
+O primeiro worker a subir monta e grava, segurando um lock de arquivo
+(flock); os demais esperam o lock e so mapeiam o resultado. As colunas do
+proprio store nao sao gravadas de novo: entram no pickle como referencia
+(persistent id) e sao religadas ao store ja carregado.
+
+Os arquivos so sao lidos do diretorio de dados da propria API (mesmo
+nivel de confianca do books.csv), nunca de entrada externa.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos (cada um monta o seu se precisar)
+    fcntl = None
+
+from . import facets, indexes, payloads, search, store as modulo_store
+from .store import BookStore
+
+_ARQUIVO_LOCK = ".lock"
+
+# Quantas versoes gravadas manter (a atual e a anterior, que workers ainda
+# no snapshot antigo podem estar mapeando)
+_VERSOES_MANTIDAS = 2
+
+
+def _hash_codigo() -> str:
+    """Hash do codigo dos modulos cujos objetos vao no pickle."""
+    digest = hashlib.blake2b(digest_size=6)
+    for arquivo in (modulo_store.__file__, search.__file__, indexes.__file__, facets.__file__, payloads.__file__, __file__):
+        with open(arquivo, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+_VERSAO_CODIGO = _hash_codigo()
+
+
+@contextmanager
+def _lock_exclusivo(caminho: str):
+    with open(caminho, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class _Pickler(pickle.Pickler):
+    """Pickler que troca o store e as colunas dele por referencias."""
+
+    def __init__(self, arquivo, store: BookStore, buffers: List[pickle.PickleBuffer]):
+        super().__init__(arquivo, protocol=5, buffer_callback=buffers.append)
+        self._referencias = {id(objeto): nome for nome, objeto in store.colunas().items()}
+        self._referencias[id(store)] = "store"
+
+    def persistent_id(self, objeto):
+        return self._referencias.get(id(objeto))
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler que religa as referencias ao store ja carregado."""
+
+    def __init__(self, arquivo, store: BookStore, buffers):
+        super().__init__(arquivo, buffers=buffers)
+        self._objetos = dict(store.colunas(), store=store)
+
+    def persistent_load(self, referencia):
+        return self._objetos[referencia]
+
+
+def _gravar(componentes: Dict[str, Any], store: BookStore, fingerprint: str, destino: str) -> None:
+    """Grava os componentes em um diretorio temporario e publica com rename."""
+    tmp_dir = destino + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    buffers: List[pickle.PickleBuffer] = []
+    with open(os.path.join(tmp_dir, "componentes.pkl"), "wb") as f:
+        _Pickler(f, store, buffers).dump(componentes)
+
+    # Cada buffer comeca em um multiplo da granularidade do mmap
+    posicoes = []
+    with open(os.path.join(tmp_dir, "buffers.bin"), "wb") as f:
+        for buffer in buffers:
+            dados = buffer.raw()
+            inicio = -(-f.tell() // mmap.ALLOCATIONGRANULARITY) * mmap.ALLOCATIONGRANULARITY
+            f.seek(inicio)
+            f.write(dados)
+            posicoes.append([inicio, dados.nbytes, not isinstance(dados.obj, np.ndarray)])
+            buffer.release()
+        # Garante o tamanho do arquivo mesmo se o ultimo buffer for vazio
+        f.truncate(max(f.tell(), 1))
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "buffers": posicoes}, f)
+
+    os.replace(tmp_dir, destino)
+
+
+def _carregar(store: BookStore, destino: str) -> Dict[str, Any]:
+    """Mapeia os buffers gravados e remonta os componentes (sem copiar os dados)."""
+    with open(os.path.join(destino, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    with open(os.path.join(destino, "buffers.bin"), "rb") as f:
+        arquivo = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        buffers = []
+        for inicio, tamanho, texto in manifest["buffers"]:
+            if not tamanho:
+                buffers.append(b"")
+            elif texto:
+                buffers.append(mmap.mmap(f.fileno(), tamanho, access=mmap.ACCESS_READ, offset=inicio))
+            else:
+                buffers.append(arquivo[inicio:inicio + tamanho])
+    with open(os.path.join(destino, "componentes.pkl"), "rb") as f:
+        return _Unpickler(f, store, buffers).load()
+
+
+def _limpar_antigas(diretorio: str) -> None:
+    """Remove as versoes gravadas mais antigas (alem das _VERSOES_MANTIDAS mais novas)."""
+    versoes = [
+        os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+        if os.path.isdir(os.path.join(diretorio, nome))
+    ]
+    versoes.sort(key=os.path.getmtime, reverse=True)
+    for caminho in versoes[_VERSOES_MANTIDAS:]:
+        # Processos que ainda mapeiam a versao removida continuam lendo normalmente
+        shutil.rmtree(caminho, ignore_errors=True)
+
+
+def componentes_compartilhados(
+    store: BookStore,
+    fingerprint: str,
+    montar: Callable[[], Dict[str, Any]],
+    diretorio: str,
+) -> Dict[str, Any]:
+    """
+    Componentes do snapshot mapeados do diretorio compartilhado.
+
+    Se ainda nao existirem para este fingerprint, o primeiro processo a
+    pegar o lock chama `montar()` e grava; os outros esperam e mapeiam.
+    """
+    destino = os.path.join(diretorio, f"{fingerprint}-{_VERSAO_CODIGO}")
+    manifest = os.path.join(destino, "manifest.json")
+    if not os.path.exists(manifest):
+        os.makedirs(diretorio, exist_ok=True)
+        with _lock_exclusivo(os.path.join(diretorio, _ARQUIVO_LOCK)):
+            if not os.path.exists(manifest):
+                _gravar(montar(), store, fingerprint, destino)
+                _limpar_antigas(diretorio)
+    return _carregar(store, destino)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Estatisticas agregadas da colecao de livros.
+
+Os dados so mudam quando o scraping recarrega o store, entao nao faz sentido
+refazer as agregacoes a cada requisicao. Aqui calculamos tudo uma vez por
+versao dos dados e ja guardamos o JSON pronto para responder.
+"""
+
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .models import CategoryStats, StatsOverview
+from .store import BookStore
+
+
+def json_bytes(payload: Any) -> bytes:
+    """Serializa igual ao JSONResponse do FastAPI (compacto, UTF-8)."""
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def calcular_resumo(store: BookStore) -> Dict[str, Any]:
+    """
+    Estatisticas gerais: total de livros, precos e distribuicao de ratings.
+    """
+    if len(store) == 0:
+        return {
+            "total_books": 0,
+            "average_price": 0.0,
+            "min_price": 0.0,
+            "max_price": 0.0,
+            "rating_distribution": {},
+            "categories_count": 0
+        }
+
+    # Distribuicao de ratings (mais frequentes primeiro)
+    # Chaves como string para garantir compatibilidade JSON
+    ratings, contagens = np.unique(store.ratings, return_counts=True)
+    ordem = np.lexsort((ratings, -contagens))
+    rating_dist = {str(int(ratings[i])): int(contagens[i]) for i in ordem}
+
+    return {
+        "total_books": int(len(store)),
+        "average_price": round(float(store.prices.mean()), 2),
+        "min_price": float(store.prices.min()),
+        "max_price": float(store.prices.max()),
+        "rating_distribution": rating_dist,
+        "categories_count": int(len(np.unique(store.category_codes)))
+    }
+
+
+def calcular_estatisticas_categorias(store: BookStore) -> List[Dict[str, Any]]:
+    """
+    Estatisticas por categoria, ordenadas por quantidade de livros (decrescente).
+    """
+    if len(store) == 0:
+        return []
+
+    # Agrupando por codigo de categoria e calculando metricas
+    total_categorias = len(store.categories)
+    codigos = store.category_codes
+    totais = np.bincount(codigos, minlength=total_categorias)
+    somas = np.bincount(codigos, weights=store.prices, minlength=total_categorias)
+    minimos = np.full(total_categorias, np.inf)
+    maximos = np.full(total_categorias, -np.inf)
+    np.minimum.at(minimos, codigos, store.prices)
+    np.maximum.at(maximos, codigos, store.prices)
+
+    # Ordenacao: Quantidade desc, Categoria asc (desempate)
+    # As categorias do store ja estao em ordem alfabetica, entao o codigo serve de desempate
+    presentes = np.flatnonzero(totais)
+    ordem = presentes[np.lexsort((presentes, -totais[presentes]))]
+
+    # Convertendo para lista de dicionarios e arredondando valores float
+    return [
+        {
+            "category": store.categories[codigo],
+            "total_books": int(totais[codigo]),
+            "average_price": round(float(somas[codigo] / totais[codigo]), 2),
+            "min_price": float(minimos[codigo]),
+            "max_price": float(maximos[codigo])
+        }
+        for codigo in ordem
+    ]
+
+
+class StatsSnapshot:
+    """
+    Estatisticas de uma versao dos dados, ja serializadas em JSON.
+
+    O objeto e montado inteiro antes de ser publicado, entao trocar a
+    referencia global por um snapshot novo e uma operacao atomica:
+    quem estiver lendo ve a versao antiga ou a nova, nunca uma mistura.
+    """
+
+    __slots__ = ("version", "overview_json", "categories_json")
+
+    def __init__(self, store: BookStore, version: int):
+        resumo = calcular_resumo(store)
+        categorias = calcular_estatisticas_categorias(store)
+
+        # Valida os payloads uma unica vez, na montagem
+        StatsOverview.model_validate(resumo)
+        for item in categorias:
+            CategoryStats.model_validate(item)
+
+        self.version = version
+        self.overview_json = json_bytes(resumo)
+        self.categories_json = json_bytes(categorias)
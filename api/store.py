@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+Armazenamento colunar dos livros em memoria.
+
+Antes a API guardava cada livro duas vezes (lista de dicionarios + DataFrame).
+Aqui temos uma unica copia imutavel, organizada por colunas:
+
+- id, price, rating e availability ficam em arrays NumPy tipados;
+- category vira um codigo inteiro que aponta para a tupla de categorias unicas;
+- title, image_url e product_url ficam em um buffer UTF-8 compartilhado + offsets.
+
+Os dicionarios no formato do modelo Book so sao montados na hora de responder.
+
+O store tambem pode ser gravado em disco no formato binario colunar
+(save/load): um .npy por coluna numerica, um .bin + offsets por coluna de
+texto e um manifest.json. A carga usa memory-map, entao o tempo de subida
+quase nao depende do tamanho do catalogo (o CSV vira so exportacao).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+# Ordem das colunas do CSV gerado pelo scraper (e do modelo Book)
+COLUNAS_LIVRO = ["id", "title", "price", "rating", "availability", "category", "image_url", "product_url"]
+
+# Versao do formato binario gravado por BookStore.save
+FORMATO_STORE = 1
+
+# Colunas numericas do formato binario (atributo do store -> arquivo .npy)
+_COLUNAS_NUMERICAS = ["ids", "prices", "ratings", "availability", "category_codes", "title_rank"]
+_COLUNAS_TEXTO = ["titles", "image_urls", "product_urls"]
+
+# Arquivo com o nome da versao publicada dentro do diretorio do store
+_ARQUIVO_ATUAL = "CURRENT"
+
+
+def _somente_leitura(array: np.ndarray) -> np.ndarray:
+    """Marca o array como somente leitura para garantir a imutabilidade do store."""
+    array.flags.writeable = False
+    return array
+
+
+def _rank_alfabetico(titulos: Sequence[str]) -> np.ndarray:
+    """Rank alfabetico denso: titulos iguais recebem o mesmo rank."""
+    ordem = sorted(range(len(titulos)), key=titulos.__getitem__)
+    title_rank = np.zeros(len(titulos), dtype=np.int32)
+    rank_atual = 0
+    for posicao, linha in enumerate(ordem):
+        if posicao > 0 and titulos[linha] != titulos[ordem[posicao - 1]]:
+            rank_atual = posicao
+        title_rank[linha] = rank_atual
+    return title_rank
+
+
+class ColunaTexto:
+    """
+    Coluna de strings guardada em um unico buffer UTF-8.
+
+    O texto da linha i fica em buffer[offsets[i]:offsets[i + 1]]. Isso evita
+    um objeto str por linha, que e o que mais pesa em catalogos grandes.
+    """
+
+    __slots__ = ("buffer", "offsets")
+
+    def __init__(self, buffer: bytes, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = _somente_leitura(offsets)
+
+    @classmethod
+    def from_strings(cls, valores: Iterable[str]) -> "ColunaTexto":
+        """Codifica uma sequencia de strings no formato buffer + offsets."""
+        codificados = [str(valor).encode("utf-8") for valor in valores]
+        offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+        if codificados:
+            np.cumsum([len(item) for item in codificados], out=offsets[1:])
+        return cls(b"".join(codificados), offsets)
+
+    @classmethod
+    def concatenar(cls, colunas: Sequence["ColunaTexto"]) -> "ColunaTexto":
+        """Junta colunas na ordem (um unico buffer, offsets deslocados)."""
+        offsets = np.zeros(sum(len(coluna) for coluna in colunas) + 1, dtype=np.int64)
+        linha = 0
+        for coluna in colunas:
+            offsets[linha + 1:linha + len(coluna) + 1] = coluna.offsets[1:] + offsets[linha]
+            linha += len(coluna)
+        return cls(b"".join(bytes(coluna.buffer) for coluna in colunas), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, linha: int) -> str:
+        inicio, fim = self.offsets[linha], self.offsets[linha + 1]
+        return self.buffer[inicio:fim].decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        """Decodifica a coluna inteira (usar so em rotinas de carga/analise)."""
+        return [self[linha] for linha in range(len(self))]
+
+    def __reduce_ex__(self, protocolo):
+        # Com pickle 5 o buffer vai fora da stream (out-of-band); ver shared.py
+        buffer = pickle.PickleBuffer(self.buffer) if protocolo >= 5 else bytes(self.buffer)
+        return (ColunaTexto, (buffer, self.offsets))
+
+    def save(self, prefixo: str) -> None:
+        """Grava a coluna em prefixo.bin (buffer) e prefixo.offsets.npy."""
+        with open(prefixo + ".bin", "wb") as f:
+            f.write(self.buffer)
+        np.save(prefixo + ".offsets.npy", self.offsets)
+
+    @classmethod
+    def load(cls, prefixo: str, usar_mmap: bool = True) -> "ColunaTexto":
+        """Le a coluna gravada por save (buffer e offsets mapeados em memoria)."""
+        offsets = np.load(prefixo + ".offsets.npy", mmap_mode="r" if usar_mmap else None)
+        with open(prefixo + ".bin", "rb") as f:
+            # mmap nao aceita arquivo vazio
+            if usar_mmap and os.fstat(f.fileno()).st_size > 0:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+        return cls(buffer, offsets)
+
+
+class BookStore:
+    """
+    Store imutavel e colunar com todos os livros carregados.
+
+    A posicao (linha) de cada livro e a mesma ordem do CSV, que e a ordem
+    em que o scraper encontrou os livros.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        prices: np.ndarray,
+        ratings: np.ndarray,
+        availability: np.ndarray,
+        category_codes: np.ndarray,
+        categories: Sequence[str],
+        titles: ColunaTexto,
+        image_urls: ColunaTexto,
+        product_urls: ColunaTexto,
+        title_rank: np.ndarray,
+    ):
+        self.ids = _somente_leitura(ids)
+        self.prices = _somente_leitura(prices)
+        self.ratings = _somente_leitura(ratings)
+        self.availability = _somente_leitura(availability)
+        self.category_codes = _somente_leitura(category_codes)
+        self.categories = tuple(categories)
+        self.titles = titles
+        self.image_urls = image_urls
+        self.product_urls = product_urls
+        # Posicao de cada titulo na ordem alfabetica (usado como chave de desempate)
+        self.title_rank = _somente_leitura(title_rank)
+        self._montar_indice_ids()
+
+    def _montar_indice_ids(self) -> None:
+        """
+        Monta o indice id -> linha, refeito a cada carga (o store e imutavel).
+
+        Como os ids do scraper sao sequenciais, normalmente usamos um array
+        denso indexado pelo proprio id (consulta O(1)). Se os ids forem muito
+        esparsos, caimos para ids ordenados + busca binaria.
+        Em ids repetidos vale a primeira linha, como no loop antigo.
+        """
+        ids_unicos, primeiras_linhas = np.unique(self.ids, return_index=True)
+        self._linha_por_id = None
+        self._ids_ordenados = _somente_leitura(ids_unicos)
+        self._linhas_ordenadas = _somente_leitura(primeiras_linhas.astype(np.int64))
+
+        if len(ids_unicos) and ids_unicos[0] >= 0 and ids_unicos[-1] < 4 * len(ids_unicos) + 1024:
+            linha_por_id = np.full(int(ids_unicos[-1]) + 1, -1, dtype=np.int64)
+            linha_por_id[ids_unicos] = primeiras_linhas
+            self._linha_por_id = _somente_leitura(linha_por_id)
+
+    @classmethod
+    def vazio(cls) -> "BookStore":
+        """Cria um store sem livros (usado quando o CSV nao existe)."""
+        return cls.from_columns({coluna: [] for coluna in COLUNAS_LIVRO})
+
+    @classmethod
+    def from_dataframe(cls, df) -> "BookStore":
+        """Monta o store a partir do DataFrame lido do CSV."""
+        return cls.from_columns({coluna: df[coluna].tolist() for coluna in COLUNAS_LIVRO})
+
+    @classmethod
+    def from_columns(cls, colunas: Dict[str, Sequence[Any]]) -> "BookStore":
+        """Monta o store a partir de um dicionario coluna -> lista de valores."""
+        titulos = [str(titulo) for titulo in colunas["title"]]
+        categorias_livro = [str(categoria) for categoria in colunas["category"]]
+
+        # Dicionario de categorias: cada livro guarda so o codigo da categoria
+        categorias = sorted(set(categorias_livro))
+        codigo_por_categoria = {nome: codigo for codigo, nome in enumerate(categorias)}
+        tipo_codigo = np.int16 if len(categorias) <= np.iinfo(np.int16).max else np.int32
+        codigos = np.array([codigo_por_categoria[nome] for nome in categorias_livro], dtype=tipo_codigo)
+
+        return cls(
+            ids=np.asarray(colunas["id"], dtype=np.int64),
+            prices=np.asarray(colunas["price"], dtype=np.float64),
+            ratings=np.asarray(colunas["rating"], dtype=np.int8),
+            availability=np.asarray(colunas["availability"], dtype=np.int32),
+            category_codes=codigos,
+            categories=categorias,
+            titles=ColunaTexto.from_strings(titulos),
+            image_urls=ColunaTexto.from_strings(colunas["image_url"]),
+            product_urls=ColunaTexto.from_strings(colunas["product_url"]),
+            title_rank=_rank_alfabetico(titulos),
+        )
+
+    @classmethod
+    def from_csv(cls, caminho: str, linhas_por_bloco: int = 50_000) -> "BookStore":
+        """
+        Le o CSV em blocos e monta o store.
+
+        Cada bloco vira colunas compactas assim que e lido, entao o pico de
+        memoria e o store em si mais um bloco (e nao o DataFrame inteiro).
+        """
+        import pandas as pd
+
+        # Tipo dos textos fixo: um bloco so com titulos numericos nao vira float
+        textos = {coluna: str for coluna in ("title", "category", "image_url", "product_url")}
+        partes = [
+            cls.from_dataframe(bloco)
+            for bloco in pd.read_csv(caminho, chunksize=linhas_por_bloco, dtype=textos)
+        ]
+        return cls.concatenar(partes) if partes else cls.vazio()
+
+    @classmethod
+    def concatenar(cls, partes: Sequence["BookStore"]) -> "BookStore":
+        """Junta stores na ordem (ex: os blocos de um CSV lido aos poucos)."""
+        # Categorias unificadas; os codigos de cada parte sao traduzidos
+        categorias = sorted(set().union(*(parte.categories for parte in partes)))
+        codigo_por_categoria = {nome: codigo for codigo, nome in enumerate(categorias)}
+        tipo_codigo = np.int16 if len(categorias) <= np.iinfo(np.int16).max else np.int32
+        codigos = np.concatenate([
+            np.array([codigo_por_categoria[nome] for nome in parte.categories], dtype=tipo_codigo)[parte.category_codes]
+            for parte in partes
+        ])
+
+        titles = ColunaTexto.concatenar([parte.titles for parte in partes])
+        return cls(
+            ids=np.concatenate([parte.ids for parte in partes]),
+            prices=np.concatenate([parte.prices for parte in partes]),
+            ratings=np.concatenate([parte.ratings for parte in partes]),
+            availability=np.concatenate([parte.availability for parte in partes]),
+            category_codes=codigos,
+            categories=categorias,
+            titles=titles,
+            image_urls=ColunaTexto.concatenar([parte.image_urls for parte in partes]),
+            product_urls=ColunaTexto.concatenar([parte.product_urls for parte in partes]),
+            title_rank=_rank_alfabetico(titles.tolist()),
+        )
+
+    def save(self, diretorio: str) -> str:
+        """
+        Grava o store no formato binario colunar e publica como versao atual.
+
+        Cada gravacao vai para um subdiretorio novo e so depois o arquivo
+        CURRENT passa a apontar para ela (troca atomica), entao um leitor
+        nunca ve uma versao pela metade. Versoes antigas sao removidas.
+        Retorna o caminho da versao gravada.
+        """
+        os.makedirs(diretorio, exist_ok=True)
+        nome = f"v{time.time_ns()}"
+        tmp_dir = os.path.join(diretorio, "." + nome + ".tmp")
+        os.makedirs(tmp_dir)
+
+        for coluna in _COLUNAS_NUMERICAS:
+            np.save(os.path.join(tmp_dir, coluna + ".npy"), getattr(self, coluna))
+        for coluna in _COLUNAS_TEXTO:
+            getattr(self, coluna).save(os.path.join(tmp_dir, coluna))
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"format": FORMATO_STORE, "rows": len(self), "categories": list(self.categories)}, f, ensure_ascii=False)
+
+        versao_dir = os.path.join(diretorio, nome)
+        os.replace(tmp_dir, versao_dir)
+        tmp_atual = os.path.join(diretorio, _ARQUIVO_ATUAL + ".tmp")
+        with open(tmp_atual, "w", encoding="utf-8") as f:
+            f.write(nome)
+        os.replace(tmp_atual, os.path.join(diretorio, _ARQUIVO_ATUAL))
+
+        # Processos que ainda mapeiam a versao antiga continuam lendo normalmente
+        # (no Windows a remocao falha enquanto o arquivo estiver aberto; tudo bem)
+        for entrada in os.listdir(diretorio):
+            caminho = os.path.join(diretorio, entrada)
+            if entrada != nome and os.path.isdir(caminho):
+                shutil.rmtree(caminho, ignore_errors=True)
+        return versao_dir
+
+    @staticmethod
+    def versao_atual(diretorio: str) -> str:
+        """Caminho da versao publicada no diretorio (FileNotFoundError se nao houver)."""
+        with open(os.path.join(diretorio, _ARQUIVO_ATUAL), encoding="utf-8") as f:
+            return os.path.join(diretorio, f.read().strip())
+
+    @classmethod
+    def load(cls, diretorio: str, usar_mmap: bool = True) -> "BookStore":
+        """
+        Le o store gravado por save.
+
+        Com usar_mmap=True as colunas sao mapeadas em memoria (somente
+        leitura): nada e copiado ou convertido na carga, as paginas do
+        arquivo sao lidas sob demanda. Levanta ValueError se o formato
+        for de outra versao ou os arquivos estiverem inconsistentes.
+        """
+        versao_dir = cls.versao_atual(diretorio)
+        with open(os.path.join(versao_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMATO_STORE:
+            raise ValueError(f"formato do store nao suportado: {manifest.get('format')}")
+
+        modo = "r" if usar_mmap else None
+        colunas = {coluna: np.load(os.path.join(versao_dir, coluna + ".npy"), mmap_mode=modo) for coluna in _COLUNAS_NUMERICAS}
+        colunas.update({coluna: ColunaTexto.load(os.path.join(versao_dir, coluna), usar_mmap) for coluna in _COLUNAS_TEXTO})
+        if any(len(valores) != manifest["rows"] for valores in colunas.values()):
+            raise ValueError(f"store inconsistente em {versao_dir}")
+        return cls(categories=manifest["categories"], **colunas)
+
+    def colunas(self) -> Dict[str, Any]:
+        """Colunas do store (atributo -> array ou ColunaTexto)."""
+        return {coluna: getattr(self, coluna) for coluna in _COLUNAS_NUMERICAS + _COLUNAS_TEXTO}
+
+    def fingerprint(self) -> str:
+        """
+        Impressao digital do conteudo do store (16 caracteres hex).
+
+        Muda sempre que algum livro muda e e igual entre processos que
+        carregaram os mesmos dados, por isso serve de base para as ETags.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        for coluna in _COLUNAS_NUMERICAS:
+            digest.update(np.ascontiguousarray(getattr(self, coluna)))
+        for coluna in _COLUNAS_TEXTO:
+            texto = getattr(self, coluna)
+            digest.update(texto.offsets)
+            digest.update(texto.buffer)
+        digest.update("\n".join(self.categories).encode("utf-8"))
+        return digest.hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def linhas_por_ids(self, ids: Sequence[int]) -> np.ndarray:
+        """
+        Converte ids de livros em linhas do store, de forma vetorizada.
+
+        Retorna um array do mesmo tamanho de ids, com -1 onde o id nao existe.
+        """
+        # Ids fora do int64 (validos no JSON) nao existem no store
+        fora = None
+        if not isinstance(ids, np.ndarray):
+            limites = np.iinfo(np.int64)
+            fora = np.array([not limites.min <= id_livro <= limites.max for id_livro in ids], dtype=bool)
+            if fora.any():
+                ids = [0 if foi else id_livro for id_livro, foi in zip(ids, fora.tolist())]
+            else:
+                fora = None
+        ids = np.asarray(ids, dtype=np.int64)
+        linhas = np.full(len(ids), -1, dtype=np.int64)
+        if self._linha_por_id is not None:
+            validos = (ids >= 0) & (ids < len(self._linha_por_id))
+            linhas[validos] = self._linha_por_id[ids[validos]]
+        elif len(self._ids_ordenados):
+            posicoes = np.searchsorted(self._ids_ordenados, ids)
+            posicoes = np.minimum(posicoes, len(self._ids_ordenados) - 1)
+            encontrados = self._ids_ordenados[posicoes] == ids
+            linhas[encontrados] = self._linhas_ordenadas[posicoes[encontrados]]
+        if fora is not None:
+            linhas[fora] = -1
+        return linhas
+
+    def linha_por_id(self, id_livro: int) -> int:
+        """Retorna a linha do livro com esse id, ou -1 se nao existir."""
+        return int(self.linhas_por_ids([id_livro])[0])
+
+    def livro(self, linha: int) -> Dict[str, Any]:
+        """Monta o dicionario (formato Book) de uma linha do store."""
+        linha = int(linha)
+        return {
+            "id": int(self.ids[linha]),
+            "title": self.titles[linha],
+            "price": float(self.prices[linha]),
+            "rating": int(self.ratings[linha]),
+            "availability": int(self.availability[linha]),
+            "category": self.categories[self.category_codes[linha]],
+            "image_url": self.image_urls[linha],
+            "product_url": self.product_urls[linha],
+        }
+
+    def livros(self, linhas: Iterable[int]) -> List[Dict[str, Any]]:
+        """Monta os dicionarios (formato Book) de varias linhas, na ordem recebida."""
+        return [self.livro(linha) for linha in linhas]
+
+    def to_dataframe(self):
+        """
+        Materializa o store como DataFrame (so para exportacao/analise).
+
+        O pandas e importado aqui dentro porque so essas rotinas precisam dele.
+        """
+        import pandas as pd
+
+        linhas = range(len(self))
+        return pd.DataFrame({
+            "id": self.ids,
+            "title": self.titles.tolist(),
+            "price": self.prices,
+            "rating": self.ratings.astype(np.int64),
+            "availability": self.availability.astype(np.int64),
+            "category": [self.categories[codigo] for codigo in self.category_codes],
+            "image_url": [self.image_urls[linha] for linha in linhas],
+            "product_url": [self.product_urls[linha] for linha in linhas],
+        }, columns=COLUNAS_LIVRO)
@@ -8,38 +8,70 @@ Separei aqui para nao poluir o arquivo principal da API (main.py).
 
 import os
 from pathlib import Path
-import pandas as pd
-from typing import List, Dict, Any
+from typing import Optional
 
 # Importando constantes do nosso arquivo de configuracao original, assim mantemos consistencia entre o scraper e a API
-from scripts.config import DATA_DIR, CSV_FILENAME
+from scripts.config import DATA_DIR, CSV_FILENAME, STORE_DIRNAME, INDEX_DIRNAME
+from .store import BookStore
 
-def carregar_dados_livros() -> List[Dict[str, Any]]:
+
+def diretorio_indices() -> Optional[str]:
+    """
+    Diretorio dos indices compartilhados entre os workers (data/books_index).
+
+    Retorna None se o compartilhamento estiver desligado (API_SHARED_INDEXES=0):
+    cada processo monta os proprios indices em memoria.
     """
-    Le o arquivo CSV gerado pelo scraper e retorna como uma lista de dicionarios.
+    if os.getenv("API_SHARED_INDEXES", "1") == "0":
+        return None
+    return str(Path(__file__).resolve().parent.parent / DATA_DIR / INDEX_DIRNAME)
+
+def carregar_dados_livros() -> BookStore:
+    """
+    Carrega os livros gerados pelo scraper e retorna o store colunar.
     
-    Uso o pandas aqui porque ele e muito eficiente para ler CSV e
-    tratar dados, alem de ja estar nos requisitos do projeto.
+    O caminho rapido e o store binario (data/books_store), mapeado em
+    memoria sem conversao nenhuma. Se ele nao existir ou estiver mais
+    velho que o CSV (ex: CSV editado na mao), lemos o CSV com pandas e
+    gravamos o store binario para as proximas cargas.
     
     Retorna:
-        Lista de dicionarios contendo os dados dos livros.
-        Se o arquivo nao existir, retorna uma lista vazia.
+        BookStore com os dados dos livros.
+        Se nenhum dos arquivos existir, retorna um store vazio.
     """
     # Monta o caminho completo do arquivo usando Path para compatibilidade
     base_dir = Path(__file__).resolve().parent.parent
     caminho_csv = base_dir / DATA_DIR / CSV_FILENAME
+    caminho_store = base_dir / DATA_DIR / STORE_DIRNAME
+    
+    try:
+        versao_store = BookStore.versao_atual(str(caminho_store))
+        if not os.path.exists(caminho_csv) or os.path.getmtime(versao_store) >= os.path.getmtime(caminho_csv):
+            return BookStore.load(str(caminho_store))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"AVISO: store binario ignorado ({e})")
     
     # Verifica se o arquivo existe antes de tentar ler
     if not os.path.exists(caminho_csv):
         print(f"AVISO: Arquivo {caminho_csv} nao encontrado.")
-        return []
+        return BookStore.vazio()
     
     try:
-        # Le o CSV usando pandas
+        # Le o CSV usando pandas (importado so aqui: o caminho normal e o store binario)
+        import pandas as pd
+
         df = pd.read_csv(caminho_csv)
         
-        # Converte o DataFrame para uma lista de dicionarios (records) para facilitar o retorno em formato JSON pela API
-        return df.to_dict(orient="records")
+        # Converte o DataFrame para o store colunar (uma unica copia dos dados em memoria)
+        store = BookStore.from_dataframe(df)
     except Exception as e:
         print(f"ERRO ao ler CSV: {e}")
-        return []
+        return BookStore.vazio()
+    
+    try:
+        store.save(str(caminho_store))
+    except OSError as e:
+        print(f"AVISO: nao foi possivel gravar o store binario ({e})")
+    return store
@@ -15,16 +15,34 @@ st.set_page_config(
 # Configuração da URL da API
 API_BASE_URL = os.environ.get("API_BASE_URL", "http://127.0.0.1:8000")
 
+@st.cache_resource
+def etag_cache():
+    """Respostas já recebidas (ETag + JSON), compartilhadas entre as execuções do script."""
+    return {}
+
 def fetch_api(endpoint, params=None):
     """
     Função auxiliar para consumir a API.
     Retorna o JSON da resposta ou None em caso de erro.
+    Reenvia a ETag da última resposta (If-None-Match): se os dados não
+    mudaram a API responde 304 sem corpo e usamos o JSON guardado.
     """
     url = f"{API_BASE_URL}{endpoint}"
+    cache = etag_cache()
+    key = (url, tuple(sorted((params or {}).items())))
+    cached = cache.get(key)
     try:
-        response = requests.get(url, params=params, timeout=5)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = requests.get(url, params=params, headers=headers, timeout=5)
+        if response.status_code == 304 and cached:
+            return cached[1]
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        if response.headers.get("ETag"):
+            if len(cache) >= 256:
+                cache.pop(next(iter(cache)))
+            cache[key] = (response.headers["ETag"], data)
+        return data
     except requests.exceptions.ConnectionError:
         st.error(f"Erro de Conexão: Não foi possível conectar a {url}. Verifique se a API está rodando.")
         return None
@@ -131,9 +149,18 @@ def render_search():
         title_query = st.text_input("Título (parcial)")
     with col2:
         cat_query = st.text_input("Categoria (parcial)")
+    
+    # Autocomplete: o endpoint /suggest e barato, entao consultamos a cada alteracao
+    if title_query or cat_query:
+        sugestoes = fetch_api("/api/v1/books/suggest", params={"q": title_query or cat_query, "limit": 5})
+        if sugestoes:
+            if title_query and sugestoes["titles"]:
+                st.caption("Títulos sugeridos: " + " | ".join(item["title"] for item in sugestoes["titles"]))
+            if sugestoes["categories"]:
+                st.caption("Categorias sugeridas: " + ", ".join(sugestoes["categories"]))
         
     if st.button("Pesquisar"):
-        params = {}
+        params = {"limit": 100}
         if title_query:
             params["title"] = title_query
         if cat_query:
@@ -158,9 +185,14 @@ def render_top_rated():
     st.header("Top Rated Books")
     
     limit = st.slider("Quantidade de livros", min_value=5, max_value=50, value=10)
+    categorias = fetch_api("/api/v1/categories") or []
+    categoria = st.selectbox("Categoria", ["Todas"] + categorias)
     
     if st.button("Carregar Lista"):
-        data = fetch_api("/api/v1/books/top-rated", params={"limit": limit})
+        params = {"limit": limit}
+        if categoria != "Todas":
+            params["category"] = categoria
+        data = fetch_api("/api/v1/books/top-rated", params=params)
         if data:
             df = pd.DataFrame(data)
             if not df.empty:
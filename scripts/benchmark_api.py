@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de latencia das rotas de leitura (p50 / p99).
+
+Chama o app ASGI direto (sem rede nem servidor), entao mede so o custo da
+API: roteamento, validacao, consulta aos indices e serializacao.
+Para simular um catalogo maior, o books.csv e replicado --scale vezes
+(com ids novos) e publicado como snapshot antes das medicoes.
+
+Com --predictions N, faz tambem N predicoes individuais (POST
+/ml/predictions) a partir de --clients clientes concorrentes e mostra a
+vazao e as metricas do micro-batching (compare com
+PREDICTION_MAX_BATCH_SIZE=1 para ver o ganho dos lotes).
+
+Uso:
+    python -m scripts.benchmark_api [--scale 100] [--requests 300] [--predictions 5000 --clients 64]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.config import DATA_DIR, CSV_FILENAME
+
+ROTAS = [
+    ("GET", "/api/v1/books", "page=3&size=100"),
+    ("GET", "/api/v1/books", "sort=price&size=100"),
+    ("GET", "/api/v1/books", "sort=title&order=desc&page=900&size=100"),
+    ("GET", "/api/v1/books/search", "title=the&limit=100"),
+    ("GET", "/api/v1/books/price-range", "min=10&max=30&size=100"),
+    ("GET", "/api/v1/books/top-rated", "limit=50"),
+    ("GET", "/api/v1/books/query", "category=Poetry&category=Fiction&rating=4&rating=5&min_price=10&max_price=40&size=50"),
+    ("GET", "/api/v1/books/42", ""),
+]
+
+
+async def chamar(app, metodo, path, query, corpo=b""):
+    """Executa uma requisicao no app ASGI e retorna (status, corpo)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": metodo,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    resposta = {"status": None, "corpo": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": corpo, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            resposta["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            resposta["corpo"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return resposta["status"], resposta["corpo"]
+
+
+def catalogo(scale):
+    """books.csv replicado `scale` vezes, com ids sequenciais."""
+    df = pd.read_csv(os.path.join(DATA_DIR, CSV_FILENAME))
+    grande = pd.concat([df] * scale, ignore_index=True)
+    grande["id"] = np.arange(1, len(grande) + 1)
+    return grande
+
+
+async def medir(app, requisicoes):
+    for metodo, path, query in ROTAS:
+        for _ in range(20):  # aquecimento
+            await chamar(app, metodo, path, query)
+        tempos = []
+        for _ in range(requisicoes):
+            inicio = time.perf_counter()
+            status, corpo = await chamar(app, metodo, path, query)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        tempos.sort()
+        p99 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))]
+        rota = f"{path}?{query}" if query else path
+        print(f"{rota:<56} {status}  {len(corpo) / 1024:7.1f} KB  p50 {statistics.median(tempos):7.2f} ms  p99 {p99:7.2f} ms")
+
+
+async def medir_predicoes(app, quantidade, clientes):
+    """Faz `quantidade` predicoes individuais com `clientes` clientes concorrentes e mede a vazao."""
+    from api.main import PREDICTION_BATCHER
+
+    rng = np.random.default_rng(0)
+    corpos = [
+        json.dumps({"price": float(preco), "rating": int(nota), "availability": int(estoque)}).encode()
+        for preco, nota, estoque in zip(rng.uniform(10, 60, quantidade), rng.integers(1, 6, quantidade), rng.integers(0, 23, quantidade))
+    ]
+    await chamar(app, "POST", "/api/v1/ml/predictions", "", corpos[0])  # treina o modelo
+
+    async def cliente(meus_corpos):
+        # Cada cliente manda uma predicao por vez, como um loop de chamadas
+        return [(await chamar(app, "POST", "/api/v1/ml/predictions", "", corpo))[0] for corpo in meus_corpos]
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(cliente(corpos[posicao::clientes]) for posicao in range(clientes)))
+    duracao = time.perf_counter() - inicio
+    erros = sum(status != 200 for statuses in resultados for status in statuses)
+    metricas = PREDICTION_BATCHER.metricas()
+    print(f"\n{quantidade} predicoes, {clientes} clientes: {quantidade / duracao:,.0f} req/s ({erros} erros)")
+    print(f"lotes: {metricas['batches']}  tamanho medio: {metricas['average_batch_size']}  histograma: {metricas['batch_size_histogram']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia das rotas de leitura")
+    parser.add_argument("--scale", type=int, default=100, help="quantas vezes replicar o books.csv")
+    parser.add_argument("--requests", type=int, default=300, help="requisicoes medidas por rota")
+    parser.add_argument("--predictions", type=int, default=0, help="predicoes individuais a medir (0 = nao medir)")
+    parser.add_argument("--clients", type=int, default=64, help="clientes concorrentes nas predicoes")
+    args = parser.parse_args()
+
+    from api.dataset import publicar_store
+    from api.main import app
+    from api.store import BookStore
+
+    df = catalogo(args.scale)
+    publicar_store(BookStore.from_dataframe(df))
+    print(f"{len(df)} livros\n")
+    asyncio.run(medir(app, args.requests))
+    if args.predictions:
+        asyncio.run(medir_predicoes(app, args.predictions, args.clients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do parse das paginas de categoria (sem rede).
+
+Monta paginas no mesmo formato do books.toscrape.com a partir do
+data/books.csv (20 livros por pagina, com menu lateral, cabecalho e
+rodape) e mede paginas/segundo em cada modo:
+
+- full: BeautifulSoup da pagina inteira (jeito antigo);
+- fast: SoupStrainer so com os cards de livro e o paginador;
+- fast + pool: o modo fast em um pool de processos.
+
+Tambem confere que todos os modos extraem exatamente os mesmos livros.
+
+Uso:
+    python -m scripts.benchmark_parser [--pages 200] [--workers 4]
+"""
+
+import argparse
+import html
+import os
+import time
+
+import pandas as pd
+
+from scripts.config import BASE_URL, DATA_DIR, CSV_FILENAME, RATING_MAP
+from scripts.scraper import create_parser_pool, submit_parse
+
+RATING_NAMES = {valor: nome for nome, valor in RATING_MAP.items()}
+BOOKS_PER_PAGE = 20
+
+
+def render_article(book):
+    """HTML de um card de livro (article.product_pod), como no site."""
+    href = "../../../" + book["product_url"].split("/catalogue/", 1)[1]
+    img = "../../../.." + book["image_url"].split(BASE_URL, 1)[-1]
+    title = html.escape(book["title"])
+    if book["availability"]:
+        availability = '<p class="instock availability">\n    <i class="icon-ok"></i>\n    \n        In stock\n    \n</p>'
+    else:
+        availability = '<p class="availability">Out of stock</p>'
+    return (
+        '<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3"><article class="product_pod">'
+        f'<div class="image_container"><a href="{href}"><img src="{img}" alt="{title}" class="thumbnail"></a></div>'
+        f'<p class="star-rating {RATING_NAMES[int(book["rating"])]}"><i class="icon-star"></i><i class="icon-star"></i>'
+        '<i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i></p>'
+        f'<h3><a href="{href}" title="{title}">{html.escape(book["title"][:20])}...</a></h3>'
+        f'<div class="product_price"><p class="price_color">£{book["price"]:.2f}</p>{availability}'
+        '<form><button type="submit" class="btn btn-primary btn-block">Add to basket</button></form></div>'
+        '</article></li>'
+    )
+
+
+def render_page(books, categories, page, total_pages):
+    """Pagina de categoria completa: cabecalho, menu lateral, cards e paginador."""
+    side = "".join(
+        f'<li>\n<a href="../{i}/index.html">\n  {html.escape(name)}\n</a>\n</li>'
+        for i, name in enumerate(categories)
+    )
+    pager = ""
+    if total_pages > 1:
+        pager = '<ul class="pager">'
+        if page > 1:
+            pager += f'<li class="previous"><a href="page-{page - 1}.html">previous</a></li>'
+        pager += f'<li class="current">\n    Page {page} of {total_pages}\n</li>'
+        if page < total_pages:
+            pager += f'<li class="next"><a href="page-{page + 1}.html">next</a></li>'
+        pager += "</ul>"
+    return (
+        '<!DOCTYPE html><html lang="en-us"><head><meta charset="utf-8"><title>Books to Scrape</title>'
+        '<link rel="stylesheet" href="../../../../static/oscar/css/styles.css"></head><body id="default">'
+        '<header class="header container-fluid"><div class="page_inner"><div class="row">'
+        '<div class="col-sm-8 h1"><a href="../../../../index.html">Books to Scrape</a></div></div></div></header>'
+        '<div class="container-fluid page"><div class="page_inner"><ul class="breadcrumb">'
+        '<li><a href="../../../../index.html">Home</a></li><li><a href="../../books_1/index.html">Books</a></li></ul>'
+        '<div class="row"><aside class="sidebar col-sm-4 col-md-3"><div class="side_categories">'
+        f'<ul class="nav nav-list"><li><a href="../../books_1/index.html">Books</a><ul>{side}</ul></li></ul></div></aside>'
+        '<div class="col-sm-8 col-md-9"><section><div class="alert alert-warning" role="alert">'
+        '<strong>Warning!</strong> This is a demo website for web scraping purposes.</div>'
+        f'<ol class="row">{"".join(render_article(book) for book in books)}</ol><div>{pager}</div></section></div>'
+        '</div></div></div><footer class="footer container-fluid"></footer>'
+        '<script src="../../../../static/oscar/js/oscar/ui.js"></script></body></html>'
+    )
+
+
+def build_pages(df, limit):
+    """Gera (html, page_url, categoria, first_page) para as primeiras `limit` paginas."""
+    categories = sorted(df["category"].unique())
+    pages = []
+    for index, (category, group) in enumerate(df.groupby("category", sort=True)):
+        books = group.to_dict(orient="records")
+        chunks = [books[k:k + BOOKS_PER_PAGE] for k in range(0, len(books), BOOKS_PER_PAGE)]
+        for page, chunk in enumerate(chunks, 1):
+            page_url = f"{BASE_URL}/catalogue/category/books/cat_{index}/page-{page}.html"
+            pages.append((render_page(chunk, categories, page, len(chunks)), page_url, category, page == 1))
+            if len(pages) == limit:
+                return pages
+    # Poucas paginas no CSV: repete ate chegar no tamanho pedido
+    return (pages * (limit // len(pages) + 1))[:limit]
+
+
+def run(pages, mode, pool=None):
+    """Faz o parse de todas as paginas e retorna (segundos, resultados)."""
+    inicio = time.perf_counter()
+    futures = [submit_parse(pool, text, url, category, first, False, mode) for text, url, category, first in pages]
+    results = [future.result() for future in futures]
+    return time.perf_counter() - inicio, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do parse das paginas de categoria")
+    parser.add_argument("--pages", type=int, default=200, help="quantas paginas gerar")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos do pool")
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(DATA_DIR, CSV_FILENAME))
+    pages = build_pages(df, args.pages)
+    size = sum(len(text) for text, _, _, _ in pages) / len(pages)
+    print(f"{len(pages)} paginas, {size / 1024:.1f} KB em media\n")
+
+    full_time, expected = run(pages, "full")
+    measures = [("full", full_time, expected)]
+    measures.append(("fast",) + run(pages, "fast"))
+
+    pool = create_parser_pool(max(1, args.workers))
+    try:
+        run(pages[:args.workers], "fast", pool)  # aquece os processos
+        measures.append((f"fast + pool ({args.workers})",) + run(pages, "fast", pool))
+    finally:
+        pool.shutdown()
+
+    for name, seconds, results in measures:
+        status = "ok" if results == expected else "DIFERENTE"
+        print(f"{name:<16} {len(pages) / seconds:8.1f} paginas/s  {full_time / seconds:5.2f}x  [{status}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da subida da API.
+
+Mede, em processos novos (sem cache de import):
+
+- import: tempo para importar api.main e quais modulos pesados vieram junto;
+- live: tempo ate o uvicorn responder /api/v1/health/live;
+- ready: tempo ate /api/v1/health/ready responder 200 (dados e indices prontos).
+
+Uso:
+    python -m scripts.benchmark_startup [--runs 5] [--port 8010]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+MODULOS_PESADOS = ["pandas", "bs4", "lxml", "requests", "jwt", "scripts.scraper"]
+
+CODIGO_IMPORT = f"""
+import json, sys, time
+inicio = time.perf_counter()
+import api.main
+print(json.dumps({{
+    "segundos": time.perf_counter() - inicio,
+    "pesados": [m for m in {MODULOS_PESADOS!r} if m in sys.modules],
+}}))
+"""
+
+
+def medir_import():
+    """Importa api.main em um interpretador novo e retorna (segundos, modulos pesados importados)."""
+    saida = subprocess.run([sys.executable, "-c", CODIGO_IMPORT], capture_output=True, text=True, check=True)
+    resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+    return resultado["segundos"], resultado["pesados"]
+
+
+def aguardar(url, inicio, timeout=60):
+    """Consulta a url ate responder 200 e retorna os segundos desde `inicio`."""
+    while time.perf_counter() - inicio < timeout:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - inicio
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} nao respondeu em {timeout}s")
+
+
+def medir_subida(port):
+    """Sobe o uvicorn e retorna (segundos ate live, segundos ate ready)."""
+    base = f"http://127.0.0.1:{port}/api/v1/health"
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        live = aguardar(base + "/live", inicio)
+        ready = aguardar(base + "/ready", inicio)
+    finally:
+        processo.terminate()
+        processo.wait()
+    return live, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da subida da API")
+    parser.add_argument("--runs", type=int, default=5, help="quantas medicoes de cada tipo")
+    parser.add_argument("--port", type=int, default=8010, help="porta usada pelo uvicorn")
+    args = parser.parse_args()
+
+    imports = [medir_import() for _ in range(args.runs)]
+    subidas = [medir_subida(args.port) for _ in range(args.runs)]
+
+    mediana = lambda valores: statistics.median(valores) * 1000
+    print(f"import api.main  {mediana([s for s, _ in imports]):8.0f} ms  (pesados: {', '.join(imports[-1][1]) or 'nenhum'})")
+    print(f"live             {mediana([live for live, _ in subidas]):8.0f} ms")
+    print(f"ready            {mediana([ready for _, ready in subidas]):8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ RM: 369722
 FIAP - Pos Tech Machine Learning Engineering
 """
 
+import os
+
 # =============================================================================
 # URLs DO SITE
 # =============================================================================
@@ -18,7 +20,8 @@ FIAP - Pos Tech Machine Learning Engineering
 # URL principal do site que vamos fazer scraping
 # Esse e um site feito especificamente pra treinar web scraping, entao
 # nao tem problema fazer varias requisicoes
-BASE_URL = "https://books.toscrape.com"
+# Da pra apontar para um espelho local com a variavel SCRAPER_BASE_URL
+BASE_URL = os.getenv("SCRAPER_BASE_URL", "https://books.toscrape.com").rstrip("/")
 
 # URL do catalogo onde ficam os livros
 # Uso f-string pra juntar com a BASE_URL
@@ -36,6 +39,22 @@ DATA_DIR = "data"
 # Nome do arquivo CSV que sera gerado
 CSV_FILENAME = "books.csv"
 
+# Diretorio com a versao binaria colunar dos dados (arquivos .npy + textos),
+# que a API carrega com memory-map. O CSV fica como formato de exportacao.
+STORE_DIRNAME = "books_store"
+
+# Diretorio com os indices da API ja montados (um subdiretorio por versao
+# dos dados), mapeados em memoria e compartilhados entre os workers
+INDEX_DIRNAME = "books_index"
+
+# Estado do ultimo crawl (ETag/Last-Modified e hash de cada pagina),
+# usado para o re-scraping incremental
+CRAWL_STATE_FILENAME = "crawl_state.json"
+
+# Checkpoint do crawl em andamento (categorias ja gravadas no CSV parcial),
+# usado pelo --resume. E apagado quando o crawl termina.
+CHECKPOINT_FILENAME = "scrape_checkpoint.json"
+
 
 # =============================================================================
 # PARAMETROS DO SCRAPING
@@ -44,7 +63,10 @@ CSV_FILENAME = "books.csv"
 # Tempo de espera entre cada requisicao (em segundos)
 # Coloquei 1 segundo pra nao sobrecarregar o servidor, mesmo sendo um site
 # de teste. E uma boa pratica em web scraping respeitar o servidor.
-DELAY_BETWEEN_REQUESTS = 1
+# Com varias conexoes em paralelo, vale por conexao: o limitador por host
+# libera no maximo MAX_CONCURRENT_REQUESTS requisicoes a cada DELAY segundos.
+# Num espelho local da pra zerar com SCRAPER_DELAY=0.
+DELAY_BETWEEN_REQUESTS = float(os.getenv("SCRAPER_DELAY", "1"))
 
 # Tempo maximo de espera por uma resposta do servidor
 # Se demorar mais que isso, a requisicao falha e tentamos de novo
@@ -54,6 +76,29 @@ REQUEST_TIMEOUT = 10
 # Coloquei 3 porque as vezes a rede pode oscilar
 MAX_RETRIES = 3
 
+# Espera base entre tentativas (dobra a cada nova tentativa: 0.5s, 1s, 2s...)
+RETRY_BACKOFF = 0.5
+
+# Quantas requisicoes podem estar em andamento ao mesmo tempo
+# (tamanho do pool de conexoes e de threads do fetcher)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("SCRAPER_CONCURRENCY", "8"))
+
+# Como o HTML das paginas de categoria e lido:
+# "fast" monta so os cards de livro e o paginador (SoupStrainer),
+# "full" monta a pagina inteira (o jeito antigo). O resultado e o mesmo.
+EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "fast")
+
+# Processos dedicados ao parse do HTML (parte que gasta CPU).
+# Com 0 o parse roda no mesmo processo do download.
+PARSER_WORKERS = int(os.getenv("SCRAPER_PARSER_WORKERS", "0"))
+
+# Quantas categorias sao processadas por lote. Ao fim de cada lote os
+# livros vao para o CSV parcial e o checkpoint e gravado, entao os livros
+# extraidos ficam em memoria so ate o fim do lote e um crash perde no maximo
+# um lote. (Os livros do crawl anterior e o store final continuam
+# proporcionais ao catalogo, mas em colunas compactas.)
+CATEGORY_BATCH_SIZE = int(os.getenv("SCRAPER_CATEGORY_BATCH", "10"))
+
 
 # =============================================================================
 # MAPEAMENTO DE RATINGS
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Estado persistido do crawl, para re-scraping incremental.
+
+Para cada URL de pagina de categoria guardamos:
+- etag / last_modified: para mandar requisicoes condicionais (304);
+- content_hash: sha256 do HTML, para pular o parse se nada mudou;
+- product_urls: os livros que estavam na pagina (na ordem);
+- next_urls / follow_next: as paginas que essa pagina mandou buscar em
+  seguida (e se elas devem seguir o link "next").
+
+Tambem guardamos o proximo id livre, para ids de livros removidos nao
+serem reaproveitados.
+
+Com isso uma pagina que nao mudou e montada a partir do CSV anterior,
+sem parse nenhum.
+
+Aqui tambem fica o checkpoint de um crawl em andamento (ScrapeCheckpoint),
+usado pelo --resume para continuar de onde uma execucao interrompida parou.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+# Versao do formato do arquivo; se mudar, o estado antigo e ignorado
+STATE_VERSION = 1
+
+# Versao do formato do checkpoint
+CHECKPOINT_VERSION = 1
+
+
+def content_hash(html: str) -> str:
+    """Hash do conteudo da pagina."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    """Estado das paginas visitadas em um crawl."""
+
+    def __init__(self, pages: Optional[Dict[str, dict]] = None, next_id: int = 1):
+        self.pages: Dict[str, dict] = pages or {}
+        self.next_id = next_id
+
+    @classmethod
+    def load(cls, path: str) -> "CrawlState":
+        """Le o estado do disco. Arquivo ausente ou invalido = estado vazio."""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"AVISO: estado do crawl ignorado ({e})")
+            return cls()
+        if data.get("version") != STATE_VERSION:
+            return cls()
+        return cls(data.get("pages", {}), data.get("next_id", 1))
+
+    def save(self, path: str) -> None:
+        """Grava o estado de forma atomica (arquivo temporario + rename)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": STATE_VERSION, "next_id": self.next_id, "pages": self.pages}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.pages.get(url)
+
+    def record(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        page_hash: str,
+        product_urls: List[str],
+        next_urls: List[str],
+        follow_next: bool,
+    ) -> None:
+        self.pages[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": page_hash,
+            "product_urls": product_urls,
+            "next_urls": next_urls,
+            "follow_next": follow_next,
+        }
+
+
+class ScrapeCheckpoint:
+    """
+    Progresso de um crawl em andamento.
+
+    O scraper grava os livros em um CSV parcial a cada lote de categorias
+    concluido e, logo depois, este checkpoint com:
+    - base_url e a lista de categorias do crawl (se mudarem, nao da pra retomar);
+    - completed: quantas categorias (na ordem) ja estao no CSV parcial;
+    - csv_bytes: tamanho do CSV parcial nesse ponto (o que passar disso e
+      de um lote que nao terminou e e descartado ao retomar);
+    - next_id e pages: o proximo id livre e o estado das paginas ja concluidas.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        categories: List[List[str]],
+        completed: int = 0,
+        csv_bytes: int = 0,
+        next_id: int = 1,
+        pages: Optional[Dict[str, dict]] = None,
+    ):
+        self.base_url = base_url
+        self.categories = [list(category) for category in categories]
+        self.completed = completed
+        self.csv_bytes = csv_bytes
+        self.next_id = next_id
+        self.pages: Dict[str, dict] = pages or {}
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ScrapeCheckpoint"]:
+        """Le o checkpoint do disco. Retorna None se nao existir ou for invalido."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"AVISO: checkpoint ignorado ({e})")
+            return None
+        if data.get("version") != CHECKPOINT_VERSION:
+            return None
+        return cls(
+            data["base_url"],
+            data["categories"],
+            data["completed"],
+            data["csv_bytes"],
+            data["next_id"],
+            data.get("pages", {}),
+        )
+
+    def save(self, path: str) -> None:
+        """Grava o checkpoint de forma atomica (arquivo temporario + rename)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": CHECKPOINT_VERSION,
+                    "base_url": self.base_url,
+                    "categories": self.categories,
+                    "completed": self.completed,
+                    "csv_bytes": self.csv_bytes,
+                    "next_id": self.next_id,
+                    "pages": self.pages,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, path)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Camada de download do scraper.
+
+Antes cada pagina era baixada com um requests.get solto (uma conexao TLS
+nova por pagina) e tudo em sequencia. Aqui centralizamos:
+
+- uma Session com pool de conexoes reaproveitadas (keep-alive);
+- um pool de threads para baixar varias paginas ao mesmo tempo;
+- um limitador de taxa por host, baseado nas constantes do config.py;
+- timeout e novas tentativas com backoff exponencial;
+- requisicoes condicionais (If-None-Match / If-Modified-Since).
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.config import (
+    DELAY_BETWEEN_REQUESTS,
+    HEADERS,
+    MAX_CONCURRENT_REQUESTS,
+    MAX_RETRIES,
+    REQUEST_TIMEOUT,
+    RETRY_BACKOFF,
+)
+
+# Status HTTP que valem nova tentativa (erros temporarios do servidor)
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+# Resultado de um download. Em respostas 304 (nao modificado) o text e None.
+FetchResult = namedtuple("FetchResult", ["url", "status", "text", "etag", "last_modified"])
+
+
+class RateLimiter:
+    """
+    Limitador de taxa por host (token bucket).
+
+    Cada host tem um "balde" com `capacidade` fichas, que se recarrega em
+    `intervalo` segundos. Com capacidade = MAX_CONCURRENT_REQUESTS e
+    intervalo = DELAY_BETWEEN_REQUESTS, cada conexao do pool respeita o
+    delay configurado, mas as conexoes trabalham em paralelo.
+    """
+
+    def __init__(self, capacidade: int, intervalo: float):
+        self.capacidade = max(1, capacidade)
+        self.taxa = self.capacidade / intervalo if intervalo > 0 else None
+        self._lock = threading.Lock()
+        self._baldes: Dict[str, tuple] = {}
+
+    def aguardar(self, host: str) -> None:
+        """Bloqueia ate haver uma ficha disponivel para o host."""
+        if self.taxa is None:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                fichas, ultimo = self._baldes.get(host, (self.capacidade, agora))
+                fichas = min(self.capacidade, fichas + (agora - ultimo) * self.taxa)
+                if fichas >= 1:
+                    self._baldes[host] = (fichas - 1, agora)
+                    return
+                self._baldes[host] = (fichas, agora)
+                espera = (1 - fichas) / self.taxa
+            time.sleep(espera)
+
+
+class Fetcher:
+    """
+    Baixa paginas HTML com conexoes reaproveitadas, em paralelo e com limite de taxa.
+
+    Uso:
+        with Fetcher() as fetcher:
+            html = fetcher.get(url)
+            for url, html in fetcher.get_many(urls): ...
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_CONCURRENT_REQUESTS,
+        delay: float = DELAY_BETWEEN_REQUESTS,
+        timeout: float = REQUEST_TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = RETRY_BACKOFF,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(max_workers, delay)
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetcher")
+
+    def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[FetchResult]:
+        """
+        Baixa uma pagina e retorna um FetchResult (ou None se falhar em todas as tentativas).
+
+        Se etag/last_modified forem passados, a requisicao e condicional e o
+        servidor pode responder 304 sem corpo.
+        Erros de rede, timeouts e status 429/5xx sao tentados de novo com
+        backoff exponencial; outros erros HTTP (ex: 404) falham na hora.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        host = urlsplit(url).netloc
+        for tentativa in range(self.max_retries + 1):
+            self.rate_limiter.aguardar(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code in STATUS_RETENTAVEIS and tentativa < self.max_retries:
+                    raise requests.HTTPError(f"{response.status_code} temporario", response=response)
+                response.raise_for_status()
+                response.encoding = "utf-8"
+                text = None if response.status_code == 304 else response.text
+                return FetchResult(
+                    url,
+                    response.status_code,
+                    text,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+            except requests.RequestException as e:
+                temporario = not isinstance(e, requests.HTTPError) or e.response.status_code in STATUS_RETENTAVEIS
+                if not temporario or tentativa == self.max_retries:
+                    print(f"Erro ao acessar {url}: {e}")
+                    return None
+                time.sleep(self.backoff * (2 ** tentativa))
+        return None
+
+    def get(self, url: str) -> Optional[str]:
+        """Baixa uma pagina e retorna so o HTML (ou None se falhar)."""
+        result = self.fetch(url)
+        return result.text if result else None
+
+    def fetch_many(self, pedidos: Iterable[tuple]) -> Iterator:
+        """
+        Versao em paralelo do fetch.
+
+        Recebe tuplas (url, etag, last_modified) e gera os FetchResult
+        (ou None) na mesma ordem dos pedidos.
+        """
+        return self._executor.map(lambda pedido: self.fetch(*pedido), list(pedidos))
+
+    def get_many(self, urls: Iterable[str]) -> Iterator:
+        """
+        Baixa varias paginas em paralelo.
+
+        Gera pares (url, html) na mesma ordem das urls recebidas.
+        """
+        urls = list(urls)
+        return zip(urls, self._executor.map(self.get, urls))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,24 +1,174 @@
 # -*- coding: utf-8 -*-
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import Future, ProcessPoolExecutor
+import hashlib
+import multiprocessing
+import numpy as np
 import pandas as pd
-import time
 import re
 import os
-from scripts.config import BASE_URL, DATA_DIR, CSV_FILENAME, RATING_MAP, HEADERS
+import argparse
+from scripts.config import (
+    BASE_URL, DATA_DIR, CSV_FILENAME, STORE_DIRNAME, CRAWL_STATE_FILENAME, CHECKPOINT_FILENAME, RATING_MAP,
+    EXTRACTION_MODE, PARSER_WORKERS, CATEGORY_BATCH_SIZE,
+)
+from scripts.crawl_state import CrawlState, ScrapeCheckpoint, content_hash
+from scripts.fetcher import Fetcher
+from api.store import BookStore
 
-def get_soup(url):
+CSV_COLUMNS = ['id', 'title', 'price', 'rating', 'availability', 'category', 'image_url', 'product_url']
+
+# Parse rápido: só os cards de livro (article.product_pod) e o paginador (ul.pager).
+# O resto da página (menu, sidebar com 50 categorias, rodapé) nem vira árvore.
+PRODUCT_STRAINER = SoupStrainer(["article", "ul"], class_=["product_pod", "pager"])
+
+def parse_soup(html, only_products=False):
+    """
+    Monta o objeto BeautifulSoup a partir do HTML da página.
+    Com only_products=True monta só os cards de livro e o paginador.
+    """
+    if only_products:
+        return BeautifulSoup(html, 'lxml', parse_only=PRODUCT_STRAINER)
+    return BeautifulSoup(html, 'lxml')
+
+def get_soup(url, fetcher):
+    """
+    Faz a requisição HTTP (pool de conexões, timeout e retries do Fetcher)
+    e retorna o objeto BeautifulSoup, ou None se a página não pôde ser baixada.
+    """
+    html = fetcher.get(url)
+    if html is None:
+        return None
+    return parse_soup(html)
+
+def get_next_page_urls(soup, page_url):
+    """
+    Descobre as URLs das páginas 2..N de uma categoria a partir da página 1.
+
+    O paginador do site mostra "Page 1 of N", então dá pra montar todas as
+    URLs de uma vez e baixar em paralelo. Retorna None se a página tem link
+    "next" mas não informa o total (aí seguimos os links um a um).
+    """
+    if not soup.find('li', class_='next'):
+        return []
+    current = soup.find('li', class_='current')
+    match = re.search(r'Page\s+\d+\s+of\s+(\d+)', current.text) if current else None
+    if not match:
+        return None
+    parent = page_url.rsplit('/', 1)[0]
+    return [f"{parent}/page-{page}.html" for page in range(2, int(match.group(1)) + 1)]
+
+def get_next_link_url(soup, page_url):
+    """
+    URL do link "next" da página, em lista (vazia se for a última página).
+    Usado quando o paginador não informa o total de páginas.
+    """
+    next_li = soup.find('li', class_='next')
+    if not next_li:
+        return []
+    return [page_url.rsplit('/', 1)[0] + "/" + next_li.find('a')['href']]
+
+def parse_category_page(html, page_url, category_name, first_page, follow_next, mode=EXTRACTION_MODE):
+    """
+    Extrai os livros de uma página de categoria e descobre as próximas páginas.
+
+    Retorna (livros, next_urls, follow_next_children):
+    - na página 1, se o paginador diz "Page 1 of N", next_urls traz as
+      páginas 2..N de uma vez (baixadas em paralelo);
+    - senão, seguimos o link "next" página a página (follow_next).
+
+    mode="fast" faz o parse só dos cards e do paginador (SoupStrainer);
+    mode="full" monta a árvore da página inteira. O resultado é o mesmo.
+    Roda também dentro do pool de processos, então só recebe e devolve
+    dados simples (picklable).
+    """
+    soup = parse_soup(html, only_products=(mode == "fast"))
+    books = []
+    for article in soup.find_all('article', class_='product_pod'):
+        book_data = extract_book_data(article, category_name)
+        if book_data:
+            books.append(book_data)
+
+    if first_page:
+        next_urls = get_next_page_urls(soup, page_url)
+        if next_urls is not None:
+            return books, next_urls, False
+        return books, get_next_link_url(soup, page_url), True
+    if follow_next:
+        return books, get_next_link_url(soup, page_url), True
+    return books, [], False
+
+def url_hash(url):
+    """Hash de 64 bits da product_url (chave da busca nos livros anteriores)."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+class PreviousBooks:
+    """
+    Livros do crawl anterior, consultados por product_url.
+
+    Fica tudo em colunas: os livros no BookStore e a busca em um array
+    ordenado de hashes das URLs (16 bytes por livro), em vez de um
+    dicionário por livro durante o crawl inteiro.
+    URL repetida no CSV: vale a última linha.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        hashes = np.fromiter((url_hash(url) for url in store.product_urls.tolist()), dtype=np.uint64, count=len(store))
+        self._rows = np.argsort(hashes, kind="stable")
+        self._hashes = hashes[self._rows]
+
+    def _row(self, url):
+        """Linha do livro com essa URL, ou None."""
+        key = np.uint64(url_hash(url))
+        start = int(np.searchsorted(self._hashes, key, side="left"))
+        end = int(np.searchsorted(self._hashes, key, side="right"))
+        for position in range(end - 1, start - 1, -1):
+            row = int(self._rows[position])
+            if self.store.product_urls[row] == url:
+                return row
+        return None
+
+    def __len__(self):
+        return len(self.store)
+
+    def __contains__(self, url):
+        return self._row(url) is not None
+
+    def get_id(self, url):
+        """Id do livro no crawl anterior, ou None se a URL é nova."""
+        row = self._row(url)
+        return None if row is None else int(self.store.ids[row])
+
+    def book(self, url, category):
+        """Livro do crawl anterior (formato do CSV) na categoria atual."""
+        return dict(self.store.livro(self._row(url)), category=category)
+
+    def max_id(self):
+        return int(self.store.ids.max()) if len(self.store) else 0
+
+def load_previous_books(csv_path):
     """
-    Faz a requisição HTTP e retorna o objeto BeautifulSoup.
+    Livros do crawl anterior (se existir o CSV) como PreviousBooks.
+
+    Vem do store binário quando ele está em dia com o CSV (mapeado em
+    memória, nada é copiado); senão o CSV é lido em blocos.
     """
+    if not os.path.exists(csv_path):
+        return PreviousBooks(BookStore.vazio())
+    store_dir = os.path.join(os.path.dirname(csv_path), STORE_DIRNAME)
     try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
-        return BeautifulSoup(response.text, 'lxml')
+        if os.path.getmtime(BookStore.versao_atual(store_dir)) >= os.path.getmtime(csv_path):
+            return PreviousBooks(BookStore.load(store_dir))
+    except FileNotFoundError:
+        pass
     except Exception as e:
-        print(f"Erro ao acessar {url}: {e}")
-        return None
+        print(f"AVISO: store binario anterior ignorado ({e})")
+    try:
+        return PreviousBooks(BookStore.from_csv(csv_path))
+    except Exception as e:
+        print(f"AVISO: CSV anterior ignorado ({e})")
+        return PreviousBooks(BookStore.vazio())
 
 def extract_book_data(article, category_name):
     """
@@ -69,65 +219,246 @@ def extract_book_data(article, category_name):
         print(f"Erro ao extrair livro: {e}")
         return None
 
-def run_scraper():
+def create_parser_pool(workers=PARSER_WORKERS):
+    """
+    Pool de processos para o parse (CPU), alimentado pelo download (rede).
+    Com workers=0 o parse roda no próprio processo.
+    Usa "spawn" porque o scraper também roda dentro da API, que tem threads.
+    """
+    if workers <= 0:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def submit_parse(pool, *args):
+    """Envia o parse de uma página para o pool (ou executa na hora, sem pool)."""
+    if pool is not None:
+        return pool.submit(parse_category_page, *args)
+    future = Future()
+    future.set_result(parse_category_page(*args))
+    return future
+
+def assign_ids(pages, previous_books, next_id, used_ids):
+    """
+    Monta as linhas do CSV (na ordem página -> livro) com ids estáveis por product_url.
+    Livros novos (ou com id repetido) recebem next_id em diante.
+    Retorna (linhas, próximo id livre).
+    """
+    rows = []
+    for page_books in pages:
+        for book in page_books:
+            book_id = previous_books.get_id(book['product_url'])
+            if book_id is None or int(book_id) in used_ids:
+                book_id = next_id
+                next_id += 1
+            used_ids.add(int(book_id))
+            rows.append(dict(book, id=int(book_id)))
+    return rows, next_id
+
+def append_rows(partial_path, rows):
+    """Acrescenta as linhas ao CSV parcial (o cabeçalho vai só na criação)."""
+    write_header = not os.path.exists(partial_path)
+    if rows or write_header:
+        pd.DataFrame(rows, columns=CSV_COLUMNS).to_csv(partial_path, mode='a', header=write_header, index=False)
+
+def run_scraper(on_progress=None, incremental=True, resume=False):
     """
     Função principal que executa todo o processo de scraping.
     Navega por categorias e paginação.
+
+    Os downloads passam pelo Fetcher (scripts/fetcher.py): conexões
+    reaproveitadas, várias páginas em paralelo e limite de taxa por host.
+
+    Re-scraping incremental: o estado do crawl anterior (crawl_state.json)
+    guarda ETag/Last-Modified e o hash de cada página. As páginas são
+    pedidas com requisições condicionais; se voltarem 304 ou com o mesmo
+    hash, os livros delas vêm do CSV anterior, sem parse. Os ids são
+    mantidos por product_url entre execuções e livros novos recebem ids
+    novos. Com incremental=False tudo é baixado e processado de novo
+    (mas os ids continuam estáveis).
+
+    As categorias são processadas em lotes (CATEGORY_BATCH_SIZE). Ao fim de
+    cada lote os livros vão para books.csv.partial e um checkpoint é gravado;
+    com resume=True o crawl continua do último lote gravado. O books.csv só
+    é substituído no final, com um rename atômico. Em seguida é gravado o
+    store binário colunar (data/books_store), que é o que a API carrega.
+
+    on_progress: callback opcional chamado com os contadores do crawl
+    (categories_total, categories_done, pages_fetched, pages_unchanged, books_parsed).
+    Retorna a quantidade de livros salvos no CSV.
+
+    O parse usa EXTRACTION_MODE e, com PARSER_WORKERS > 0, roda em um
+    pool de processos enquanto as próximas páginas da onda são baixadas.
     """
     print("Iniciando Scraping...")
+
+    def reportar(**contadores):
+        if on_progress:
+            on_progress(**contadores)
     
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
-        
-    books = []
-    id_counter = 1
-    
-    # 1. Obter Categorias da Página Inicial
-    soup = get_soup(BASE_URL + "/index.html")
-    if not soup: return
     
-    side_cats = soup.select('.side_categories ul li ul li a')
-    categories = []
-    for cat in side_cats:
-        cat_name = cat.text.strip()
-        cat_url = BASE_URL + "/" + cat['href']
-        categories.append((cat_name, cat_url))
-        
-    print(f"Encontradas {len(categories)} categorias.")
+    csv_path = os.path.join(DATA_DIR, CSV_FILENAME)
+    partial_path = csv_path + ".partial"
+    state_path = os.path.join(DATA_DIR, CRAWL_STATE_FILENAME)
+    checkpoint_path = os.path.join(DATA_DIR, CHECKPOINT_FILENAME)
+    previous_books = load_previous_books(csv_path)
+    previous_state = CrawlState.load(state_path)
+    new_state = CrawlState()
     
-    for cat_name, cat_url in categories:
-        current_url = cat_url
+    parser_pool = create_parser_pool()
+    # O pool roda processos filhos: encerra mesmo se o crawl falhar no meio
+    # (dentro da API, um job com erro deixaria os workers vivos no servidor)
+    try:
+        with Fetcher() as fetcher:
+            # 1. Obter Categorias da Página Inicial
+            soup = get_soup(BASE_URL + "/index.html", fetcher)
+            if not soup:
+                raise RuntimeError(f"Nao foi possivel acessar {BASE_URL}/index.html")
         
-        while True:
-            cat_soup = get_soup(current_url)
-            if not cat_soup: break
-            
-            articles = cat_soup.find_all('article', class_='product_pod')
-            for article in articles:
-                book_data = extract_book_data(article, cat_name)
-                if book_data:
-                    book_data['id'] = id_counter
-                    books.append(book_data)
-                    id_counter += 1
+            side_cats = soup.select('.side_categories ul li ul li a')
+            categories = []
+            for cat in side_cats:
+                cat_name = cat.text.strip()
+                cat_url = BASE_URL + "/" + cat['href']
+                categories.append((cat_name, cat_url))
             
-            # Paginação (Próxima Página)
-            next_li = cat_soup.find('li', class_='next')
-            if next_li:
-                next_url = next_li.find('a')['href']
-                parent = current_url.rsplit('/', 1)[0]
-                current_url = parent + "/" + next_url
+            print(f"Encontradas {len(categories)} categorias.")
+        
+            # Retomada: só vale se o checkpoint é do mesmo site e da mesma lista de categorias
+            checkpoint = ScrapeCheckpoint.load(checkpoint_path) if resume else None
+            if checkpoint and (
+                checkpoint.base_url != BASE_URL
+                or checkpoint.categories != [list(category) for category in categories]
+                or not os.path.exists(partial_path)
+                or os.path.getsize(partial_path) < checkpoint.csv_bytes
+            ):
+                print("AVISO: checkpoint nao corresponde a este crawl, comecando do zero.")
+                checkpoint = None
+            if resume and checkpoint is None:
+                print("Nenhum checkpoint valido, comecando do zero.")
+        
+            used_ids = set()
+            if checkpoint:
+                # Descarta o que foi escrito depois do último checkpoint (lote incompleto)
+                with open(partial_path, 'r+b') as f:
+                    f.truncate(checkpoint.csv_bytes)
+                used_ids = set(pd.read_csv(partial_path, usecols=['id'])['id'].astype(int))
+                new_state.pages.update(checkpoint.pages)
+                next_id = checkpoint.next_id
+                print(f"Retomando: {checkpoint.completed} de {len(categories)} categorias ja gravadas.")
             else:
-                break
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                checkpoint = ScrapeCheckpoint(BASE_URL, categories)
+                next_id = max(previous_books.max_id(), previous_state.next_id - 1, 0) + 1
+        
+            pages_fetched = 0
+            pages_unchanged = 0
+            books_parsed = 0
+            reportar(categories_total=len(categories), categories_done=checkpoint.completed, pages_fetched=0, pages_unchanged=0, books_parsed=0)
+        
+            for batch_start in range(checkpoint.completed, len(categories), max(1, CATEGORY_BATCH_SIZE)):
+                batch = range(batch_start, min(batch_start + max(1, CATEGORY_BATCH_SIZE), len(categories)))
+                batch_state = CrawlState()
+            
+                # 2. Páginas em "ondas": primeiro a página 1 de todas as categorias
+                # do lote, depois as páginas que elas apontaram, e assim por diante.
+                # Cada onda é baixada em paralelo.
+                category_pages = {index: [] for index in batch}
+                pending = [(index, categories[index][1], True, False) for index in batch]
+                while pending:
+                    requests_wave = []
+                    for _, page_url, _, _ in pending:
+                        page_state = previous_state.get(page_url) if incremental else None
+                        # So da pra reaproveitar a pagina se todos os livros dela estao no CSV anterior
+                        if page_state and not all(url in previous_books for url in page_state["product_urls"]):
+                            page_state = None
+                        requests_wave.append((page_url, page_state))
+                
+                    results = fetcher.fetch_many(
+                        (page_url, page_state and page_state["etag"], page_state and page_state["last_modified"])
+                        for page_url, page_state in requests_wave
+                    )
+                
+                    # Conforme as páginas chegam, as que mudaram vão para o parse
+                    fetched = []
+                    for (index, page_url, first_page, follow_next), (_, page_state), result in zip(pending, requests_wave, results):
+                        if result is None:
+                            continue
+                        pages_fetched += 1
+                        cat_name = categories[index][0]
+                    
+                        page_hash = page_state["content_hash"] if result.status == 304 else content_hash(result.text)
+                        if page_state and page_hash == page_state["content_hash"]:
+                            # Página não mudou: livros do CSV anterior, sem parse
+                            pages_unchanged += 1
+                            books = [previous_books.book(url, cat_name) for url in page_state["product_urls"]]
+                            parsed = Future()
+                            parsed.set_result((books, page_state["next_urls"], page_state["follow_next"]))
+                            reused = True
+                        else:
+                            parsed = submit_parse(parser_pool, result.text, page_url, cat_name, first_page, follow_next)
+                            reused = False
+                        fetched.append((index, page_url, page_state, result, page_hash, parsed, reused))
+                        reportar(pages_fetched=pages_fetched, pages_unchanged=pages_unchanged)
                 
-    # Salvar em CSV
-    df = pd.DataFrame(books)
-    cols = ['id', 'title', 'price', 'rating', 'availability', 'category', 'image_url', 'product_url']
-    if not df.empty:
-        df = df[cols]
+                    next_pending = []
+                    for index, page_url, page_state, result, page_hash, parsed, reused in fetched:
+                        books, next_urls, follow_children = parsed.result()
+                        if not reused:
+                            books_parsed += len(books)
+                    
+                        batch_state.record(
+                            page_url,
+                            etag=result.etag or (page_state and page_state["etag"]),
+                            last_modified=result.last_modified or (page_state and page_state["last_modified"]),
+                            page_hash=page_hash,
+                            product_urls=[book["product_url"] for book in books],
+                            next_urls=next_urls,
+                            follow_next=follow_children,
+                        )
+                        category_pages[index].append(books)
+                        next_pending.extend((index, url, False, follow_children) for url in next_urls)
+                        reportar(books_parsed=books_parsed)
+                
+                    pending = next_pending
+                    categories_left = {index for index, _, _, _ in pending}
+                    reportar(categories_done=batch.start + len(batch) - len(categories_left))
+            
+                # 3. Lote concluído: livros no CSV parcial (ordem categoria -> página,
+                # ids estáveis por product_url) e depois o checkpoint
+                rows = []
+                for index in batch:
+                    category_rows, next_id = assign_ids(category_pages[index], previous_books, next_id, used_ids)
+                    rows.extend(category_rows)
+                append_rows(partial_path, rows)
+            
+                new_state.pages.update(batch_state.pages)
+                checkpoint.completed = batch.stop
+                checkpoint.csv_bytes = os.path.getsize(partial_path)
+                checkpoint.next_id = next_id
+                checkpoint.pages.update(batch_state.pages)
+                checkpoint.save(checkpoint_path)
+    finally:
+        if parser_pool is not None:
+            parser_pool.shutdown(cancel_futures=True)
     
-    csv_path = os.path.join(DATA_DIR, CSV_FILENAME)
-    df.to_csv(csv_path, index=False)
-    print(f"SCRAPING FINALIZADO - Total {len(df)} livros salvos em {csv_path}")
+    # 4. Publica o CSV completo de uma vez (rename atômico) e o estado do crawl
+    append_rows(partial_path, [])
+    new_state.next_id = next_id
+    total = len(used_ids)
+    os.replace(partial_path, csv_path)
+    new_state.save(state_path)
+    BookStore.from_csv(csv_path).save(os.path.join(DATA_DIR, STORE_DIRNAME))
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"SCRAPING FINALIZADO - Total {total} livros salvos em {csv_path} ({pages_unchanged} de {pages_fetched} paginas sem mudanca)")
+    return total
 
 if __name__ == "__main__":
-    run_scraper()
+    parser = argparse.ArgumentParser(description="Scraper do Books to Scrape")
+    parser.add_argument("--full", action="store_true", help="ignora o estado do crawl anterior e processa todas as paginas")
+    parser.add_argument("--resume", action="store_true", help="continua um crawl interrompido a partir do ultimo checkpoint")
+    args = parser.parse_args()
+    run_scraper(incremental=not args.full, resume=args.resume)
@@ -34,17 +34,18 @@ def run_tests():
     failed = False
     
     try:
-        # Wait for server to start
+        # Wait for server to start (readiness: dados e indices carregados)
         max_retries = 15
         server_up = False
         for i in range(max_retries):
             try:
-                requests.get(f"{API_URL}/api/v1/health")
-                server_up = True
-                break
+                if requests.get(f"{API_URL}/api/v1/health/ready").status_code == 200:
+                    server_up = True
+                    break
             except requests.ConnectionError:
-                time.sleep(1)
-                log(f"[WAIT] Aguardando servidor... ({i+1}/{max_retries})")
+                pass
+            time.sleep(1)
+            log(f"[WAIT] Aguardando servidor... ({i+1}/{max_retries})")
         
         if not server_up:
             log("[ERROR] Servidor nao iniciou a tempo.")
@@ -56,6 +57,8 @@ def run_tests():
         log("\n--- [1] Testando Endpoints Públicos ---")
         public_tests = [
             {"url": "/api/v1/health", "expected": 200},
+            {"url": "/api/v1/health/live", "expected": 200},
+            {"url": "/api/v1/health/ready", "expected": 200},
             {"url": "/api/v1/books?limit=1", "expected": 200},
             {"url": "/api/v1/stats/overview", "expected": 200},
             {"url": "/api/v1/books/top-rated?limit=3", "expected": 200},
@@ -97,8 +100,17 @@ def run_tests():
             # 3.1 Trigger Scraping
             log("Disparando Scraping (Protegido)...")
             res = requests.post(f"{API_URL}/api/v1/scraping/trigger", headers=headers)
-            if res.status_code == 200:
-                log("[OK] Scraping disparado com sucesso.")
+            if res.status_code == 202:
+                job_id = res.json().get("job_id")
+                log(f"[OK] Scraping enfileirado com sucesso (job {job_id}).")
+                
+                # O scraping roda em segundo plano; so conferimos se o job e consultavel
+                res = requests.get(f"{API_URL}/api/v1/scraping/jobs/{job_id}", headers=headers)
+                if res.status_code == 200:
+                    log(f"[OK] Status do job: {res.json().get('status')}")
+                else:
+                    log(f"[FAIL] Falha ao consultar job: {res.status_code}")
+                    failed = True
             else:
                 log(f"[FAIL] Falha no scraping trigger: {res.status_code} - {res.text}")
                 failed = True
@@ -125,7 +137,7 @@ def run_tests():
             failed = True
             
         # 4.2 Predictions
-        log("Testando Predição (Mock)...")
+        log("Testando Predição...")
         pred_payload = {"price": 60.0, "rating": 5}
         res = requests.post(f"{API_URL}/api/v1/ml/predictions", json=pred_payload)
         if res.status_code == 200:
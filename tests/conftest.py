@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Fixtures compartilhadas dos testes da API."""
+
+import os
+import sys
+
+import pytest
+
+# Os testes importam api e scripts a partir da raiz do repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.store import BookStore  # noqa: E402
+
+
+def criar_store(livros):
+    """BookStore a partir de uma lista de (id, title, price, rating, availability, category)."""
+    colunas = {"id": [], "title": [], "price": [], "rating": [], "availability": [], "category": [], "image_url": [], "product_url": []}
+    for id_livro, titulo, preco, rating, disponivel, categoria in livros:
+        colunas["id"].append(id_livro)
+        colunas["title"].append(titulo)
+        colunas["price"].append(preco)
+        colunas["rating"].append(rating)
+        colunas["availability"].append(disponivel)
+        colunas["category"].append(categoria)
+        colunas["image_url"].append(f"https://example.com/{id_livro}.jpg")
+        colunas["product_url"].append(f"https://example.com/livro_{id_livro}/index.html")
+    return BookStore.from_columns(colunas)
+
+
+@pytest.fixture
+def livros():
+    """Catalogo pequeno com empates de preco e de rating."""
+    categorias = ["Travel", "Poetry", "Fiction"]
+    return [
+        (id_livro, f"Livro {id_livro:03d}", float(10 + id_livro % 7), 1 + id_livro % 5, id_livro % 4, categorias[id_livro % 3])
+        for id_livro in range(1, 61)
+    ]
+
+
+@pytest.fixture
+def client(livros, monkeypatch):
+    """TestClient sem o startup (nao le data/), com o catalogo de teste publicado."""
+    from fastapi.testclient import TestClient
+
+    from api import dataset
+    from api.main import app
+
+    monkeypatch.setenv("API_SHARED_INDEXES", "0")
+    anterior = dataset.obter_snapshot()
+    dataset.publicar_store(criar_store(livros))
+    yield TestClient(app)
+    monkeypatch.setattr(dataset, "_snapshot_atual", anterior)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Cache dos tokens JWT verificados."""
+
+import time
+
+import pytest
+
+from api import auth
+from api.auth import TokenCache
+
+
+class Relogio:
+    def __init__(self, agora):
+        self.agora = agora
+
+    def __call__(self):
+        return self.agora
+
+
+class Decodificador:
+    """Faz o papel do jwt.decode: conta as chamadas e recusa tokens "ruim"."""
+
+    def __init__(self, exp):
+        self.exp = exp
+        self.chamadas = 0
+
+    def __call__(self, token):
+        self.chamadas += 1
+        if token.startswith("ruim"):
+            raise ValueError("token invalido")
+        return {"sub": token, "exp": self.exp}
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio(1_000.0)
+    monkeypatch.setattr(auth.time, "time", relogio)
+    return relogio
+
+
+def test_hit_ate_o_exp(relogio):
+    cache, decodificar = TokenCache(max_entries=8), Decodificador(exp=1_010)
+    assert cache.verificar("a", "segredo", decodificar) == {"sub": "a", "exp": 1_010}
+    relogio.agora = 1_009.9
+    assert cache.verificar("a", "segredo", decodificar)["sub"] == "a"
+    assert decodificar.chamadas == 1
+
+    # exp <= agora: expirado (mesmo criterio do PyJWT), volta para o decode
+    relogio.agora = 1_010
+    cache.verificar("a", "segredo", decodificar)
+    assert decodificar.chamadas == 2
+    metricas = cache.metricas()
+    assert (metricas["hits"], metricas["misses"], metricas["expired"]) == (1, 2, 1)
+
+
+def test_payload_devolvido_e_uma_copia(relogio):
+    cache = TokenCache(max_entries=8)
+    cache.verificar("a", "segredo", Decodificador(exp=2_000))["sub"] = "alterado"
+    assert cache.verificar("a", "segredo", Decodificador(exp=2_000))["sub"] == "a"
+
+
+def test_token_invalido_nao_entra(relogio):
+    cache, decodificar = TokenCache(max_entries=8), Decodificador(exp=2_000)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.verificar("ruim", "segredo", decodificar)
+    assert decodificar.chamadas == 2
+    assert cache.metricas()["entries"] == 0
+
+
+def test_trocar_o_segredo_invalida(relogio):
+    cache, decodificar = TokenCache(max_entries=8), Decodificador(exp=2_000)
+    cache.verificar("a", "segredo", decodificar)
+    cache.verificar("a", "outro", decodificar)
+    cache.verificar("a", "segredo", decodificar)
+    assert decodificar.chamadas == 3
+
+
+def test_lru_limitado(relogio):
+    cache, decodificar = TokenCache(max_entries=2), Decodificador(exp=2_000)
+    for token in ("a", "b", "a", "c"):
+        cache.verificar(token, "segredo", decodificar)
+    assert cache.metricas()["evicted"] == 1
+    chamadas = decodificar.chamadas
+    cache.verificar("a", "segredo", decodificar)  # recente: continua no cache
+    assert decodificar.chamadas == chamadas
+    cache.verificar("b", "segredo", decodificar)  # menos recente: saiu
+    assert decodificar.chamadas == chamadas + 1
+
+
+def test_tamanho_zero_desliga(relogio):
+    cache, decodificar = TokenCache(max_entries=0), Decodificador(exp=2_000)
+    cache.verificar("a", "segredo", decodificar)
+    cache.verificar("a", "segredo", decodificar)
+    assert decodificar.chamadas == 2
+
+
+def test_rota_protegida_recusa_token_expirado_que_estava_no_cache(client):
+    import jwt
+
+    from api.main import ALGORITHM, SECRET_KEY, TOKEN_CACHE
+
+    TOKEN_CACHE.invalidar()
+    token = jwt.encode({"sub": "admin", "exp": int(time.time()) + 2}, SECRET_KEY, algorithm=ALGORITHM)
+    cabecalhos = {"Authorization": f"Bearer {token}"}
+    # 404: passou da autenticacao (o job nao existe)
+    assert client.get("/api/v1/scraping/jobs/inexistente", headers=cabecalhos).status_code == 404
+    assert client.get("/api/v1/scraping/jobs/inexistente", headers=cabecalhos).status_code == 404
+
+    time.sleep(max(0.0, jwt.decode(token, options={"verify_signature": False})["exp"] - time.time()) + 0.05)
+    resposta = client.get("/api/v1/scraping/jobs/inexistente", headers=cabecalhos)
+    assert resposta.status_code == 401
+    assert resposta.json()["detail"] == "Token expirado"
+
+    assert client.get("/api/v1/scraping/jobs/inexistente", headers={"Authorization": "Bearer x.y.z"}).status_code == 401
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""MicroBatcher das predicoes individuais."""
+
+import asyncio
+import time
+
+import pytest
+
+from api.batching import MicroBatcher
+
+
+def test_agrupa_chamadas_concorrentes():
+    lotes = []
+
+    def processar(itens):
+        lotes.append(list(itens))
+        return [item * 2 for item in itens]
+
+    async def cenario():
+        batcher = MicroBatcher(processar, max_batch_size=4, max_wait_ms=5)
+        resultados = await asyncio.gather(*(batcher.submeter(item) for item in range(10)))
+        return batcher, resultados
+
+    batcher, resultados = asyncio.run(cenario())
+    assert resultados == [item * 2 for item in range(10)]
+    assert [len(lote) for lote in lotes] == [4, 4, 2]
+    assert batcher.metricas()["batch_size_histogram"] == {"2-3": 1, "4-7": 2}
+
+
+def test_excecao_vai_para_todos_do_lote():
+    def processar(itens):
+        raise ValueError("sem modelo")
+
+    async def cenario():
+        batcher = MicroBatcher(processar, max_batch_size=8, max_wait_ms=1)
+        return await asyncio.gather(*(batcher.submeter(item) for item in range(3)), return_exceptions=True)
+
+    assert all(isinstance(resultado, ValueError) for resultado in asyncio.run(cenario()))
+
+
+def test_processamento_lento_nao_trava_o_event_loop():
+    # Ex: o treino do modelo na primeira predicao
+    def processar(itens):
+        time.sleep(0.3)
+        return itens
+
+    async def cenario():
+        batcher = MicroBatcher(processar, max_batch_size=1, max_wait_ms=0)
+        tarefa = asyncio.create_task(batcher.submeter(1))
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.01)
+        atraso = time.perf_counter() - inicio
+        assert await tarefa == 1
+        return atraso
+
+    assert asyncio.run(cenario()) == pytest.approx(0.01, abs=0.15)
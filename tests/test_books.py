@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Consulta de livros por id (/books/{id} e /books/batch)."""
+
+from conftest import criar_store
+
+
+def test_linhas_por_ids(livros):
+    store = criar_store(livros)
+    assert store.linhas_por_ids([1, 60, 61, -1, 2**63, -2**63 - 1]).tolist() == [0, 59, -1, -1, -1, -1]
+    # Ids esparsos: indice por busca binaria em vez do array denso
+    esparso = criar_store([(10**12 + livro[0], *livro[1:]) for livro in livros])
+    assert esparso.linhas_por_ids([10**12 + 5, 5, 2**64]).tolist() == [4, -1, -1]
+
+
+def test_livro_por_id(client):
+    assert client.get("/api/v1/books/7").json()["id"] == 7
+    assert client.get("/api/v1/books/999").status_code == 404
+
+
+def test_livro_por_id_fora_do_int64(client):
+    assert client.get("/api/v1/books/99999999999999999999999").status_code == 404
+    assert client.get("/api/v1/books/-99999999999999999999999").status_code == 404
+
+
+def test_lote_fora_do_int64(client):
+    ids = [3, 99999999999999999999999, 999, 5]
+    resposta = client.post("/api/v1/books/batch", json={"ids": ids})
+    assert resposta.status_code == 200
+    assert [livro["id"] for livro in resposta.json()["books"]] == [3, 5]
+    assert resposta.json()["not_found"] == [99999999999999999999999, 999]
+
+
+def test_id_repetido_usa_a_primeira_linha(livros):
+    repetido = livros + [(7, "Outro 7", 99.0, 1, 0, "Travel")]
+    store = criar_store(repetido)
+    assert store.linha_por_id(7) == 6
+    assert store.livro(store.linha_por_id(7))["title"] == "Livro 007"
+
+
+def test_store_vazio(livros):
+    from api.store import BookStore
+
+    assert BookStore.vazio().linhas_por_ids([1, 2]).tolist() == [-1, -1]
+
+
+def test_lote_mantem_a_ordem_e_repeticoes(client):
+    resposta = client.post("/api/v1/books/batch", json={"ids": [9, 2, 9, 0, 2]})
+    assert [livro["id"] for livro in resposta.json()["books"]] == [9, 2, 9, 2]
+    assert resposta.json()["not_found"] == [0]
+
+
+def test_lote_fora_dos_limites(client):
+    assert client.post("/api/v1/books/batch", json={"ids": []}).status_code == 422
+    assert client.post("/api/v1/books/batch", json={"ids": list(range(1001))}).status_code == 422
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""ETag, If-None-Match -> 304 e Cache-Control nas rotas de leitura."""
+
+import pytest
+
+from api import dataset
+from api.cache import CACHE_CONTROL, calcular_etag, etag_confere
+
+from conftest import criar_store
+
+ROTAS = [
+    "/api/v1/books?page=2&size=10",
+    "/api/v1/books/3",
+    "/api/v1/categories",
+    "/api/v1/stats/overview",
+    "/api/v1/ml/features",
+]
+
+
+@pytest.mark.parametrize("rota", ROTAS)
+def test_if_none_match_responde_304(client, rota):
+    resposta = client.get(rota)
+    assert resposta.status_code == 200
+    etag = resposta.headers["etag"]
+    assert resposta.headers["cache-control"] == CACHE_CONTROL
+
+    condicional = client.get(rota, headers={"If-None-Match": etag})
+    assert condicional.status_code == 304
+    assert condicional.content == b""
+    assert condicional.headers["etag"] == etag
+    assert condicional.headers["cache-control"] == CACHE_CONTROL
+
+    # Lista, prefixo W/ e "*" tambem conferem; ETag diferente nao
+    assert client.get(rota, headers={"If-None-Match": f'"outra", W/{etag}'}).status_code == 304
+    assert client.get(rota, headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get(rota, headers={"If-None-Match": '"outra"'}).status_code == 200
+
+
+def test_etag_nova_quando_os_dados_mudam(client, livros):
+    rota = "/api/v1/books?page=1&size=5"
+    antiga = client.get(rota).headers["etag"]
+
+    dataset.publicar_store(criar_store(livros[:-1]))
+    resposta = client.get(rota, headers={"If-None-Match": antiga})
+    assert resposta.status_code == 200
+    assert resposta.headers["etag"] != antiga
+
+    # Os mesmos dados de volta: mesma ETag de antes (ETag pelo fingerprint, nao pela versao)
+    dataset.publicar_store(criar_store(livros))
+    assert client.get(rota).headers["etag"] == antiga
+
+
+def test_etag_ignora_a_ordem_dos_parametros(client):
+    primeira = client.get("/api/v1/books?page=2&size=10").headers["etag"]
+    assert client.get("/api/v1/books?size=10&page=2").headers["etag"] == primeira
+    assert client.get("/api/v1/books?size=11&page=2").headers["etag"] != primeira
+
+
+def test_head_tambem_e_condicional(client):
+    etag = client.get("/api/v1/categories").headers["etag"]
+    assert client.head("/api/v1/categories", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_so_get_e_head_sao_cacheados(client):
+    resposta = client.post("/api/v1/books/batch", json={"ids": [1, 2]})
+    assert resposta.status_code == 200
+    assert "etag" not in resposta.headers and "cache-control" not in resposta.headers
+
+    # If-None-Match igual a uma ETag valida nao transforma o POST em 304
+    etag = client.get("/api/v1/books/1").headers["etag"]
+    assert client.post("/api/v1/books/batch", json={"ids": [1]}, headers={"If-None-Match": "*"}).status_code == 200
+    assert client.post("/api/v1/books/batch", json={"ids": [1]}, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_rotas_fora_da_lista_nao_sao_cacheadas(client):
+    resposta = client.get("/api/v1/health")
+    assert "etag" not in resposta.headers
+    assert client.get("/api/v1/health", headers={"If-None-Match": "*"}).status_code == 200
+
+
+def test_erros_nao_recebem_etag(client):
+    resposta = client.get("/api/v1/books/999")
+    assert resposta.status_code == 404
+    assert "etag" not in resposta.headers
+
+
+def test_rota_negociada_varia_com_accept(client):
+    rota = "/api/v1/ml/training-data"
+    json_ = client.get(rota, headers={"Accept": "application/json"})
+    csv_ = client.get(rota, headers={"Accept": "text/csv"})
+    assert json_.headers["etag"] != csv_.headers["etag"]
+    assert json_.headers["vary"] == "Accept, Accept-Encoding"
+
+
+def test_calcular_etag():
+    etag = calcular_etag("abc", "/api/v1/books", "b=2&a=1")
+    assert etag.startswith('"abc-') and etag.endswith('"')
+    assert etag == calcular_etag("abc", "/api/v1/books", "a=1&b=2")
+    assert not etag_confere(None, etag)
+    assert etag_confere(f"W/{etag}", etag)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Exportacao do dataset (/ml/training-data)."""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from api.export import gerar_exportacao, mascara_teste
+
+from conftest import criar_store
+
+ROTA = "/api/v1/ml/training-data"
+
+
+def test_csv_com_todas_as_colunas(client, livros):
+    resposta = client.get(ROTA, params={"format": "csv"})
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/csv")
+    assert resposta.headers["content-disposition"] == "attachment; filename=training_data.csv"
+    linhas = list(csv.DictReader(io.StringIO(resposta.text)))
+    assert [int(linha["id"]) for linha in linhas] == [livro[0] for livro in livros]
+    assert float(linhas[0]["price"]) == livros[0][2]
+    assert linhas[0]["category"] == livros[0][5]
+
+
+def test_ndjson_com_projecao(client, livros):
+    resposta = client.get(ROTA, params={"format": "ndjson", "columns": "id, price"})
+    registros = [json.loads(linha) for linha in resposta.text.splitlines()]
+    assert registros[0] == {"id": livros[0][0], "price": livros[0][2]}
+    assert len(registros) == len(livros)
+
+
+def test_formato_pelo_accept(client):
+    resposta = client.get(ROTA, headers={"Accept": "application/x-ndjson;q=0.9, text/csv"})
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+
+
+def test_colunas_invalidas(client):
+    assert client.get(ROTA, params={"columns": "id,senha"}).status_code == 400
+
+
+def test_split_treino_e_teste_particionam_os_livros(client, livros):
+    ids = {}
+    for split in ("train", "test"):
+        resposta = client.get(ROTA, params={"format": "ndjson", "columns": "id", "split": split, "test_ratio": 0.3, "seed": 7})
+        ids[split] = [json.loads(linha)["id"] for linha in resposta.text.splitlines()]
+    assert not set(ids["train"]) & set(ids["test"])
+    assert sorted(ids["train"] + ids["test"]) == [livro[0] for livro in livros]
+    assert 0 < len(ids["test"]) < len(livros)
+
+
+def test_split_deterministico_por_id():
+    import numpy as np
+
+    ids = np.arange(1, 10_001, dtype=np.int64)
+    mascara = mascara_teste(ids, 0.2, 42)
+    assert mascara.tolist() == mascara_teste(ids, 0.2, 42).tolist()
+    # Cada livro cai no mesmo conjunto mesmo com outros livros no catalogo
+    assert mascara[::2].tolist() == mascara_teste(ids[::2], 0.2, 42).tolist()
+    assert abs(mascara.mean() - 0.2) < 0.02
+    assert mascara.tolist() != mascara_teste(ids, 0.2, 43).tolist()
+
+
+def test_gzip(livros):
+    store = criar_store(livros)
+    comprimido = b"".join(gerar_exportacao(store, "csv", ["id"], gzip=True))
+    assert gzip.decompress(comprimido) == b"".join(gerar_exportacao(store, "csv", ["id"]))
+
+
+def test_gzip_pelo_accept_encoding(client):
+    resposta = client.get(ROTA, params={"columns": "id"}, headers={"Accept-Encoding": "gzip"})
+    assert resposta.headers["content-encoding"] == "gzip"
+    assert resposta.text.splitlines()[0] == "id"
+    sem = client.get(ROTA, params={"columns": "id", "compression": "none"}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in sem.headers
+
+
+@pytest.mark.parametrize("formato", ["arrow", "parquet"])
+def test_formatos_arrow(client, livros, formato):
+    pa = pytest.importorskip("pyarrow")
+    resposta = client.get(ROTA, params={"format": formato, "columns": "id,title"})
+    assert resposta.status_code == 200
+    if formato == "arrow":
+        tabela = pa.ipc.open_stream(resposta.content).read_all()
+    else:
+        import pyarrow.parquet as pq
+
+        tabela = pq.read_table(io.BytesIO(resposta.content))
+    assert tabela.column_names == ["id", "title"]
+    assert tabela.column("id").to_pylist() == [livro[0] for livro in livros]
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Consulta com facetas (/books/query) comparada com filtros por forca bruta."""
+
+import math
+import random
+
+import pytest
+
+from api.dataset import DatasetSnapshot
+from api.facets import FACET_PRICE_WIDTH
+
+from conftest import criar_store
+
+CATEGORIAS = ["Travel", "Poetry", "Fiction", "Mystery"]
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    # Mais de 64 linhas (varias palavras por bitmap) e tamanho nao multiplo de 64
+    aleatorio = random.Random(24)
+    livros = [
+        (id_livro, f"Livro {aleatorio.randint(0, 50)}", round(aleatorio.uniform(5, 60), 2),
+         aleatorio.randint(1, 5), aleatorio.randint(0, 1), aleatorio.choice(CATEGORIAS))
+        for id_livro in range(1, 331)
+    ]
+    return livros, DatasetSnapshot(criar_store(livros), 1)
+
+
+def _faixa(preco):
+    inicio = math.floor(preco / FACET_PRICE_WIDTH)
+    return f"{inicio * FACET_PRICE_WIDTH:g}-{(inicio + 1) * FACET_PRICE_WIDTH:g}"
+
+
+def _esperado(livros, filtros):
+    """(ids que casam, facetas) calculados livro a livro."""
+    testes = {
+        "category": lambda livro: livro[5].lower() in [nome.lower() for nome in filtros["category"]],
+        "rating": lambda livro: livro[3] in filtros["rating"],
+        "availability": lambda livro: livro[4] in filtros["availability"],
+        "price": lambda livro: filtros["price"][0] <= livro[2] <= filtros["price"][1],
+    }
+    ativos = {nome: teste for nome, teste in testes.items() if filtros.get(nome) is not None}
+    valor = {
+        "category": lambda livro: livro[5],
+        "rating": lambda livro: str(livro[3]),
+        "availability": lambda livro: str(livro[4]),
+        "price": lambda livro: _faixa(livro[2]),
+    }
+    facetas = {}
+    for nome in testes:
+        contagens = {}
+        for livro in livros:
+            if all(teste(livro) for outro, teste in ativos.items() if outro != nome):
+                contagens[valor[nome](livro)] = contagens.get(valor[nome](livro), 0) + 1
+        facetas[nome] = contagens
+    ids = [livro[0] for livro in livros if all(teste(livro) for teste in ativos.values())]
+    return ids, facetas
+
+
+def test_equivalente_a_forca_bruta(catalogo):
+    livros, snapshot = catalogo
+    aleatorio = random.Random(18)
+    for _ in range(200):
+        filtros = {
+            "category": aleatorio.choice([None, aleatorio.sample(CATEGORIAS + ["poetry", "Inexistente"], 2)]),
+            "rating": aleatorio.choice([None, aleatorio.sample([1, 2, 3, 4, 5, 9], 2)]),
+            "availability": aleatorio.choice([None, [0], [1], [0, 1]]),
+            "price": aleatorio.choice([None, sorted([aleatorio.uniform(0, 70), aleatorio.uniform(0, 70)]), [0, 55]]),
+        }
+        preco = filtros["price"] or (None, None)
+        resultado, facetas = snapshot.facetas.consultar(
+            filtros["category"], filtros["rating"], filtros["availability"], preco[0], preco[1]
+        )
+        ids, esperadas = _esperado(livros, filtros)
+        for nome, contagens in facetas.items():
+            assert {rotulo: total for rotulo, total in contagens.items() if total} == esperadas[nome], (nome, filtros)
+
+        # Paginas na ordem do store e ordenadas por preco
+        total, linhas = snapshot.facetas.pagina(resultado, 5, 25)
+        assert total == len(ids)
+        assert snapshot.store.ids[linhas].tolist() == ids[5:25]
+        total, linhas = snapshot.facetas.pagina(resultado, 0, 10, snapshot.ordens.ordem("price"), "desc")
+        por_preco = sorted((livro for livro in livros if livro[0] in set(ids)), key=lambda livro: (livro[2], livro[0]), reverse=True)
+        assert snapshot.store.ids[linhas].tolist() == [livro[0] for livro in por_preco[:10]]
+
+
+def test_rota(client, livros):
+    resposta = client.get("/api/v1/books/query", params={"category": ["travel", "Poetry"], "rating": [2, 3], "size": 5})
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    esperados = [livro[0] for livro in livros if livro[5] in ("Travel", "Poetry") and livro[3] in (2, 3)]
+    assert corpo["total"] == len(esperados) == int(resposta.headers["x-total-count"])
+    assert [livro["id"] for livro in corpo["books"]] == esperados[:5]
+    assert sum(corpo["facets"]["category"].values()) == sum(1 for livro in livros if livro[3] in (2, 3))
+
+
+def test_rota_faixa_de_preco_invertida(client):
+    assert client.get("/api/v1/books/query", params={"min_price": 30, "max_price": 10}).status_code == 400
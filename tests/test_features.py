@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Matriz de features (/ml/features) e seu schema."""
+
+import pytest
+
+from api import dataset
+
+from conftest import criar_store
+
+
+@pytest.mark.parametrize("rota", ["/api/v1/ml/features", "/api/v1/ml/features/schema"])
+def test_corpo_igual_depois_de_recarregar_os_mesmos_dados(client, livros, rota):
+    # A versao muda a cada publicacao (e difere entre workers); a ETag so
+    # depende do fingerprint, entao o corpo tambem nao pode depender da versao
+    antes = client.get(rota)
+    dataset.publicar_store(criar_store(livros))
+    depois = client.get(rota)
+    assert antes.headers["etag"] == depois.headers["etag"]
+    assert antes.content == depois.content
+    assert antes.json()["data_fingerprint"] == dataset.obter_snapshot().fingerprint
+
+
+def test_matriz_json(client, livros):
+    corpo = client.get("/api/v1/ml/features", params={"encoding": "ordinal"}).json()
+    assert corpo["ids"] == [livro[0] for livro in livros]
+    assert corpo["columns"] == ["price", "rating", "availability", "category_code"]
+    assert all(0.0 <= valor <= 2.0 for linha in corpo["rows"] for valor in linha)
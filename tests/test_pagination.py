@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Paginacao por cursor da listagem (/books?sort=)."""
+
+from api.dataset import DatasetSnapshot
+from api.pagination import decodificar_cursor, pagina_ordenada
+
+from conftest import criar_store
+
+
+def _percorrer(snapshot, sort, order, size, cursor=None):
+    """Ids de todas as paginas a partir do cursor (ou do inicio)."""
+    ids = []
+    ordem = snapshot.ordens.ordem(sort)
+    while True:
+        linhas, proximo = pagina_ordenada(ordem, snapshot.fingerprint, order, size, cursor=cursor)
+        ids.extend(snapshot.store.ids[linhas].tolist())
+        if proximo is None:
+            return ids
+        cursor = decodificar_cursor(proximo)
+
+
+def test_cursor_percorre_todos_sem_repetir(livros):
+    snapshot = DatasetSnapshot(criar_store(livros), 1)
+    for order in ("asc", "desc"):
+        ids = _percorrer(snapshot, "price", order, 7)
+        esperado = [livro[0] for livro in sorted(livros, key=lambda livro: (livro[2], livro[0]), reverse=order == "desc")]
+        assert ids == esperado
+
+
+def test_cursor_reaplicado_em_snapshot_remontado_com_mesma_versao(livros):
+    # Cada worker (e cada restart) numera as versoes a partir de 1: o
+    # cursor emitido na versao 1 de um dataset chega em outra versao 1
+    antigo = DatasetSnapshot(criar_store(livros), 1)
+    removidos = {2, 3, 9, 10, 16, 17}
+    novos = [livro for livro in livros if livro[0] not in removidos]
+    novo = DatasetSnapshot(criar_store(novos), 1)
+    assert antigo.version == novo.version and antigo.fingerprint != novo.fingerprint
+
+    for order in ("asc", "desc"):
+        linhas, proximo = pagina_ordenada(antigo.ordens.ordem("price"), antigo.fingerprint, order, 10)
+        vistos = antigo.store.ids[linhas].tolist()
+        chave_ultimo = max if order == "asc" else min
+        ultimo = chave_ultimo((livro[2], livro[0]) for livro in livros if livro[0] in vistos)
+
+        restantes = _percorrer(novo, "price", order, 10, decodificar_cursor(proximo))
+        esperado = [
+            livro[0] for livro in sorted(novos, key=lambda livro: (livro[2], livro[0]), reverse=order == "desc")
+            if ((livro[2], livro[0]) > ultimo if order == "asc" else (livro[2], livro[0]) < ultimo)
+        ]
+        assert restantes == esperado
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Validacao das entradas de /ml/predictions e /ml/predictions/batch."""
+
+import pytest
+
+
+def test_predicao_individual(client):
+    resposta = client.post("/api/v1/ml/predictions", json={"price": 12.5, "rating": 3, "availability": 2})
+    assert resposta.status_code == 200
+    assert resposta.json()["predicted_category"] in ("Travel", "Poetry", "Fiction")
+
+
+@pytest.mark.parametrize("campo", ["price", "rating", "availability"])
+@pytest.mark.parametrize("valor", ["nan", "inf", "-inf"])
+def test_predicao_individual_recusa_nao_finitos(client, campo, valor):
+    corpo = {"price": 12.5, "rating": 3, "availability": 1, campo: valor}
+    assert client.post("/api/v1/ml/predictions", json=corpo).status_code == 422
+
+
+def test_predicao_em_lote(client):
+    resposta = client.post("/api/v1/ml/predictions/batch", json={"price": [12.5, 15.0], "rating": [3, 4]})
+    assert resposta.status_code == 200
+    assert len(resposta.json()["predicted_category"]) == 2
+
+
+@pytest.mark.parametrize("campo", ["price", "rating", "availability"])
+@pytest.mark.parametrize("valor", ["nan", "inf", "-inf"])
+def test_predicao_em_lote_recusa_nao_finitos(client, campo, valor):
+    corpo = {"price": [12.5, 15.0], "rating": [3, 4], "availability": [1, 0]}
+    corpo[campo] = [corpo[campo][0], valor]
+    assert client.post("/api/v1/ml/predictions/batch", json=corpo).status_code == 422
+
+
+def test_predicao_em_lote_recusa_availability_vazio(client):
+    corpo = {"price": [12.5], "rating": [3], "availability": []}
+    assert client.post("/api/v1/ml/predictions/batch", json=corpo).status_code == 422
+
+
+@pytest.mark.parametrize("valor", [1e308, -1e308, 1.7976931348623157e308])
+def test_predicao_com_valores_enormes(client, valor):
+    resposta = client.post("/api/v1/ml/predictions", json={"price": valor, "rating": valor, "availability": valor})
+    assert resposta.status_code == 200
+    assert 0.0 <= resposta.json()["confidence"] <= 1.0
+
+    resposta = client.post("/api/v1/ml/predictions/batch", json={"price": [valor, 12.5], "rating": [3, valor], "availability": [valor, 1]})
+    assert resposta.status_code == 200
+    assert all(0.0 <= confianca <= 1.0 for confianca in resposta.json()["confidence"])
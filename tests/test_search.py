@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Busca por substring do TrigramIndex comparada com o `in` do Python."""
+
+import random
+
+import pytest
+
+from api.search import TrigramIndex
+
+
+def _esperado(textos, termo):
+    return [linha for linha, texto in enumerate(textos) if termo.lower() in texto.lower()]
+
+
+@pytest.mark.parametrize("textos, termo", [
+    (["bbbb", "ab", ""], "b"),
+    (["bbbb", "ab", "", ""], "b"),
+    (["", "ab", "b"], "b"),
+    (["bb", "", "bb", ""], "bb"),
+    (["", "", ""], "b"),
+    (["b"], "b"),
+])
+def test_textos_vazios(textos, termo):
+    assert TrigramIndex(textos).buscar(termo).tolist() == _esperado(textos, termo)
+
+
+def test_equivalente_ao_in():
+    aleatorio = random.Random(25)
+    for _ in range(300):
+        textos = [
+            "".join(aleatorio.choice("abAB é") for _ in range(aleatorio.randint(0, 8)))
+            for _ in range(aleatorio.randint(0, 12))
+        ]
+        indice = TrigramIndex(textos)
+        for _ in range(5):
+            termo = "".join(aleatorio.choice("abé ") for _ in range(aleatorio.randint(0, 4)))
+            assert indice.buscar(termo).tolist() == _esperado(textos, termo), (textos, termo)